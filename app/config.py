@@ -0,0 +1,83 @@
+import os
+from typing import List, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Service settings, read from the environment (prefix GRAPHRAG_) or .env.
+    """
+    model_config = SettingsConfigDict(env_prefix="GRAPHRAG_", env_file=".env", extra="ignore")
+
+    data_dir: str = "data"
+    # Server directory that POST /ingest may read `path` documents from (paths are resolved,
+    # symlinks included, and must stay inside it); None only accepts inline text
+    ingest_root: Optional[str] = None
+    # Worker processes for CPU-bound work (graph building, Leiden); None = one per CPU
+    process_workers: Optional[int] = None
+    # Finished jobs kept for the status endpoints
+    job_history: int = 100
+    max_context_tokens: int = 8000
+    # Stream extraction responses and parse them incrementally, so a response cut short
+    # keeps the entities and relationships that arrived before it broke off
+    stream_extraction: bool = False
+    # Pack several chunks into one extraction request, up to this many chunk tokens
+    extraction_pack_tokens: Optional[int] = None
+    # Merge an entity's or relationship's descriptions with the LLM once they exceed this
+    # many tokens (near-duplicates are always dropped); None disables merging
+    description_max_tokens: Optional[int] = 500
+    # Leiden runs per partition, over consecutive seeds (and every resolution, if given);
+    # the best by modularity is kept. Runs are spread over process_workers
+    leiden_seeds: int = 1
+    leiden_resolutions: Optional[List[float]] = None
+    # Split communities larger than this again, top-down, up to max_community_levels levels;
+    # None keeps two levels (communities and communities of communities)
+    max_cluster_size: Optional[int] = None
+    max_community_levels: Optional[int] = None
+    # Resident indexes (graph, communities, reports) are evicted least recently used first
+    # beyond this estimated size; None keeps every index that was queried in memory
+    index_memory_limit_mb: Optional[int] = None
+    # Global search answers (per index version) and map results (per report text) kept in
+    # memory for repeated queries; entries expire after query_cache_ttl seconds (None: never)
+    query_cache_answers: int = 1000
+    query_cache_maps: int = 50000
+    query_cache_ttl: Optional[float] = 3600
+
+    @property
+    def documents_dir(self) -> str:
+        return os.path.join(self.data_dir, "documents")
+
+    @property
+    def extraction_path(self) -> str:
+        # One chunk result per line, so graph building can shard it
+        return os.path.join(self.data_dir, "extracted_entities.jsonl")
+
+    @property
+    def extraction_input_path(self) -> str:
+        # What indexes are built from: the JSONL results, or the JSON list earlier versions
+        # wrote, until the next ingest replaces it
+        legacy = os.path.join(self.data_dir, "extracted_entities.json")
+        if not os.path.exists(self.extraction_path) and os.path.exists(legacy):
+            return legacy
+        return self.extraction_path
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.data_dir, "extraction_journal.jsonl")
+
+    @property
+    def cache_path(self) -> str:
+        return os.path.join(self.data_dir, "llm_cache.sqlite")
+
+    @property
+    def report_path(self) -> str:
+        return os.path.join(self.data_dir, "run_report.json")
+
+    @property
+    def index_dir(self) -> str:
+        return os.path.join(self.data_dir, "index")
+
+    @property
+    def indexes_dir(self) -> str:
+        # Further indexes, one snapshot store per index id, that queries can select
+        return os.path.join(self.data_dir, "indexes")
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed, content-addressed cache of LLM responses stored in a single SQLite file.
+
+    Keys are derived from the model name and the hashes of the system prompt and the user
+    content, so re-running an ingest over unchanged text with an unchanged prompt never
+    reaches the network. When `max_bytes` is set, the least recently used entries are
+    evicted once the stored responses grow past it. A read-only cache serves hits but
+    never writes (useful for CI and for sharing a warm cache between machines).
+    """
+    def __init__(self, path: str, max_bytes: int = None, read_only: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            self.conn.commit()
+
+    @classmethod
+    def from_env(cls, default_path: str = None):
+        """
+        Builds a cache from LLM_CACHE_PATH, LLM_CACHE_MAX_MB and LLM_CACHE_READ_ONLY.
+        Returns None when no path is configured (caching disabled).
+        """
+        path = os.getenv("LLM_CACHE_PATH", default_path)
+        if not path:
+            return None
+        max_mb = os.getenv("LLM_CACHE_MAX_MB")
+        read_only = os.getenv("LLM_CACHE_READ_ONLY", "").lower() in ("1", "true", "yes")
+        if read_only and not os.path.exists(path):
+            return None
+        return cls(path, max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None, read_only=read_only)
+
+    @staticmethod
+    def make_key(model: str, system_message: str, prompt: str) -> str:
+        return sha256(f"{model or ''}\0{sha256(system_message)}\0{sha256(prompt)}")
+
+    def get(self, key: str):
+        row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not self.read_only:
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return row[0]
+
+    def put(self, key: str, value: str, model: str = None):
+        if self.read_only or value is None:
+            return
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, value, len(value.encode("utf-8")), now, now)
+        )
+        self.conn.commit()
+        if self.max_bytes:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self):
+        """
+        Drops least recently used entries until the cache fits in 90% of `max_bytes`,
+        leaving some headroom so eviction does not run on every insert.
+        """
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC")
+        doomed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size_bytes": self.size_bytes(),
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,167 @@
+import asyncio
+import igraph as ig
+import numpy as np
+from core.cache import ResponseCache
+from core.llm import LLMClient
+from core.resolution import MinHasher
+from core.scheduler import ExtractionScheduler
+from core.telemetry import telemetry
+from core.text_utils import count_tokens
+from prompts.consolidate_descriptions import CONSOLIDATE_DESCRIPTIONS_PROMPT
+
+
+def deduplicate(descriptions: list, threshold: float = 0.8, minhash: MinHasher = None) -> list:
+    """
+    Drops descriptions whose estimated Jaccard similarity (MinHash over word shingles) to an
+    earlier one reaches `threshold`, and descriptions without any words. Order is kept and
+    the first of a group of near-duplicates wins.
+    """
+    minhash = minhash or MinHasher()
+    kept = []
+    signatures = []
+    for description in descriptions:
+        signature = minhash.signature(description)
+        if signature is None:
+            continue
+        if signatures and MinHasher.similarity(signature, np.asarray(signatures)).max() >= threshold:
+            continue
+        kept.append(description)
+        signatures.append(signature)
+    return kept
+
+
+class DescriptionConsolidator:
+    """
+    Keeps entity and relationship descriptions bounded as the corpus grows.
+
+    Near-duplicates are removed first (cheap, no LLM). Only when the remaining descriptions
+    of one entity/relationship exceed `max_tokens` are they merged into one by the LLM;
+    inputs over `max_input_tokens` are merged in groups and the group results merged again.
+    Merged descriptions are cached by the hash of their input, so a re-index only pays for
+    entities whose descriptions changed.
+    """
+    def __init__(self, llm_client: LLMClient, scheduler: ExtractionScheduler = None, cache: ResponseCache = None,
+                 max_tokens: int = 500, max_input_tokens: int = 4000, threshold: float = 0.8,
+                 prompt: str = CONSOLIDATE_DESCRIPTIONS_PROMPT):
+        self.llm_client = llm_client
+        self.scheduler = scheduler or ExtractionScheduler()
+        self.cache = cache
+        self.max_tokens = max_tokens
+        self.max_input_tokens = max_input_tokens
+        self.threshold = threshold
+        # Words run ~1.3 tokens, so the merged text fits the budget it is asked for
+        self.prompt = prompt.format(max_words=max(1, int(max_tokens * 0.6)))
+        self._minhash = MinHasher()
+
+    def over_budget(self, descriptions: list) -> bool:
+        # A token is at least one character, so short lists are never tokenized
+        if sum(len(d) + 1 for d in descriptions) <= self.max_tokens:
+            return False
+        return count_tokens("\n".join(descriptions)) > self.max_tokens
+
+    async def merge(self, subject: str, descriptions: list) -> str:
+        content = f"Subject: {subject}\nDescriptions:\n" + "\n".join(f"- {d}" for d in descriptions)
+        # Keyed by the model too: another model's merge is not reused after a switch
+        key = ResponseCache.make_key(f"description_merge:{self.llm_client.serving_model()}", self.prompt, content)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        tokens = count_tokens(self.prompt) + count_tokens(content)
+        merged = await self.scheduler.submit(
+            lambda: self.llm_client.generate(prompt=content, system_message=self.prompt),
+            tokens=tokens
+        )
+        merged = (merged or "").strip()
+        if not merged:
+            raise ValueError("Empty merged description")
+        if self.cache is not None:
+            self.cache.put(key, merged, model="description_merge")
+        return merged
+
+    def _groups(self, descriptions: list) -> list:
+        # Consecutive groups of at least two descriptions within max_input_tokens (where
+        # possible), so every round strictly reduces the number of descriptions
+        groups = [[]]
+        used = 0
+        for description in descriptions:
+            tokens = count_tokens(description)
+            if len(groups[-1]) >= 2 and used + tokens > self.max_input_tokens:
+                groups.append([])
+                used = 0
+            groups[-1].append(description)
+            used += tokens
+        return groups
+
+    async def consolidate(self, subject: str, descriptions: list) -> list:
+        """
+        Returns the descriptions to keep: the deduplicated list if it fits `max_tokens`,
+        otherwise a single merged description. If the LLM fails, the deduplicated list is kept.
+        """
+        deduplicated = deduplicate(descriptions, self.threshold, self._minhash)
+        if len(deduplicated) < 2 or not self.over_budget(deduplicated):
+            return deduplicated
+        kept = deduplicated
+        try:
+            while len(kept) > 1:
+                kept = await asyncio.gather(*[
+                    self.merge(subject, group) if len(group) > 1 else asyncio.sleep(0, group[0])
+                    for group in self._groups(kept)
+                ])
+            telemetry.inc("descriptions_merged_total")
+            return list(kept)
+        except Exception as e:
+            print(f"Failed to consolidate descriptions of {subject}: {e}")
+            return deduplicated
+
+    @telemetry.timed("consolidate")
+    async def consolidate_graph(self, graph: ig.Graph, on_progress=None) -> dict:
+        """
+        Consolidates the 'description' lists of every vertex and relationship (the graph's
+        RelationshipTable, or its edges if it has none) in place.
+        `on_progress(completed, total)` is called as items finish. Returns counts of changed
+        entities and relationships, and of descriptions removed.
+        """
+        names = graph.vs['name'] if graph.vcount() else []
+        vertex_descriptions = graph.vs['description'] if graph.vcount() else []
+        items = [(vertex_descriptions, vid, names[vid]) for vid in range(len(vertex_descriptions))]
+
+        table = graph['relationships'] if 'relationships' in graph.attributes() else None
+        if table is not None:
+            # Typed relationships: the table's description column is updated in place
+            edge_descriptions = table.descriptions
+            for edge in graph.es:
+                for row, r in zip(table.rows(edge['pair']), table.relationships(edge['pair'], *edge.tuple)):
+                    items.append((edge_descriptions, row, f"{names[r['source']]} -> {names[r['target']]} ({r['type']})"))
+        else:
+            has_edge_descriptions = 'description' in graph.es.attributes()
+            edge_descriptions = graph.es['description'] if has_edge_descriptions and graph.ecount() else []
+            edge_types = graph.es['type'] if 'type' in graph.es.attributes() else [None] * graph.ecount()
+            for eid, (source, target) in enumerate(graph.get_edgelist() if edge_descriptions else []):
+                subject = f"{names[source]} -> {names[target]}"
+                items.append((edge_descriptions, eid, f"{subject} ({edge_types[eid]})" if edge_types[eid] else subject))
+        # Single descriptions cannot be consolidated any further
+        items = [item for item in items if len(item[0][item[1]]) > 1]
+
+        completed = 0
+        stats = {"entities": 0, "relationships": 0, "removed": 0}
+
+        async def run(column, position, subject):
+            nonlocal completed
+            before = column[position]
+            after = await self.consolidate(subject, before)
+            if after != before:
+                column[position] = after
+                stats["entities" if column is vertex_descriptions else "relationships"] += 1
+                stats["removed"] += len(before) - len(after)
+            completed += 1
+            if on_progress:
+                on_progress(completed, len(items))
+
+        await asyncio.gather(*[run(*item) for item in items])
+        if stats["entities"]:
+            graph.vs['description'] = vertex_descriptions
+        if stats["relationships"] and table is None:
+            graph.es['description'] = edge_descriptions
+        return stats
@@ -1,50 +1,90 @@
 import asyncio
 import json
-from core.text_utils import chunk_text, load_text
+from core.text_utils import astream_chunks, count_tokens, extract_json
+from core.json_stream import JSONStreamParser
 from core.llm import LLMClient
+from core.scheduler import ExtractionScheduler
+from core.journal import ChunkJournal
+from core.cache import sha256
+from core.telemetry import telemetry
+from prompts.extract_entities import PACKED_CHUNKS_INSTRUCTIONS
 
 class EntityExtractor:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, scheduler: ExtractionScheduler = None, stream: bool = False,
+                 pack_tokens: int = None):
         self.llm_client = llm_client
+        # Every chunk request goes through the scheduler so a whole book never hits the provider at once
+        self.scheduler = scheduler or ExtractionScheduler()
+        # Stream responses and parse them incrementally (see process_single_chunk)
+        self.stream = stream
+        # Pack several chunks into one request up to this many chunk tokens (see process_packed)
+        self.pack_tokens = pack_tokens
+        self._prompt_tokens = {}
 
     def _extract_json(self, content: str):
         """
         Extracts JSON from a string that might contain markdown code blocks or other text.
         """
+        return extract_json(content)
+
+    def _count_prompt_tokens(self, prompt: str) -> int:
+        # The system prompt is identical for every chunk, so it is only encoded once
+        if prompt not in self._prompt_tokens:
+            self._prompt_tokens[prompt] = count_tokens(prompt)
+        return self._prompt_tokens[prompt]
+
+    async def _stream_chunk(self, chunk_id, user_content: str, prompt: str, tokens: int, on_item=None) -> dict:
+        """
+        Streams one chunk's response through a JSONStreamParser, passing every entity and
+        relationship to `on_item(chunk_id, key, item)` as soon as it is complete. A retry
+        starts a fresh parse (items may be reported again; merging is idempotent). If the
+        response is cut short, or the last attempt fails midway, the valid prefix is kept
+        and the result is marked truncated.
+        """
+        attempt = {}
+
+        async def call():
+            parser = JSONStreamParser()
+            attempt["parser"] = parser
+            async for piece in self.llm_client.generate_stream(prompt=user_content, system_message=prompt):
+                for key, item in parser.feed(piece):
+                    if on_item:
+                        on_item(chunk_id, key, item)
+            return parser
+
         try:
-            # Try parsing directly first
-            return json.loads(content)
-        except json.JSONDecodeError:
-            pass
-
-        # Try to find markdown code blocks
-        import re
-        match = re.search(r'```(?:json)?\s*(.*?)```', content, re.DOTALL)
-        if match:
-            json_str = match.group(1).strip()
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                pass
-        
-        # Try to find the first { and last }
-        start = content.find('{')
-        end = content.rfind('}')
-        
-        if start != -1 and end != -1 and end > start:
-            json_str = content[start:end+1]
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                pass
-                
-        # If all else fails, raise the original error or a new one
-        raise ValueError("Could not extract valid JSON from response")
-
-    async def process_single_chunk(self, chunk_id, chunk_text, prompt: str):
+            parser = await self.scheduler.submit(call, tokens=tokens)
+            error = None
+        except Exception as e:
+            parser = attempt.get("parser")
+            if parser is None or not parser.result:
+                raise
+            error = str(e)
+
+        data = parser.close()
+        if not data and not parser.done:
+            raise ValueError("Could not extract valid JSON from response")
+        result = {"chunk_id": chunk_id, "status": "success", "data": data}
+        if not parser.done:
+            print(f"Chunk {chunk_id}: truncated response, keeping {sum(len(v) for v in data.values() if isinstance(v, list))} items")
+            result["truncated"] = True
+            if error:
+                result["error"] = error
+        return result
+
+    async def process_single_chunk(self, chunk_id, chunk_text, prompt: str, token_count: int = None, on_item=None):
         try:
             user_content = f"Chunk {chunk_id}: {chunk_text}"
-            content = await self.llm_client.generate(prompt=user_content, system_message=prompt)
+            if token_count is None:
+                token_count = count_tokens(chunk_text)
+            tokens = self._count_prompt_tokens(prompt) + token_count
+            if self.stream:
+                return await self._stream_chunk(chunk_id, user_content, prompt, tokens, on_item=on_item)
+
+            content = await self.scheduler.submit(
+                lambda: self.llm_client.generate(prompt=user_content, system_message=prompt),
+                tokens=tokens
+            )
             
             data = self._extract_json(content)
             
@@ -63,15 +103,172 @@ class EntityExtractor:
                 "error": str(e)
             }
 
-    async def process_chunks(self, text_path: str, prompt: str):
-        text = load_text(text_path)
-        chunks = chunk_text(text, chunk_size=1200, overlap=100)
+    async def process_packed(self, chunks: list, prompt: str, on_item=None) -> list:
+        """
+        Extracts several chunks with a single request: the system prompt is sent once and each
+        chunk is tagged with its chunk_id. `chunks` is a list of (chunk_id, chunk_text, token_count).
+        The response is split back into one result per chunk (same schema as process_single_chunk);
+        chunks that are missing or malformed in it are retried individually.
+        """
+        user_content = "\n\n".join(f'<chunk id="{chunk_id}">\n{text}\n</chunk>' for chunk_id, text, _ in chunks)
+        system_message = prompt + PACKED_CHUNKS_INSTRUCTIONS
+        tokens = self._count_prompt_tokens(system_message) + sum(count for _, _, count in chunks) + 12 * len(chunks)
+        wanted = {chunk_id for chunk_id, _, _ in chunks}
+        entries = {}
+
+        def accept(entry) -> bool:
+            if not isinstance(entry, dict):
+                return False
+            try:
+                chunk_id = int(entry.get("chunk_id"))
+            except (TypeError, ValueError):
+                return False
+            entities = entry.get("entities", [])
+            relationships = entry.get("relationships", [])
+            if chunk_id not in wanted or chunk_id in entries or not isinstance(entities, list) \
+                    or not isinstance(relationships, list):
+                return False
+            entries[chunk_id] = {"entities": entities, "relationships": relationships}
+            if on_item:
+                for key in ("entities", "relationships"):
+                    for item in entries[chunk_id][key]:
+                        on_item(chunk_id, key, item)
+            return True
+
+        try:
+            if self.stream:
+                async def call():
+                    # Each chunk's entry is accepted as soon as it is complete in the stream
+                    parser = JSONStreamParser()
+                    async for piece in self.llm_client.generate_stream(prompt=user_content, system_message=system_message):
+                        for key, entry in parser.feed(piece):
+                            if key == "chunks":
+                                accept(entry)
+                await self.scheduler.submit(call, tokens=tokens)
+            else:
+                content = await self.scheduler.submit(
+                    lambda: self.llm_client.generate(prompt=user_content, system_message=system_message),
+                    tokens=tokens
+                )
+                data = self._extract_json(content)
+                for entry in data.get("chunks", []) if isinstance(data, dict) else []:
+                    accept(entry)
+        except Exception as e:
+            print(f"Packed request for chunks {sorted(wanted)} failed: {e}")
+
+        missing = [(chunk_id, text, count) for chunk_id, text, count in chunks if chunk_id not in entries]
+        if missing:
+            print(f"Retrying {len(missing)} of {len(chunks)} packed chunks individually")
+        retried = await asyncio.gather(*[
+            self.process_single_chunk(chunk_id, text, prompt, token_count=count, on_item=on_item)
+            for chunk_id, text, count in missing
+        ])
+        retried = {result["chunk_id"]: result for result in retried}
+
+        return [
+            {"chunk_id": chunk_id, "status": "success", "data": entries[chunk_id]} if chunk_id in entries
+            else retried[chunk_id]
+            for chunk_id, _, _ in chunks
+        ]
+
+    @telemetry.timed("extraction")
+    async def process_chunks(self, text_path: str, prompt: str, journal: ChunkJournal = None, workers: int = None,
+                             on_progress=None, on_item=None):
+        """
+        Extracts entities from every chunk of a text file or a directory of documents.
+
+        Chunks are streamed from the chunker and submitted as soon as they are produced, so
+        extraction starts on the first chunk while later documents are still being read.
+        With a journal, each result is persisted as soon as it finishes and chunks that
+        already succeeded in a previous (interrupted) run are reused instead of re-sent
+        to the LLM. `on_progress(completed, submitted)` is called as chunks finish. When
+        streaming, `on_item(chunk_id, key, item)` receives each entity/relationship as soon
+        as it is parsed; results are still returned (and journaled) per finished chunk.
 
+        With `pack_tokens`, consecutive chunks are grouped into packs of up to that many chunk
+        tokens and each pack is sent as one request (see process_packed).
+        """
+        done = journal.completed() if journal else {}
+        if journal:
+            journal.open()
+
+        # Bounds how many chunks are buffered ahead of the scheduler, so a large corpus
+        # is never held in memory all at once
+        backlog_size = self.scheduler.max_in_flight * 4
+        backlog = asyncio.Semaphore(backlog_size)
+        completed = 0
+        submitted = 0
+
+        def finish(count: int):
+            nonlocal completed
+            for _ in range(count):
+                backlog.release()
+            completed += count
+            if on_progress:
+                on_progress(completed, submitted)
+
+        async def run_pack(pack):
+            # pack: [(chunk_id, chunk, chunk_hash)]
+            try:
+                if len(pack) == 1:
+                    chunk_id, chunk, _ = pack[0]
+                    results = [await self.process_single_chunk(chunk_id, chunk.text, prompt,
+                                                               token_count=chunk.token_count, on_item=on_item)]
+                else:
+                    results = await self.process_packed(
+                        [(chunk_id, chunk.text, chunk.token_count) for chunk_id, chunk, _ in pack], prompt, on_item=on_item
+                    )
+                for (_, chunk, chunk_hash), result in zip(pack, results):
+                    telemetry.record_chunk(result["status"], truncated=result.get("truncated", False))
+                    result["doc_id"] = chunk.doc_id
+                    if journal:
+                        journal.append({**result, "chunk_hash": chunk_hash})
+                return results
+            finally:
+                finish(len(pack))
+
+        reused = []
         tasks = []
-        for i, chunk in enumerate(chunks):
-            task = self.process_single_chunk(i, chunk, prompt)
-            tasks.append(task)
+        pack = []
+        pack_tokens = 0
+        try:
+            # Time spent waiting on the chunker shows whether tokenization is the bottleneck
+            chunks = astream_chunks(text_path, chunk_size=1200, overlap=100, workers=workers)
+            async for chunk in telemetry.timed_iter(chunks, "chunking_wait"):
+                await backlog.acquire()
+                chunk_id = submitted
+                submitted += 1
+                chunk_hash = sha256(chunk.text)
+                previous = done.get(chunk_id)
+                # Only reuse a journaled result if it was produced from the very same chunk text
+                if previous and previous.get("chunk_hash") == chunk_hash:
+                    previous = dict(previous)
+                    previous.pop("chunk_hash", None)
+                    reused.append(previous)
+                    telemetry.record_chunk("reused")
+                    finish(1)
+                    continue
+
+                # A full pack is sent before this chunk joins the next one; packs never hold
+                # more than half the backlog, so filling one cannot block on the semaphore
+                if pack and (pack_tokens + chunk.token_count > self.pack_tokens or len(pack) >= backlog_size // 2):
+                    tasks.append(asyncio.create_task(run_pack(pack)))
+                    pack, pack_tokens = [], 0
+                pack.append((chunk_id, chunk, chunk_hash))
+                pack_tokens += chunk.token_count
+                if not self.pack_tokens:
+                    tasks.append(asyncio.create_task(run_pack(pack)))
+                    pack, pack_tokens = [], 0
+            if pack:
+                tasks.append(asyncio.create_task(run_pack(pack)))
 
-        results = await asyncio.gather(*tasks)
+            results = reused + [result for pack_results in await asyncio.gather(*tasks) for result in pack_results]
+            results.sort(key=lambda r: r["chunk_id"])
+        finally:
+            for task in tasks:
+                task.cancel()
+            if journal:
+                journal.sync()
+        print(f"Extraction stats: {self.scheduler.stats()}")
         
-        return results
+        return results
\ No newline at end of file
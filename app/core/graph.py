@@ -1,109 +1,283 @@
 import json
+import random
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from xml.sax.saxutils import quoteattr
+import numpy as np
 import leidenalg
 import igraph as ig
+from core.resolution import EntityIndex, NameNormalizer
+from core.shards import SHARD_BYTES, is_jsonl, iter_partial_tables, list_shards, read_shard
+from core.telemetry import telemetry
 
-def clean_json(json_path: str):
-    with open(json_path, 'r') as f:
-        chunks = json.load(f)
+def clean_json(json_path: str, normalizer: NameNormalizer = None, workers: int = 1):
+    """
+    Merges the extraction results (see load_entity_index) into unique entities and relationships.
+    Names are resolved through an EntityIndex, so relationship endpoints match entities
+    regardless of casing/spacing (and any configured punctuation or alias rules).
+    """
+    return load_entity_index(json_path, normalizer, workers).to_dict()
 
-    unique_entities = {}
-    unique_relationships = {}
-    
-    for chunk in chunks:
-        if chunk.get("status") != "success":
-            continue
-            
-        data = chunk.get("data")
-        if not data:
-            continue
-
-        for entity in data.get("entities", []):
-            name = entity.get("name", "").lower()
-            if not name:
-                continue
-                
-            if name not in unique_entities:
-                unique_entities[name] = {
-                        "name": entity.get("name"), # Keep original casing for display if needed, or use lower
-                        "type": entity.get("type"),
-                        "description": set([entity.get("description", "")])
-                }   
-            else:
-                unique_entities[name]["description"].add(entity.get("description", ""))
-
-        for relationship in data.get("relationships", []):
-            source = relationship.get("source", "")
-            target = relationship.get("target", "")
-            if not source or not target:
-                continue
-                
-            rel_type = relationship.get("relationship_type", "related") # Handle missing type
-            
-            # Using a consistent ID format
-            rel_id = f"{source}_{rel_type}_{target}"
-
-            if rel_id not in unique_relationships:
-                unique_relationships[rel_id] = {
-                    "source": source,
-                    "target": target,
-                    "type": rel_type,
-                    "description": set([relationship.get("description", "")]),
-                    "strength": float(relationship.get("strength", 1.0))
-                }
-            else:
-                unique_relationships[rel_id]["description"].add(relationship.get("description", ""))
-                unique_relationships[rel_id]["strength"] = max(unique_relationships[rel_id]["strength"], float(relationship.get("strength", 1.0)))
+@telemetry.timed("load_entity_index")
+def load_entity_index(json_path: str, normalizer: NameNormalizer = None, workers: int = 1,
+                      shard_bytes: int = SHARD_BYTES) -> EntityIndex:
+    """
+    Reads extraction results into an EntityIndex: a JSON list of chunk results, or JSONL
+    (a .jsonl file or a directory of them), which is read shard by shard. With `workers`
+    > 1 the shards are parsed into partial tables in a process pool and merged in order.
+    """
+    index = EntityIndex(normalizer)
+    if not is_jsonl(json_path):
+        with open(json_path, 'r') as f:
+            index.add_chunks(json.load(f))
+    elif workers > 1:
+        for tables in iter_partial_tables(json_path, normalizer, workers, shard_bytes):
+            index.merge_tables(tables)
+    else:
+        for shard in list_shards(json_path, shard_bytes):
+            index.add_chunks(read_shard(shard))
+    return index
 
-    # Convert sets to lists for JSON serialization/output
-    for entity in unique_entities.values():
-        entity["description"] = list(entity["description"])
-        
-    for rel in unique_relationships.values():
-        rel["description"] = list(rel["description"])
+class RelationshipTable:
+    """
+    The typed relationships behind the edges of a simple graph, stored CSR-style: the
+    relationships of edge pair `p` are rows offsets[p]:offsets[p + 1] of the columns
+    (type id, strength, direction, description list). The graph keeps one weighted edge
+    per entity pair, which is all clustering and traversal need; this table is read only
+    when LLM context is built.
 
-    return {
-        "entities": list(unique_entities.values()),
-        "relationships": list(unique_relationships.values())
-    }
+    `forward` is True where the relationship runs from the pair's lower vertex id to its
+    higher one. Deleting vertices renumbers the rest in order, so it stays valid on
+    pruned graphs and induced subgraphs.
+    """
+    def __init__(self, offsets, type_ids, type_names: list, strengths, forward, descriptions: list):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.type_ids = np.asarray(type_ids, dtype=np.int32)
+        self.type_names = type_names
+        self.strengths = np.asarray(strengths, dtype=np.float64)
+        self.forward = np.asarray(forward, dtype=bool)
+        self.descriptions = descriptions
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.type_ids.nbytes + self.strengths.nbytes + self.forward.nbytes
+
+    def rows(self, pair: int) -> range:
+        return range(int(self.offsets[pair]), int(self.offsets[pair + 1]))
+
+    def relationships(self, pair: int, u: int, v: int) -> list:
+        """
+        The relationships of one pair whose endpoints are vertices `u` and `v`, as dicts
+        with source and target vertex ids, type, strength and description.
+        """
+        low, high = min(u, v), max(u, v)
+        return [{
+            "source": low if self.forward[row] else high,
+            "target": high if self.forward[row] else low,
+            "type": self.type_names[self.type_ids[row]],
+            "strength": float(self.strengths[row]),
+            "description": self.descriptions[row],
+        } for row in self.rows(pair)]
+
+    def take(self, pairs) -> 'RelationshipTable':
+        """
+        A table holding only the given pairs, renumbered 0..len(pairs)-1 in that order.
+        """
+        pairs = np.asarray(pairs, dtype=np.int64)
+        starts = self.offsets[:-1][pairs]
+        lengths = self.offsets[1:][pairs] - starts
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        rows = (np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])).astype(np.int64)
+        return RelationshipTable(offsets, self.type_ids[rows], self.type_names, self.strengths[rows],
+                                 self.forward[rows], [self.descriptions[row] for row in rows.tolist()])
 
-def build_graph(json_path: str) -> ig.Graph:
+def edge_relationships(graph: ig.Graph, edge: ig.Edge) -> list:
     """
-    Builds an igraph.Graph directly from the JSON data.
+    The typed relationships behind `edge` (see RelationshipTable.relationships). Graphs
+    without a table, e.g. built by hand with one edge per relationship, are read from the
+    edge's own 'type' and 'description' attributes.
     """
-    data = clean_json(json_path)
-    
-    g = ig.Graph(directed=False) 
-    
-    entities = data['entities']
-    num_vertices = len(entities)
-    g.add_vertices(num_vertices)
-    
-    name_to_index = {entity['name']: i for i, entity in enumerate(entities)}
-    
-    g.vs['name'] = [e['name'] for e in entities]
-    g.vs['type'] = [e['type'] for e in entities]
-    g.vs['description'] = [e['description'] for e in entities]
-    
-    edges = []
-    weights = []
-    edge_types = []
-    edge_descriptions = []
-    
-    for rel in data['relationships']:
-        source = rel['source']
-        target = rel['target']
-        
-        if source in name_to_index and target in name_to_index:
-            edges.append((name_to_index[source], name_to_index[target]))
-            weights.append(rel['strength'])
-            edge_types.append(rel['type'])
-            edge_descriptions.append(rel['description'])
-            
-    g.add_edges(edges)
-    g.es['weight'] = weights
-    g.es['type'] = edge_types
-    g.es['description'] = edge_descriptions
-    
+    table = graph['relationships'] if 'relationships' in graph.attributes() else None
+    if table is not None:
+        return table.relationships(edge['pair'], edge.source, edge.target)
+    attributes = edge.attributes()
+    return [{
+        "source": edge.source,
+        "target": edge.target,
+        "type": attributes.get('type'),
+        "strength": attributes.get('weight', 1.0),
+        "description": attributes.get('description') or [],
+    }]
+
+class GraphStore:
+    """
+    Entity graph that is updated in place as new extraction results arrive.
+
+    Uses the same merge semantics as clean_json (entities resolved through an EntityIndex,
+    relationships deduplicated by source/type/target, descriptions unioned, max strength
+    kept) but keeps the index between batches, so adding a document only costs the size
+    of that document's results. Edges are built from integer entity-id pairs.
+
+    The graph is simple: one edge per entity pair, weighted by the summed strength of the
+    pair's typed relationships (multi-edges would be summed by Leiden anyway). The typed
+    relationships themselves live in a RelationshipTable, built on demand (see
+    `relationships`) and attached to the graphs to_graph returns.
+
+    Vertex 'description' attributes and the table's descriptions are the index's own
+    lists (not copies), so they stay in sync with later merges without being duplicated.
+    """
+    def __init__(self, normalizer: NameNormalizer = None):
+        self.graph = ig.Graph(directed=False)
+        self.graph.vs['name'] = []
+        self.graph.vs['type'] = []
+        self.graph.vs['description'] = []
+
+        self.index = EntityIndex(normalizer)
+        self._vertex = array('q')   # entity id -> vertex id (-1 if not a declared entity yet)
+        self._edge = array('q')     # relationship id -> edge id (-1 until both endpoints are vertices)
+        self._pending = set()       # relationship ids still waiting for an endpoint
+        self._pair_edge = {}        # (lower, higher) vertex id -> edge id
+        self._edge_rels = []        # edge id -> relationship ids, in the order they were resolved
+        self._table = None          # RelationshipTable of the current edges, None once stale
+
+    @classmethod
+    def from_json(cls, json_path: str, normalizer: NameNormalizer = None, workers: int = 1):
+        """
+        A store over extraction results in any form load_entity_index reads. JSONL is
+        merged shard by shard, so parsing memory peaks with a shard, not the whole file.
+        """
+        store = cls(normalizer)
+        store.index = load_entity_index(json_path, normalizer, workers)
+        store._sync(set(range(len(store.index))), set(range(len(store.index.rel_source))), 0)
+        return store
+
+    def add_chunks(self, chunks) -> set:
+        """
+        Merges a batch of chunk results (the extractor's output format) into the graph.
+        New vertices and edges are appended in bulk. Returns the names of all entities
+        that were added or whose vertex or incident edges changed.
+        """
+        known_rels = len(self._edge)
+        return self._sync(*self.index.add_chunks(chunks), known_rels)
+
+    def add_tables(self, tables: dict) -> set:
+        """
+        Like add_chunks, for a partial table built elsewhere (see EntityIndex.merge_tables).
+        """
+        known_rels = len(self._edge)
+        return self._sync(*self.index.merge_tables(tables), known_rels)
+
+    def _sync(self, changed_entities: set, changed_rels: set, known_rels: int) -> set:
+        g = self.graph
+        index = self.index
+        self._vertex.extend([-1] * (len(index) - len(self._vertex)))
+        self._edge.extend([-1] * (len(index.rel_source) - known_rels))
+        self._pending.update(range(known_rels, len(index.rel_source)))
+
+        changed = set()  # vertex ids
+
+        # --- Append new vertices in one call (existing ones share the index's description lists) ---
+        new_entities = []
+        for entity_id in sorted(changed_entities):
+            vid = self._vertex[entity_id]
+            if vid >= 0:
+                changed.add(vid)
+            elif index.declared[entity_id]:
+                new_entities.append(entity_id)
+
+        if new_entities:
+            first = g.vcount()
+            g.add_vertices(len(new_entities), attributes={
+                'name': [index.names[e] for e in new_entities],
+                'type': [index.types[e] for e in new_entities],
+                'description': [index.descriptions[e] for e in new_entities],
+            })
+            for offset, entity_id in enumerate(new_entities):
+                self._vertex[entity_id] = first + offset
+                changed.add(first + offset)
+
+        # --- Attach relationships to their pair's edge; new pairs are appended in one call ---
+        new_pairs = []
+        touched = set()  # edge ids whose weight changes
+        # New vertices can complete relationships seen in earlier batches
+        candidates = changed_rels | self._pending if new_entities else changed_rels
+        for rel_id in sorted(candidates):
+            edge_id = self._edge[rel_id]
+            if edge_id < 0:
+                source = self._vertex[index.rel_source[rel_id]]
+                target = self._vertex[index.rel_target[rel_id]]
+                if source < 0 or target < 0:
+                    continue
+                pair = (min(source, target), max(source, target))
+                edge_id = self._pair_edge.get(pair)
+                if edge_id is None:
+                    edge_id = g.ecount() + len(new_pairs)
+                    self._pair_edge[pair] = edge_id
+                    self._edge_rels.append([])
+                    new_pairs.append(pair)
+                self._edge_rels[edge_id].append(rel_id)
+                self._edge[rel_id] = edge_id
+                self._pending.discard(rel_id)
+            touched.add(edge_id)
+
+        if new_pairs:
+            first = g.ecount()
+            g.add_edges(new_pairs, attributes={
+                'weight': [0.0] * len(new_pairs),
+                'pair': list(range(first, first + len(new_pairs))),
+            })
+        if touched:
+            self._table = None
+            edge_ids = sorted(touched)
+            strength = index.rel_strength
+            g.es.select(edge_ids)['weight'] = [sum(strength[r] for r in self._edge_rels[e]) for e in edge_ids]
+            for edge_id in edge_ids:
+                changed.update(g.es[edge_id].tuple)
+
+        return {g.vs[vid]['name'] for vid in changed}
+
+    @property
+    def relationships(self) -> RelationshipTable:
+        """
+        The RelationshipTable of the store's graph (pair = edge id). Rebuilt on first use
+        after relationships were added, so batches that are never queried do not pay for it.
+        """
+        if self._table is None:
+            index = self.index
+            rel_ids = [r for rels in self._edge_rels for r in rels]
+            offsets = np.zeros(len(self._edge_rels) + 1, dtype=np.int64)
+            np.cumsum([len(rels) for rels in self._edge_rels], out=offsets[1:])
+            vertex = self._vertex
+            forward = [vertex[index.rel_source[r]] <= vertex[index.rel_target[r]] for r in rel_ids]
+            self._table = RelationshipTable(
+                offsets,
+                [index.rel_type[r] for r in rel_ids],
+                list(index.rel_type_names),
+                [index.rel_strength[r] for r in rel_ids],
+                forward,
+                [index.rel_descriptions[r] for r in rel_ids],
+            )
+        return self._table
+
+    def to_graph(self, min_component_size: int = 3) -> ig.Graph:
+        """
+        Returns a copy of the graph with components smaller than `min_component_size` removed,
+        as build_graph produces, with its RelationshipTable compacted to the surviving edges.
+        The store keeps the full graph so later batches can connect them.
+        """
+        graph = prune_small_components(self.graph.copy(), min_component_size)
+        graph['relationships'] = self.relationships.take(graph.es['pair'] if graph.ecount() else [])
+        graph.es['pair'] = list(range(graph.ecount()))
+        return graph
+
+def prune_small_components(g: ig.Graph, min_component_size: int = 3) -> ig.Graph:
     # --- Optimization: Remove small disconnected components ---
     # Many entities might be isolated or form tiny islands (e.g. size 1 or 2).
     # These create noise and unnecessary communities.
@@ -115,7 +289,7 @@ def build_graph(json_path: str) -> ig.Graph:
     # This removes isolated nodes and pairs, keeping only more significant structures.
     to_delete = []
     for subgraph_indices in components:
-        if len(subgraph_indices) < 3:
+        if len(subgraph_indices) < min_component_size:
             to_delete.extend(subgraph_indices)
             
     if to_delete:
@@ -123,68 +297,419 @@ def build_graph(json_path: str) -> ig.Graph:
         
     return g
 
-def find_communities(graph: ig.Graph):
+@telemetry.timed("build_graph")
+def build_graph(json_path: str, workers: int = 1) -> ig.Graph:
+    """
+    Builds an igraph.Graph directly from the extraction results (JSON, or JSONL shards
+    parsed by `workers` processes).
+    For adding new results to an existing graph without a rebuild, use GraphStore.
+    """
+    return GraphStore.from_json(json_path, workers=workers).to_graph()
+
+class Communities(dict):
+    """
+    {node_name: {'level_1': int, 'level_0': int}} as returned by find_communities
+    (a top-down hierarchy may have more levels: level_0 is always the coarsest).
+    `changed` maps each level to the community ids whose membership differs from the
+    `previous` assignment passed in (every id on a from-scratch run).
+    `index` is the CommunityIndex over the graph the communities were computed on.
+    """
+    def __init__(self, *args, changed: dict = None, index=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.changed = changed or {}
+        self.index = index
+
+class CommunityIndex:
+    """
+    Precomputed level -> community_id -> vertex-id array index over one graph, with
+    community sizes, boundary edges and an LRU cache of extracted subgraphs.
+
+    Built once in O(V + E), so walking every community costs O(V + E) in total instead
+    of a scan over the whole communities dict per community.
+    """
+    def __init__(self, graph: ig.Graph, communities: dict, cache_size: int = 256):
+        self.graph = graph
+        self.cache_size = cache_size
+        self._subgraphs = OrderedDict()
+
+        names = graph.vs['name'] if graph.vcount() else []
+        levels = sorted({level for comms in communities.values() for level in comms})
+        edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+
+        self.members = {}    # level -> {community_id: vertex ids}
+        self.sizes = {}      # level -> {community_id: member count}
+        self.boundary = {}   # level -> {community_id: ids of edges leaving the community}
+        for level in levels:
+            membership = np.asarray([communities.get(name, {}).get(level, -1) for name in names], dtype=np.int64)
+            self.members[level] = self._group(membership, np.arange(len(names), dtype=np.int64))
+            self.sizes[level] = {cid: len(vids) for cid, vids in self.members[level].items()}
+
+            ends = membership[edges] if len(edges) else np.zeros((0, 2), dtype=np.int64)
+            crossing = np.flatnonzero(ends[:, 0] != ends[:, 1])
+            # Each crossing edge belongs to the boundary of both of its communities
+            owners = np.concatenate([ends[crossing, 0], ends[crossing, 1]])
+            edge_ids = np.concatenate([crossing, crossing])
+            boundary = self._group(owners, edge_ids)
+            self.boundary[level] = {cid: boundary.get(cid, np.zeros(0, dtype=np.int64)) for cid in self.members[level]}
+
+    @staticmethod
+    def _group(keys, values) -> dict:
+        # Stable sort by key, then split into one array per key (unassigned vertices have key -1)
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order]
+        unique, starts = np.unique(keys, return_index=True)
+        groups = np.split(values, starts[1:])
+        return {int(k): g for k, g in zip(unique, groups) if k >= 0}
+
+    def levels(self) -> list:
+        return list(self.members)
+
+    def community_ids(self, level: str) -> list:
+        return list(self.members.get(level, {}))
+
+    def vertices(self, level: str, community_id: int):
+        return self.members.get(level, {}).get(community_id, np.zeros(0, dtype=np.int64))
+
+    def subgraph(self, level: str, community_id: int) -> ig.Graph:
+        key = (level, community_id)
+        cached = self._subgraphs.get(key)
+        if cached is not None:
+            self._subgraphs.move_to_end(key)
+            return cached
+
+        subgraph = self.graph.subgraph(self.vertices(level, community_id).tolist())
+        self._subgraphs[key] = subgraph
+        if len(self._subgraphs) > self.cache_size:
+            self._subgraphs.popitem(last=False)
+        return subgraph
+
+# Below this many edges a Leiden run is cheaper than shipping it to a worker process
+_PARALLEL_MIN_EDGES = 20_000
+
+# In a pool worker: (shared memory name, graph) of the graph last attached to
+_worker_graph = None
+
+def _partition(graph: ig.Graph, weights, seed: int = 0, resolution: float = 1.0,
+               initial_membership=None, is_fixed=None) -> tuple:
+    """
+    One seeded Leiden run with the RB configuration model (resolution 1.0 is modularity).
+    A warm start runs until the partition is stable. Returns (membership, modularity).
+    """
+    partition = leidenalg.RBConfigurationVertexPartition(
+        graph, initial_membership=initial_membership, weights=weights, resolution_parameter=resolution
+    )
+    optimiser = leidenalg.Optimiser()
+    optimiser.set_rng_seed(seed)
+    optimiser.optimise_partition(partition, n_iterations=2 if initial_membership is None else -1,
+                                 is_membership_fixed=is_fixed)
+    # Modularity rather than the resolution-dependent quality, so runs at different resolutions compare
+    quality = graph.modularity(partition.membership, weights=weights) if graph.ecount() else 0.0
+    return partition.membership, quality
+
+def _share_graph(graph: ig.Graph) -> tuple:
+    """
+    Copies the edge list and weights into one shared memory block. Returns the block and
+    the (name, vertex count, edge count) handle pool workers attach with.
+    """
+    edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    weights = np.asarray(graph.es['weight'] if graph.ecount() else [], dtype=np.float64)
+    block = shared_memory.SharedMemory(create=True, size=max(1, edges.nbytes + weights.nbytes))
+    np.ndarray(edges.shape, dtype=np.int64, buffer=block.buf)[:] = edges
+    np.ndarray(weights.shape, dtype=np.float64, buffer=block.buf, offset=edges.nbytes)[:] = weights
+    return block, (block.name, graph.vcount(), graph.ecount())
+
+def _attach_graph(handle: tuple) -> ig.Graph:
+    # Rebuilt once per worker and graph, not once per run
+    global _worker_graph
+    name, vcount, ecount = handle
+    if _worker_graph is None or _worker_graph[0] != name:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            edges = np.ndarray((ecount, 2), dtype=np.int64, buffer=block.buf)
+            weights = np.ndarray(ecount, dtype=np.float64, buffer=block.buf, offset=edges.nbytes)
+            graph = ig.Graph(n=vcount, edges=edges)
+            graph.es['weight'] = weights.tolist()
+            del edges, weights
+        finally:
+            block.close()
+        _worker_graph = (name, graph)
+    return _worker_graph[1]
+
+def _leiden_task(handle: tuple, vids, seed: int, resolution: float) -> tuple:
+    graph = _attach_graph(handle)
+    if vids is not None:
+        graph = graph.subgraph(vids)
+    return _partition(graph, graph.es['weight'], seed, resolution)
+
+class _LeidenRunner:
+    """
+    Partitions a graph, or induced subgraphs of it, once per candidate (seed, resolution)
+    and keeps the membership with the highest modularity. Ties go to the earlier candidate,
+    so the result depends on the seeds only, never on scheduling or the number of workers.
+
+    With more than one worker (and a large enough graph) the runs go to a process pool;
+    workers read the edge list from shared memory instead of unpickling the graph per run.
+    """
+    def __init__(self, graph: ig.Graph, candidates: list, workers: int = 1):
+        self.graph = graph
+        self.candidates = candidates
+        self.workers = workers or 1
+        self._block = None
+        self._handle = None
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def best(self, groups: list) -> list:
+        """
+        The best membership of each group of (sorted) vertex ids, None meaning the whole graph.
+        """
+        runs = [(vids, seed, resolution) for vids in groups for seed, resolution in self.candidates]
+        if self.workers > 1 and len(runs) > 1 and self.graph.ecount() >= _PARALLEL_MIN_EDGES:
+            if self._pool is None:
+                self._block, self._handle = _share_graph(self.graph)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self._pool.submit(_leiden_task, self._handle, *run) for run in runs]
+            results = [future.result() for future in futures]
+        else:
+            results = []
+            for vids in groups:
+                graph = self.graph if vids is None else self.graph.subgraph(vids)
+                results.extend(_partition(graph, graph.es['weight'], seed, resolution)
+                               for seed, resolution in self.candidates)
+        telemetry.inc("leiden_runs_total", len(runs))
+
+        k = len(self.candidates)
+        # max keeps the first of equal candidates
+        return [max(results[i * k:(i + 1) * k], key=lambda result: result[1])[0] for i in range(len(groups))]
+
+def _warm_start(labels: list) -> list:
+    """
+    Dense initial membership from previous labels; vertices without one start as singletons.
+    """
+    dense = {}
+    initial = []
+    for label in labels:
+        key = ('old', label) if label is not None else ('new', len(initial))
+        initial.append(dense.setdefault(key, len(dense)))
+    return initial
+
+def _stable_ids(new_labels: list, old_labels: list) -> list:
+    """
+    Relabels communities so each new community keeps the id of the previous community it
+    overlaps most (each old id is reused at most once). Unmatched communities get fresh
+    ids above every previous id, so per-community artifacts keyed by id stay valid.
+    """
+    overlap = {}
+    for new, old in zip(new_labels, old_labels):
+        if old is not None:
+            overlap[(new, old)] = overlap.get((new, old), 0) + 1
+
+    mapping = {}
+    used = set()
+    for (new, old), _ in sorted(overlap.items(), key=lambda item: (-item[1], item[0])):
+        if new not in mapping and old not in used:
+            mapping[new] = old
+            used.add(old)
+
+    next_id = max((o for o in old_labels if o is not None), default=-1) + 1
+    for new in new_labels:
+        if new not in mapping:
+            mapping[new] = next_id
+            next_id += 1
+    return [mapping[new] for new in new_labels]
+
+def _changed_ids(names: list, new_labels: list, previous: dict, level: str) -> set:
+    def members(pairs):
+        groups = {}
+        for name, label in pairs:
+            if label is not None:
+                groups.setdefault(label, set()).add(name)
+        return groups
+
+    before = members((name, comms.get(level)) for name, comms in previous.items())
+    after = members(zip(names, new_labels))
+    return {cid for cid in before.keys() | after.keys() if before.get(cid) != after.get(cid)}
+
+def _hierarchical_communities(graph: ig.Graph, previous: dict, runner: _LeidenRunner,
+                              max_cluster_size: int, max_levels: int = None) -> Communities:
+    """
+    Top-down hierarchy: level_0 partitions the whole graph, and each further level splits
+    every community of the level above that has more than `max_cluster_size` members
+    (smaller ones carry over with a new id), until none is too large, Leiden cannot split
+    what is left, or there are `max_levels` levels.
+    """
+    names = graph.vs['name']
+    membership = np.asarray(runner.best([None])[0], dtype=np.int64)
+    levels = [membership]
+    final = set()   # communities Leiden could not split
+    while max_levels is None or len(levels) < max_levels:
+        groups = CommunityIndex._group(membership, np.arange(len(membership), dtype=np.int64))
+        split = [cid for cid, vids in groups.items() if len(vids) > max_cluster_size and cid not in final]
+        parts = dict(zip(split, runner.best([groups[cid].tolist() for cid in split]))) if split else {}
+        if not any(len(set(labels)) > 1 for labels in parts.values()):
+            break
+
+        membership = np.empty_like(membership)
+        next_final = set()
+        next_id = 0
+        for cid, vids in groups.items():
+            unique, dense = np.unique(parts.get(cid, np.zeros(len(vids), dtype=np.int64)), return_inverse=True)
+            membership[vids] = next_id + dense
+            if len(unique) == 1 and (cid in final or cid in parts):
+                next_final.add(next_id)
+            next_id += len(unique)
+        final = next_final
+        levels.append(membership)
+
+    columns = {}
+    changed_ids = {}
+    for depth, labels in enumerate(levels):
+        level = f'level_{depth}'
+        labels = labels.tolist()
+        if previous is None:
+            changed_ids[level] = set(labels)
+        else:
+            labels = _stable_ids(labels, [previous.get(name, {}).get(level) for name in names])
+            changed_ids[level] = _changed_ids(names, labels, previous, level)
+        columns[level] = labels
+
+    communities = Communities(changed=changed_ids)
+    for i, name in enumerate(names):
+        communities[name] = {level: labels[i] for level, labels in columns.items()}
+    return communities
+
+@telemetry.timed("find_communities")
+def find_communities(graph: ig.Graph, previous: dict = None, changed: set = None, max_cluster_size: int = None,
+                     max_levels: int = None, seeds: int = 1, resolutions: list = None, seed: int = 0,
+                     workers: int = 1):
     """
     Detect communities using Leiden algorithm hierarchically (2 levels).
     Returns a dictionary: {node_name: {'level_1': int, 'level_0': int}}
     Level 1: Detailed communities (base level)
     Level 0: Super-communities (clusters of Level 1 communities)
+
+    With `max_cluster_size` the hierarchy is built top-down instead and can be deeper:
+    level_0 partitions the whole graph and every community larger than the cap is split
+    again at the next level (see _hierarchical_communities), up to `max_levels` levels.
+
+    Every partition from scratch is run once per seed (`seed` .. `seed + seeds - 1`) and
+    resolution (default [1.0]) and the one with the best modularity is kept, so results
+    are reproducible. With `workers` > 1 the runs of large graphs go to a process pool.
+
+    Incremental mode: pass the `previous` result and the names of `changed` entities
+    (e.g. from GraphStore.add_chunks). Leiden is seeded with the previous membership and
+    only changed vertices, new vertices and their neighbours may move (all vertices if
+    `changed` is None); a warm start uses the first seed and resolution only. Community ids
+    are mapped back to the previous ids by overlap, and the returned Communities.changed
+    lists the communities that actually changed. The top-down hierarchy is always
+    recomputed from scratch; only its ids are mapped to the previous ones.
     """
+    names = graph.vs['name']
+    candidates = [(seed + i, resolution) for resolution in (resolutions or [1.0]) for i in range(max(1, seeds))]
+
+    if max_cluster_size is not None:
+        with _LeidenRunner(graph, candidates, workers) as runner:
+            communities = _hierarchical_communities(graph, previous, runner, max_cluster_size, max_levels)
+        communities.index = CommunityIndex(graph, communities)
+        return communities
+
     # --- Level 1: Base Communities ---
-    partition_1 = leidenalg.find_partition(
-        graph, 
-        leidenalg.ModularityVertexPartition, 
-        weights=graph.es['weight']
-    )
-    
-    # Membership list for Level 1 (node_idx -> comm_id)
-    membership_1 = partition_1.membership
+    if previous is None:
+        with _LeidenRunner(graph, candidates, workers) as runner:
+            membership_1 = runner.best([None])[0]
+    else:
+        old_1 = [previous.get(name, {}).get('level_1') for name in names]
+        if changed is None:
+            movable = set(range(graph.vcount()))
+        else:
+            moved = [v for v, name in enumerate(names) if name in changed or name not in previous]
+            movable = set(moved)
+            for neighbours in graph.neighborhood(moved, order=1):
+                movable.update(neighbours)
+        is_fixed = [v not in movable for v in range(graph.vcount())]
+        membership_1 = _partition(graph, graph.es['weight'], seed, candidates[0][1], _warm_start(old_1), is_fixed)[0]
+        membership_1 = _stable_ids(membership_1, old_1)
     
     # --- Level 0: Super Communities ---
-    # Create a graph where nodes are Level 1 communities
-    # contract_vertices merges nodes based on membership
-    # simplify combines multiple edges into one (summing weights)
-    
-    # We need a copy because contract_vertices modifies the graph in-place (or returns a modified one, but let's be safe)
-    # Actually contract_vertices keeps edge attributes but we need to sum them.
-    
-    # Efficient way in igraph:
-    # 1. Contract vertices
-    g_level_0 = graph.copy()
-    g_level_0.contract_vertices(membership_1)
-    
-    # 2. Simplify to merge edges and sum weights
-    # combine_edges={'weight': sum} tells it to sum the 'weight' attribute
-    # We drop other attributes like 'type' or 'description' as they don't make sense for aggregated edges
-    g_level_0.simplify(combine_edges={'weight': sum})
-    
+    # A graph whose nodes are the level 1 communities, one edge per connected pair with the
+    # summed weight; edges inside a community are dropped. Built from the edge arrays, so
+    # the (possibly large) entity graph is never copied.
+    # Stable ids from an incremental run may have gaps, so communities get dense ids 0..k-1
+    level_1_ids = sorted(set(membership_1))
+    dense_index = {cid: i for i, cid in enumerate(level_1_ids)}
+    dense_1 = [dense_index[cid] for cid in membership_1]
+    pairs, weights, _ = _aggregate_edges(graph, np.asarray(dense_1, dtype=np.int64), len(level_1_ids))
+    g_level_0 = ig.Graph(n=len(level_1_ids), edges=pairs.tolist())
+    g_level_0.es['weight'] = weights.tolist()
+
     # Run Leiden on this coarser graph
-    partition_0 = leidenalg.find_partition(
-        g_level_0,
-        leidenalg.ModularityVertexPartition,
-        weights=g_level_0.es['weight']
-    )
-    
-    membership_0 = partition_0.membership
+    if previous is None:
+        with _LeidenRunner(g_level_0, candidates, workers) as runner:
+            membership_0 = runner.best([None])[0]
+        node_level_0 = [membership_0[d] for d in dense_1] # The super-community of the level 1 community
+        changed_ids = {
+            'level_1': set(membership_1),
+            'level_0': set(node_level_0)
+        }
+    else:
+        changed_1 = _changed_ids(names, membership_1, previous, 'level_1')
+
+        # Seed each level 1 community with the super-community most of its members had before
+        votes = {}
+        for d, name in zip(dense_1, names):
+            old = previous.get(name, {}).get('level_0')
+            if old is not None:
+                votes.setdefault(d, {}).setdefault(old, 0)
+                votes[d][old] += 1
+        old_0 = [max(votes[d], key=lambda o: (votes[d][o], -o)) if d in votes else None
+                 for d in range(len(level_1_ids))]
+        is_fixed = [cid not in changed_1 for cid in level_1_ids]
+        membership_0 = _partition(g_level_0, g_level_0.es['weight'], seed, candidates[0][1],
+                                  _warm_start(old_0), is_fixed)[0]
+
+        node_level_0 = _stable_ids(
+            [membership_0[d] for d in dense_1],
+            [previous.get(name, {}).get('level_0') for name in names]
+        )
+        changed_ids = {
+            'level_1': changed_1,
+            'level_0': _changed_ids(names, node_level_0, previous, 'level_0')
+        }
     
     # --- Map back to nodes ---
-    communities = {}
-    for i, node_vertex in enumerate(graph.vs):
-        node_name = node_vertex['name']
-        level_1_id = membership_1[i]
-        level_0_id = membership_0[level_1_id] # The super-community of the level 1 community
-        
+    communities = Communities(changed=changed_ids)
+    for i, node_name in enumerate(names):
         communities[node_name] = {
-            'level_1': level_1_id,
-            'level_0': level_0_id
+            'level_1': membership_1[i],
+            'level_0': node_level_0[i]
         }
-        
+
+    communities.index = CommunityIndex(graph, communities)
     return communities
 
 def get_community_subgraph(graph: ig.Graph, communities: dict, community_id: int, level: str = 'level_1'):
     """
     Returns a subgraph containing only the vertices of a specific community.
+    Uses the CommunityIndex attached by find_communities when it was built for this graph.
     """
+    index = getattr(communities, 'index', None)
+    if index is not None and index.graph is graph:
+        return index.subgraph(level, community_id)
+
     # Find all node names that belong to this community_id at this level
     nodes_in_community = [
         name for name, comms in communities.items() 
@@ -194,47 +719,310 @@ def get_community_subgraph(graph: ig.Graph, communities: dict, community_id: int
     # igraph can select vertices by name if the 'name' attribute is set
     return graph.subgraph(nodes_in_community)
 
-def visualize_graph(graph: ig.Graph, communities: dict, output_path: str, level: str = 'level_1'):
+# --- Layout, rendering and export ---
+
+@contextmanager
+def _seeded(seed: int):
+    # igraph's force-directed layouts draw from Python's random module
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+def _normalized(coords, radius: float):
+    # Centers a layout on the origin and scales it to fit in a disc of `radius`
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    coords = coords - coords.mean(axis=0)
+    extent = np.sqrt((coords ** 2).sum(axis=1)).max() if len(coords) else 0.0
+    return coords * (radius / extent) if extent > 0 else coords
+
+def _separate(centers, radii, iterations: int = 100):
+    # Pushes overlapping discs apart pairwise (O(k^2) per iteration, k = siblings; skipped for
+    # very many siblings), keeping the force layout's arrangement instead of scaling it up
+    if len(centers) > 1000:
+        return centers
+    centers = centers.copy()
+    needed = (radii[:, None] + radii[None, :]) * 1.05
+    np.fill_diagonal(needed, 0.0)
+    order = np.arange(len(centers))
+    side = np.sign(order[:, None] - order[None, :]).astype(np.float64)
+    for _ in range(iterations):
+        delta = centers[:, None, :] - centers[None, :, :]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=2)), 1e-9)
+        overlap = np.clip(needed - distance, 0.0, None)
+        if not overlap.any():
+            break
+        # Coincident centers are pushed apart along the x axis, in opposite directions
+        delta[..., 0] = np.where(distance <= 1e-9, side, delta[..., 0])
+        centers += 0.5 * ((overlap / distance)[:, :, None] * delta).sum(axis=1)
+    return centers
+
+def _force_layout(graph: ig.Graph, weights=None, seed: int = 0):
+    with _seeded(seed):
+        return graph.layout_fruchterman_reingold(weights=weights, niter=200).coords
+
+@telemetry.timed("layout")
+def compute_layout(graph: ig.Graph, communities: dict = None, seed: int = 0):
+    """
+    Computes 2D vertex positions as a (vcount, 2) array. Deterministic for a given seed.
+
+    With communities the layout is built top-down through the hierarchy: at each level the
+    sibling communities are placed by a force-directed layout of their aggregated graph and
+    spread apart as non-overlapping discs (radius ~ sqrt(members)), and only the vertices of
+    one finest-level community are laid out together. Cost is the sum over communities
+    instead of quadratic in the whole graph, and the picture shows the community structure.
+    Without communities the whole graph gets one Fruchterman-Reingold layout.
+    """
+    if graph.vcount() == 0:
+        return np.zeros((0, 2))
+    if not communities:
+        return _normalized(_force_layout(graph, 'weight', seed), np.sqrt(graph.vcount()))
+
+    index = getattr(communities, 'index', None)
+    if index is None or index.graph is not graph:
+        index = CommunityIndex(graph, communities)
+    levels = sorted(index.levels(), key=lambda level: int(level.rsplit('_', 1)[1]))
+    # Vertices without an assignment at a level form a community of their own there
+    membership = []
+    for level in levels:
+        row = np.arange(graph.vcount(), dtype=np.int64) + max(index.sizes[level], default=-1) + 1
+        for cid, vids in index.members[level].items():
+            row[vids] = cid
+        membership.append(row)
+    edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    weights = np.asarray(graph.es['weight'] if graph.ecount() else [], dtype=np.float64)
+    positions = np.zeros((graph.vcount(), 2))
+
+    def place(vids, depth: int):
+        # Lays out `vids` in place around the origin and returns the radius they occupy
+        radius = float(np.sqrt(len(vids)))
+        if len(vids) == 1:
+            positions[vids] = 0.0
+            return 1.0
+        if depth == len(levels):
+            subgraph = graph.subgraph(vids.tolist())
+            positions[vids] = _normalized(_force_layout(subgraph, 'weight', seed), radius)
+            return radius
+
+        keys, groups = np.unique(membership[depth][vids], return_inverse=True)
+        if len(keys) == 1:
+            return place(vids, depth + 1)
+        children = [vids[groups == i] for i in range(len(keys))]
+        radii = np.asarray([place(child, depth + 1) for child in children])
+
+        # Aggregated graph of the sibling communities: one edge per pair, weights summed
+        inside = np.zeros(graph.vcount(), dtype=bool)
+        inside[vids] = True
+        mask = inside[edges[:, 0]] & inside[edges[:, 1]] if len(edges) else np.zeros(0, dtype=bool)
+        ends = np.searchsorted(keys, membership[depth][edges[mask]])
+        crossing = ends[:, 0] != ends[:, 1]
+        pairs = np.sort(ends[crossing], axis=1)
+        unique, inverse = np.unique(pairs[:, 0] * len(keys) + pairs[:, 1], return_inverse=True)
+        aggregated = ig.Graph(n=len(keys), edges=np.stack([unique // len(keys), unique % len(keys)], axis=1).tolist())
+        aggregated.es['weight'] = np.bincount(inverse, weights=weights[mask][crossing], minlength=len(unique)).tolist()
+
+        # Summed weights span orders of magnitude; damped so heavy pairs do not collapse together
+        weights_log = np.log1p(aggregated.es['weight']).tolist()
+        centers = _separate(_normalized(_force_layout(aggregated, weights_log, seed), radius), radii)
+        for child, center in zip(children, centers):
+            positions[child] += center
+        return float(np.max(np.sqrt((centers ** 2).sum(axis=1)) + radii))
+
+    place(np.arange(graph.vcount(), dtype=np.int64), 0)
+    return positions
+
+def get_layout(graph: ig.Graph, communities: dict = None):
+    """
+    The graph's layout, computed on first use and cached on the graph (graph['layout']),
+    so every level and view of the same graph reuses it. Snapshots persist it.
+    """
+    if 'layout' in graph.attributes():
+        layout = graph['layout']
+        if layout is not None and len(layout) == graph.vcount():
+            return layout
+    layout = compute_layout(graph, communities)
+    graph['layout'] = layout
+    return layout
+
+def _aggregate_edges(graph: ig.Graph, membership, k: int) -> tuple:
+    """
+    Contracts the edges of `graph` by `membership` (group 0..k-1 per vertex, -1 for none):
+    the sorted (group, group) pairs of edges between two different groups, with their
+    summed weight and edge count.
+    """
+    edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    weights = np.asarray(graph.es['weight'] if graph.ecount() else [], dtype=np.float64)
+    ends = membership[edges]
+    keep = (ends[:, 0] >= 0) & (ends[:, 1] >= 0) & (ends[:, 0] != ends[:, 1])
+    pairs = np.sort(ends[keep], axis=1)
+    k = max(k, 1)
+    unique, inverse = np.unique(pairs[:, 0] * k + pairs[:, 1], return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return (np.stack([unique // k, unique % k], axis=1),
+            np.bincount(inverse, weights=weights[keep], minlength=len(unique)),
+            np.bincount(inverse, minlength=len(unique)))
+
+def community_graph(graph: ig.Graph, communities: dict, level: str = 'level_1') -> ig.Graph:
+    """
+    Aggregated view of one level: a vertex per community ('community', 'size' = member
+    count, 'x'/'y' = centroid of the members in the cached layout) and one edge per pair of
+    connected communities ('weight' = summed weight, 'count' = number of edges).
+    """
+    index = getattr(communities, 'index', None)
+    if index is None or index.graph is not graph:
+        index = CommunityIndex(graph, communities)
+    members = index.members.get(level, {})
+    ids = sorted(members)
+    layout = get_layout(graph, communities)
+
+    membership = np.full(graph.vcount(), -1, dtype=np.int64)
+    for position, cid in enumerate(ids):
+        membership[members[cid]] = position
+    pairs, weights, counts = _aggregate_edges(graph, membership, len(ids))
+
+    aggregated = ig.Graph(n=len(ids), edges=pairs.tolist())
+    aggregated.vs['community'] = ids
+    aggregated.vs['size'] = [len(members[cid]) for cid in ids]
+    centroids = [layout[members[cid]].mean(axis=0) for cid in ids]
+    aggregated.vs['x'] = [float(c[0]) for c in centroids]
+    aggregated.vs['y'] = [float(c[1]) for c in centroids]
+    aggregated.es['weight'] = weights.tolist()
+    aggregated.es['count'] = counts.tolist()
+    return aggregated
+
+@telemetry.timed("visualize_graph")
+def visualize_graph(graph: ig.Graph, communities: dict, output_path: str, level: str = 'level_1',
+                    aggregate: bool = None, max_vertices: int = 2000):
     """
     Visualizes the graph using matplotlib and saves it to a file.
     level: 'level_1' (detailed) or 'level_0' (super-communities)
+    aggregate: draw one node per community (sized by member count, edges by summed weight)
+    instead of every entity; by default only for graphs over `max_vertices` vertices.
+    The layout is the graph's cached one (get_layout), so drawing another level is cheap.
     """
     import matplotlib.pyplot as plt
-    
+
+    if aggregate is None:
+        aggregate = graph.vcount() > max_vertices
+    layout = get_layout(graph, communities)
+
     # Extract the requested level for coloring
     comm_ids = [c.get(level) for c in communities.values()]
     unique_comms = set(comm_ids)
     num_communities = len(unique_comms)
     
-    palette = ig.RainbowPalette(n=num_communities)
-    
-    # Map comm_id to color
-    # We need a consistent mapping because comm_ids might not be 0..N-1 perfectly if filtered, 
-    # but usually they are.
-    
-    vertex_colors = []
-    for vertex in graph.vs:
-        comm_data = communities.get(vertex['name'])
-        if comm_data and level in comm_data:
-            comm_id = comm_data[level]
-            color = palette.get(comm_id)
-            vertex_colors.append(color)
-        else:
-            vertex_colors.append((0.5, 0.5, 0.5, 1.0))
-            
-    # Plot using matplotlib backend
+    palette = ig.RainbowPalette(n=max(num_communities, 1))
+    # Community ids are stable across incremental runs and may have gaps; colour by rank
+    color_index = {comm_id: i for i, comm_id in enumerate(sorted(unique_comms, key=lambda c: (c is None, c)))}
+
     fig, ax = plt.subplots(figsize=(12, 12))
-    ig.plot(
-        graph, 
-        target=ax,
-        layout=graph.layout("kk"),
-        vertex_color=vertex_colors,
-        vertex_label=None, 
-        vertex_size=15,
-        edge_width=0.5,
-        edge_color='#AAAAAA'
-    )
-    
-    plt.title(f"Entity Graph - Communities ({level})")
+    if aggregate:
+        aggregated = community_graph(graph, communities, level)
+        max_weight = max(aggregated.es['weight'], default=1.0) or 1.0
+        ig.plot(
+            aggregated,
+            target=ax,
+            layout=ig.Layout(list(zip(aggregated.vs['x'], aggregated.vs['y']))),
+            vertex_color=[palette.get(color_index[cid]) for cid in aggregated.vs['community']],
+            vertex_label=None,
+            vertex_size=[8 + 4 * np.sqrt(size) for size in aggregated.vs['size']],
+            edge_width=[0.3 + 4 * weight / max_weight for weight in aggregated.es['weight']],
+            edge_color='#AAAAAA'
+        )
+        plt.title(f"Community Graph ({level}, {aggregated.vcount()} communities)")
+    else:
+        vertex_colors = []
+        for vertex in graph.vs:
+            comm_data = communities.get(vertex['name'])
+            if comm_data and level in comm_data:
+                comm_id = comm_data[level]
+                color = palette.get(color_index[comm_id])
+                vertex_colors.append(color)
+            else:
+                vertex_colors.append((0.5, 0.5, 0.5, 1.0))
+
+        # Plot using matplotlib backend
+        ig.plot(
+            graph, 
+            target=ax,
+            layout=ig.Layout(layout.tolist()),
+            vertex_color=vertex_colors,
+            vertex_label=None, 
+            vertex_size=15,
+            edge_width=0.5,
+            edge_color='#AAAAAA'
+        )
+        plt.title(f"Entity Graph - Communities ({level})")
+
     plt.savefig(output_path)
-    plt.close()
\ No newline at end of file
+    plt.close()
+
+@telemetry.timed("export_graph")
+def export_graph(graph: ig.Graph, communities: dict, output_path: str, level: str = 'level_1',
+                 aggregate: bool = False):
+    """
+    Writes the graph with its cached layout for an external viewer, as compact JSON
+    (.json: nodes with position, size and community ids, weighted edges) or GEXF (.gexf,
+    e.g. Gephi or Sigma.js). Descriptions are left out to keep the file small.
+    With `aggregate`, one node per `level` community is written instead (community_graph).
+    """
+    extension = output_path.rsplit('.', 1)[-1].lower()
+    if extension not in ('json', 'gexf'):
+        raise ValueError(f"Unsupported export format: {output_path} (use .json or .gexf)")
+
+    if aggregate:
+        aggregated = community_graph(graph, communities, level)
+        attributes = [level]
+        nodes = [
+            {"id": i, "label": f"Community {cid}", "x": x, "y": y, "size": size, "attributes": {level: cid}}
+            for i, (cid, x, y, size) in enumerate(zip(aggregated.vs['community'], aggregated.vs['x'],
+                                                       aggregated.vs['y'], aggregated.vs['size']))
+        ]
+        edge_list, weights = aggregated.get_edgelist(), aggregated.es['weight']
+    else:
+        layout = get_layout(graph, communities)
+        levels = sorted({lvl for comms in communities.values() for lvl in comms},
+                        key=lambda lvl: int(lvl.rsplit('_', 1)[1]))
+        attributes = ['type'] + levels
+        types = graph.vs['type'] if 'type' in graph.vs.attributes() else [None] * graph.vcount()
+        nodes = []
+        for vid, (name, kind, degree) in enumerate(zip(graph.vs['name'], types, graph.degree())):
+            comms = communities.get(name, {})
+            nodes.append({
+                "id": vid, "label": name, "x": float(layout[vid][0]), "y": float(layout[vid][1]),
+                "size": 1 + np.log1p(degree),
+                "attributes": {"type": kind, **{lvl: comms[lvl] for lvl in levels if lvl in comms}},
+            })
+        edge_list, weights = graph.get_edgelist(), graph.es['weight'] if graph.ecount() else []
+
+    if extension == 'json':
+        data = {
+            "directed": False,
+            "level": level if aggregate else None,
+            "nodes": [{"id": n["id"], "label": n["label"], "x": round(n["x"], 3), "y": round(n["y"], 3),
+                       "size": round(float(n["size"]), 3), **n["attributes"]} for n in nodes],
+            "edges": [{"source": s, "target": t, "weight": w} for (s, t), w in zip(edge_list, weights)],
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        return
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gexf xmlns="http://gexf.net/1.3" xmlns:viz="http://gexf.net/1.3/viz" version="1.3">\n')
+        f.write('<graph defaultedgetype="undirected">\n<attributes class="node">\n')
+        for attribute in attributes:
+            kind = 'string' if attribute == 'type' else 'integer'
+            f.write(f'<attribute id={quoteattr(attribute)} title={quoteattr(attribute)} type="{kind}"/>\n')
+        f.write('</attributes>\n<nodes>\n')
+        for n in nodes:
+            values = ''.join(f'<attvalue for={quoteattr(k)} value={quoteattr(str(v))}/>'
+                             for k, v in n["attributes"].items() if v is not None)
+            f.write(f'<node id="{n["id"]}" label={quoteattr(str(n["label"]))}><attvalues>{values}</attvalues>'
+                    f'<viz:position x="{n["x"]:.3f}" y="{n["y"]:.3f}" z="0"/><viz:size value="{float(n["size"]):.3f}"/></node>\n')
+        f.write('</nodes>\n<edges>\n')
+        for i, ((source, target), weight) in enumerate(zip(edge_list, weights)):
+            f.write(f'<edge id="{i}" source="{source}" target="{target}" weight="{weight:g}"/>\n')
+        f.write('</edges>\n</graph>\n</gexf>\n')
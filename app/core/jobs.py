@@ -0,0 +1,96 @@
+import asyncio
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "queued"    # queued -> running -> succeeded | failed
+    stage: str = None
+    completed: int = 0
+    total: int = None
+    created: float = 0.0
+    started: float = None
+    finished: float = None
+    result: dict = None
+    error: str = None
+
+    def progress(self, completed: int, total: int = None, stage: str = None):
+        self.completed = completed
+        self.total = total
+        if stage is not None:
+            self.stage = stage
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class JobManager:
+    """
+    Background job queue for long-running work (ingest, index builds).
+
+    Jobs run one at a time in submission order on the event loop, since they all
+    read and write the same corpus and index; callers poll the job for status and
+    progress. Only the newest `history` finished jobs are kept.
+    """
+    def __init__(self, history: int = 100):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def submit(self, kind: str, run) -> Job:
+        """
+        Queues `run(job)`, a coroutine function whose return value becomes the job's result.
+        """
+        job = Job(id=uuid.uuid4().hex, kind=kind, created=time.time())
+        self._jobs[job.id] = job
+        self._queue.put_nowait((job, run))
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        return list(self._jobs.values())
+
+    def _trim(self):
+        finished = [j.id for j in self._jobs.values() if j.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    async def _run(self):
+        while True:
+            job, run = await self._queue.get()
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.result = await run(job)
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "cancelled"
+                job.finished = time.time()
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                job.status = "failed"
+                job.error = str(e)
+            job.finished = time.time()
+            self._trim()
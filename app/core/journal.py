@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+
+class ChunkJournal:
+    """
+    Append-only JSONL journal of finished chunk results.
+
+    Every result is written as soon as its chunk completes; the file is fsynced every
+    `fsync_every` records or `fsync_interval` seconds, whichever comes first, so a crash
+    loses at most one small batch. On restart `load()` replays the file (the last record
+    for a chunk wins, a torn final line is ignored) and the extractor skips chunks that
+    already succeeded.
+    """
+    def __init__(self, path: str, fsync_every: int = 32, fsync_interval: float = 2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def load(self) -> dict:
+        """
+        Returns {chunk_id: record} for every chunk recorded in the journal.
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written line from an interrupted run
+                    continue
+                records[record.get("chunk_id")] = record
+        return records
+
+    def completed(self) -> dict:
+        """
+        Returns only the records of chunks that were extracted successfully and completely
+        (a truncated response's partial result is extracted again).
+        """
+        return {cid: r for cid, r in self.load().items()
+                if r.get("status") == "success" and not r.get("truncated")}
+
+    def open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._drop_torn_tail()
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def _drop_torn_tail(self, block: int = 65536):
+        """
+        Truncates a partially written last line left by a crash, so the next record starts
+        on a line of its own instead of being glued to the fragment (and lost with it).
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - block)
+                f.seek(start)
+                data = f.read(position - start)
+                newline = data.rfind(b"\n")
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                print(f"Journal {self.path}: dropping a torn last line of {end - position} bytes")
+                f.truncate(position)
+
+    def append(self, record: dict):
+        self.open()
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,196 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for an LLM response holding one JSON object whose values are
+    mostly arrays, e.g. {"entities": [...], "relationships": [...]}.
+
+    Text is fed as it streams in and every array item is emitted as (key, item) the moment
+    its closing bracket arrives; other top-level values are emitted as (key, value) once
+    complete. Text before the first '{' (markdown fences, "Here is the JSON:") and after
+    the closing '}' is ignored, like extract_json. Each character is looked at once and
+    only the value currently being read is buffered, so there is no backtracking over
+    the response. `result` always holds the valid prefix parsed so far, which is what a
+    truncated response is left with. Items that fail to parse are skipped and counted.
+    """
+    def __init__(self):
+        self.result = {}
+        self.done = False
+        self.errors = 0
+        self._started = False
+        self._stack = []          # open containers: '{' or '['
+        self._in_string = False
+        self._escape = False
+        self._expect_key = True   # inside the root object: next string is a key
+        self._key = None
+        self._key_chars = None    # characters of the root key being read
+        self._capture = None      # characters of the value being read
+        self._capture_depth = 0   # stack depth at which the captured value started
+        self._scalar = False      # captured value is a number / true / false / null
+        self._emitted = 0
+
+    def feed(self, text: str) -> list:
+        """
+        Consumes the next piece of the response. Returns the (key, value) pairs completed by it.
+        """
+        events = []
+        for char in text:
+            if self.done:
+                break
+            if not self._started:
+                if char == "{":
+                    self._start()
+                continue
+            if self._in_string:
+                self._string_char(char, events)
+            else:
+                self._structural_char(char, events)
+        return events
+
+    def close(self) -> dict:
+        """
+        Ends the stream and returns everything parsed (the valid prefix if it was cut short).
+        """
+        if self._scalar:
+            self._finish([])
+        return self.result
+
+    # --- State machine ---
+
+    def _start(self):
+        self._started = True
+        self._stack = ["{"]
+        self._expect_key = True
+
+    def _restart(self):
+        # Whatever came before was not the JSON object (e.g. braces in a preamble): start looking again
+        self.result = {}
+        self._started = False
+        self._stack = []
+        self._key = None
+        self._key_chars = None
+        self._capture = None
+        self._scalar = False
+
+    def _string_char(self, char: str, events: list):
+        if self._capture is not None:
+            self._capture.append(char)
+        elif self._key_chars is not None:
+            self._key_chars.append(char)
+
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._key_chars is not None:
+                try:
+                    self._key = json.loads('"' + "".join(self._key_chars))
+                except json.JSONDecodeError:
+                    self._key = "".join(self._key_chars[:-1])
+                self._key_chars = None
+                self._expect_key = False
+            elif self._capture is not None and len(self._stack) == self._capture_depth:
+                self._finish(events)
+
+    def _structural_char(self, char: str, events: list):
+        depth = len(self._stack)
+
+        if self._scalar:
+            if char in _WHITESPACE or char in ",]}":
+                self._finish(events)
+            else:
+                self._capture.append(char)
+                return
+
+        if char in _WHITESPACE:
+            if self._capture is not None:
+                self._capture.append(char)
+            return
+
+        # Root object: keys, and the start of each value
+        if depth == 1:
+            if self._expect_key:
+                if char == '"':
+                    self._in_string = True
+                    self._key_chars = []
+                elif char == "}":
+                    self.done = True
+                elif char != ",":
+                    if self._emitted == 0:
+                        self._restart()
+                return
+            if char == ":":
+                return
+            if char == ",":
+                self._expect_key = True
+                return
+            if char == "}":
+                self.done = True
+                return
+            if char == "[":
+                self._stack.append("[")
+                self.result.setdefault(self._key, [])
+                return
+            self._begin_value(char)
+            return
+
+        # Root arrays: the start of each item
+        if depth == 2 and self._stack[-1] == "[" and self._capture is None:
+            if char == "]":
+                self._stack.pop()
+                self._expect_key = False
+            elif char != ",":
+                self._begin_value(char)
+            return
+
+        # Inside a captured value
+        self._capture.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._stack.append(char)
+        elif char in "}]":
+            self._stack.pop()
+            if len(self._stack) == self._capture_depth:
+                self._finish(events)
+
+    def _begin_value(self, char: str):
+        self._capture = [char]
+        self._capture_depth = len(self._stack)
+        if char in "{[":
+            self._stack.append(char)
+        elif char == '"':
+            self._in_string = True
+        else:
+            self._scalar = True
+
+    def _finish(self, events: list):
+        text = "".join(self._capture)
+        in_array = len(self._stack) == 2 and self._stack[-1] == "["
+        self._capture = None
+        self._scalar = False
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return
+        self._emitted += 1
+        if in_array:
+            self.result[self._key].append(value)
+        else:
+            self.result[self._key] = value
+        events.append((self._key, value))
+
+
+def parse_json_prefix(content: str) -> dict:
+    """
+    Parses a complete or truncated response in one go; see JSONStreamParser.
+    """
+    parser = JSONStreamParser()
+    parser.feed(content)
+    return parser.close()
@@ -1,26 +1,353 @@
 import os
+import json
+import time
 import asyncio
+import weakref
+from collections import deque
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from core.cache import ResponseCache
+from core.scheduler import is_retryable, retry_after_seconds
+from core.telemetry import telemetry
 
 load_dotenv()
 
+class Endpoint:
+    """
+    One provider endpoint (base URL + API key, optionally with its own model) and the health
+    and latency statistics LLMClient routes by. A retryable failure (429, 5xx, timeout) takes
+    the endpoint out of rotation for the provider's Retry-After or an exponential cooldown.
+    """
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = None, name: str = None,
+                 client: AsyncOpenAI = None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.name = name or base_url or "default"
+        self._client = client
+
+        self.in_flight = 0
+        self.latency = None                 # moving average of successful calls (s)
+        self.latencies = deque(maxlen=256)  # recent call latencies (cancelled calls: lower bounds), for the hedge delay
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0                   # consecutive retryable failures
+        self.down_until = 0.0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self._client or LLMClient.shared_client(self.api_key, self.base_url)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def record_success(self, latency: float = None):
+        self.requests += 1
+        self.failures = 0
+        if latency is not None:
+            self.latencies.append(latency)
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+    def record_cancelled(self, elapsed: float):
+        """
+        A call cancelled after `elapsed` seconds (a hedge that lost the race): it would have
+        taken at least that long. Without these samples the hedge delay only sees the calls
+        that won and drifts down.
+        """
+        self.latencies.append(elapsed)
+
+    def record_failure(self, exc: Exception):
+        self.requests += 1
+        self.errors += 1
+        if not is_retryable(exc):
+            return
+        self.failures += 1
+        cooldown = retry_after_seconds(exc)
+        if cooldown is None:
+            cooldown = min(60.0, 2.0 ** (self.failures - 1))
+        self.down_until = time.monotonic() + cooldown
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "latency_s": round(self.latency, 4) if self.latency is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "healthy": self.healthy,
+        }
+
 class LLMClient:
-    def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=os.getenv("LLM_API_KEY"),
-            base_url=os.getenv("LLM_BASE_URL")
-        )
+    """
+    Chat completions over a pool of endpoints (see endpoints_from_env).
+
+    Each call goes to the least loaded healthy endpoint: the one with the lowest
+    (in-flight + 1) x average latency. With `hedge`, a call still running after the pool's
+    recent p95 latency (LLM_HEDGE_QUANTILE, at least LLM_HEDGE_MIN_DELAY seconds) is sent
+    again to another endpoint serving the same model and the first response wins; the other
+    is cancelled. Hedging applies to generate; streams are routed but not hedged.
+    Responses are cached under the model of the endpoint that serves them.
+    """
+    # One AsyncOpenAI (and so one HTTP connection pool) per endpoint and event loop, shared
+    # by every LLMClient instead of opening a new pool per client. Connections belong to
+    # the loop that opened them, so a new loop (e.g. another asyncio.run) gets its own pool.
+    _clients = weakref.WeakKeyDictionary()
+
+    _client = None
+    endpoints = ()
+    hedge = False
+    hedge_quantile = 0.95
+    hedge_min_delay = 1.0
+
+    def __init__(self, cache: ResponseCache = None, endpoints: list = None, hedge: bool = None):
+        self.endpoints = endpoints or self.endpoints_from_env()
+        if hedge is None:
+            hedge = os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes")
+        self.hedge = hedge
+        self.hedge_quantile = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+        self.hedge_min_delay = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+        # Responses are cached by (model, system prompt, user content); disabled unless configured
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+
+    @staticmethod
+    def endpoints_from_env() -> list:
+        """
+        LLM_ENDPOINTS: a JSON list of {"base_url", "api_key", "model", "name"} objects;
+        or LLM_API_KEYS: comma-separated keys for LLM_BASE_URL;
+        or a single endpoint from LLM_BASE_URL and LLM_API_KEY.
+        Endpoints without a model use LLM_MODEL.
+        """
+        raw = os.getenv("LLM_ENDPOINTS")
+        if raw:
+            return [Endpoint(**{k: v for k, v in item.items() if k in ("base_url", "api_key", "model", "name")})
+                    for item in json.loads(raw)]
+        base_url = os.getenv("LLM_BASE_URL")
+        keys = [key.strip() for key in os.getenv("LLM_API_KEYS", "").split(",") if key.strip()]
+        if keys:
+            return [Endpoint(base_url, key, name=f"{base_url or 'default'}#{i}") for i, key in enumerate(keys)]
+        return [Endpoint(base_url, os.getenv("LLM_API_KEY"))]
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self._client or self.endpoints[0].client
+
+    @client.setter
+    def client(self, client: AsyncOpenAI):
+        # An explicitly assigned client replaces the endpoint pool
+        self._client = client
+        self.endpoints = [Endpoint(name="client", client=client)]
+
+    @classmethod
+    def shared_client(cls, api_key: str = None, base_url: str = None) -> AsyncOpenAI:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return AsyncOpenAI(api_key=api_key, base_url=base_url)
+        clients = cls._clients.setdefault(loop, {})
+        client = clients.get((api_key, base_url))
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+            clients[(api_key, base_url)] = client
+        return client
+
+    @classmethod
+    async def close_shared(cls):
+        clients = cls._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+    # --- Routing ---
+
+    @staticmethod
+    def model_of(endpoint: Endpoint) -> str:
+        return endpoint.model or os.getenv("LLM_MODEL")
+
+    def serving_model(self) -> str:
+        """
+        The model the next call would be routed to (LLM_MODEL without endpoints), for keys of
+        caches kept outside the client.
+        """
+        endpoint = self.pick()
+        return self.model_of(endpoint) if endpoint is not None else os.getenv("LLM_MODEL")
+
+    def pick(self, exclude=(), model: str = None) -> Endpoint:
+        """
+        The least loaded healthy endpoint not in `exclude`, serving `model` if given (if every
+        one is cooling down, the one that recovers first). None if there is no candidate.
+        """
+        candidates = [e for e in self.endpoints
+                      if e not in exclude and (model is None or self.model_of(e) == model)]
+        if not candidates:
+            return None
+        healthy = [e for e in candidates if e.healthy] or [min(candidates, key=lambda e: e.down_until)]
+        measured = [e.latency for e in healthy if e.latency is not None]
+        # Endpoints without a measurement yet are assumed to be as fast as the average
+        typical = sum(measured) / len(measured) if measured else 1.0
+        return min(healthy, key=lambda e: ((e.in_flight + 1) * (e.latency or typical), e.requests))
+
+    def hedge_delay(self):
+        """
+        How long a call may run before it is hedged: the `hedge_quantile` of recent latencies
+        across the pool, at least `hedge_min_delay`. None until there are enough samples.
+        """
+        samples = sorted(latency for e in self.endpoints for latency in e.latencies)
+        if len(samples) < 20:
+            return None
+        return max(self.hedge_min_delay, samples[int(self.hedge_quantile * (len(samples) - 1))])
+
+    def endpoint_stats(self) -> dict:
+        return {e.name: e.stats() for e in self.endpoints}
+
+    async def _call(self, endpoint: Endpoint, messages: list) -> tuple:
+        model = self.model_of(endpoint)
+        start = time.perf_counter()
+        endpoint.in_flight += 1
+        try:
+            with telemetry.in_flight():
+                response = await endpoint.client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                )
+        except asyncio.CancelledError:
+            # A hedge that lost the race (or a timed-out call): not the endpoint's fault
+            endpoint.record_cancelled(time.perf_counter() - start)
+            telemetry.inc("llm_endpoint_requests_total", endpoint=endpoint.name, status="cancelled")
+            raise
+        except Exception as e:
+            endpoint.record_failure(e)
+            telemetry.inc("llm_endpoint_requests_total", endpoint=endpoint.name, status="error")
+            telemetry.record_llm_call(model, time.perf_counter() - start, status="error")
+            raise
+        finally:
+            endpoint.in_flight -= 1
+        latency = time.perf_counter() - start
+        endpoint.record_success(latency)
+        telemetry.inc("llm_endpoint_requests_total", endpoint=endpoint.name, status="success")
+        telemetry.record_llm_call(model, latency, usage=getattr(response, "usage", None))
+        choice = response.choices[0]
+        return choice.message.content, getattr(choice, "finish_reason", None)
+
+    async def _complete(self, messages: list, primary: Endpoint) -> tuple:
+        """
+        (content, finish_reason) of one completion on `primary`, hedged if enabled. A hedge
+        only goes to an endpoint serving the same model, so the answer matches the cache key.
+        """
+        delay = self.hedge_delay() if self.hedge and len(self.endpoints) > 1 else None
+        if delay is None:
+            return await self._call(primary, messages)
+
+        tasks = [asyncio.ensure_future(self._call(primary, messages))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            backup = None if done else self.pick(exclude={primary}, model=self.model_of(primary))
+            if backup is None or not backup.healthy:
+                return await tasks[0]
+
+            telemetry.inc("llm_hedged_requests_total")
+            tasks.append(asyncio.ensure_future(self._call(backup, messages)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            telemetry.inc("llm_hedge_wins_total")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
     async def generate(self, prompt: str, system_message: str = None) -> str:
+        # Endpoints may serve different models: the cache key is the model that will answer
+        endpoint = self.pick()
+        model = self.model_of(endpoint)
+
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(model, system_message, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                telemetry.record_cache_hit(model)
+                return cached
+
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+
+        content, finish_reason = await self._complete(messages, endpoint)
+        # Only complete answers are cached: a response cut off by the token limit would
+        # otherwise be served again to the re-run that is meant to retry it
+        if key is not None and finish_reason == "stop":
+            self.cache.put(key, content, model=model)
+        return content
+
+    async def generate_stream(self, prompt: str, system_message: str = None):
+        """
+        Like generate, but yields the completion in pieces as they arrive.
+        A cached response is yielded whole; a streamed one is cached once it has finished
+        with finish_reason "stop" (not cut off by the token limit).
+        """
+        endpoint = self.pick()
+        model = self.model_of(endpoint)
+
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(model, system_message, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                telemetry.record_cache_hit(model)
+                yield cached
+                return
+
         messages = []
         if system_message:
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": prompt})
 
-        response = await self.client.chat.completions.create(
-            messages=messages,
-            model=os.getenv("LLM_MODEL"),
-        )
+        parts = []
+        usage = None
+        finish_reason = None
+        start = time.perf_counter()
+        endpoint.in_flight += 1
+        with telemetry.in_flight():
+            try:
+                stream = await endpoint.client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    stream=True,
+                    # Without it OpenAI-compatible servers send no usage on a stream
+                    stream_options={"include_usage": True},
+                )
+                async for event in stream:
+                    # Usage arrives with the last event, which has no choices
+                    usage = getattr(event, "usage", None) or usage
+                    if not event.choices:
+                        continue
+                    finish_reason = getattr(event.choices[0], "finish_reason", None) or finish_reason
+                    # Reasoning models stream their thinking separately; only the answer is yielded
+                    delta = event.choices[0].delta.content
+                    if delta:
+                        if not parts:
+                            telemetry.observe("llm_time_to_first_token_seconds", time.perf_counter() - start,
+                                              model=model or "unknown")
+                        parts.append(delta)
+                        yield delta
+            except Exception as e:
+                endpoint.record_failure(e)
+                telemetry.inc("llm_endpoint_requests_total", endpoint=endpoint.name, status="error")
+                telemetry.record_llm_call(model, time.perf_counter() - start, usage=usage, status="error")
+                raise
+            finally:
+                endpoint.in_flight -= 1
+        # A stream's duration depends on the answer's length, so it does not feed the hedge delay
+        endpoint.record_success()
+        telemetry.inc("llm_endpoint_requests_total", endpoint=endpoint.name, status="success")
+        telemetry.record_llm_call(model, time.perf_counter() - start, usage=usage)
 
-        return response.choices[0].message.content
\ No newline at end of file
+        if key is not None and finish_reason == "stop":
+            self.cache.put(key, "".join(parts), model=model)
\ No newline at end of file
@@ -0,0 +1,243 @@
+import math
+import re
+import time
+from collections import OrderedDict
+
+import igraph as ig
+
+from core.graph import edge_relationships
+from core.llm import LLMClient
+from core.scheduler import ExtractionScheduler
+from core.summarizer import report_text
+from core.text_utils import count_tokens
+from prompts.local_search import LOCAL_SEARCH_SYSTEM_PROMPT
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+    Postings are kept per term as parallel lists of document ids and term frequencies.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}   # term -> (doc ids, term frequencies)
+        self.lengths = []
+        self.total_length = 0
+
+    def add(self, text: str) -> int:
+        """
+        Indexes a document and returns its id (documents are numbered in insertion order).
+        """
+        doc_id = len(self.lengths)
+        counts = {}
+        terms = tokenize(text)
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            docs, tfs = self.postings.setdefault(term, ([], []))
+            docs.append(doc_id)
+            tfs.append(tf)
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+        return doc_id
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """
+        Returns [(doc id, score)] for the best `top_k` documents, best first.
+        Only the postings of the query's terms are touched.
+        """
+        n = len(self.lengths)
+        if not n:
+            return []
+        average = self.total_length / n
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in zip(docs, tfs):
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+
+class LocalSearch:
+    """
+    Entity-centric search: answers with a single LLM call over a small, relevant context.
+
+    Seed entities are found with BM25 over entity names and merged descriptions (one
+    document per vertex). From each seed a weighted k-hop neighbourhood is expanded on the
+    graph - relevance decays multiplicatively with normalized edge weight per hop - and
+    cached in an LRU. Entities, the relationships between them and the reports of the
+    seeds' communities are then packed into the token budget, most relevant first.
+    The answer call goes through the scheduler, under the same provider limits as the rest.
+    """
+    def __init__(self, llm_client: LLMClient, graph: ig.Graph, communities: dict = None, reports: dict = None,
+                 hops: int = 2, top_k_seeds: int = 5, max_context_tokens: int = 8000,
+                 cache_size: int = 1024, response_type: str = "multiple paragraphs",
+                 scheduler: ExtractionScheduler = None):
+        self.llm_client = llm_client
+        self.scheduler = scheduler or ExtractionScheduler()
+        self.graph = graph
+        self.communities = communities or {}
+        self.reports = reports or {}
+        self.hops = hops
+        self.top_k_seeds = top_k_seeds
+        self.max_context_tokens = max_context_tokens
+        self.cache_size = cache_size
+        self.response_type = response_type
+        self._neighbourhoods = OrderedDict()
+
+        names = graph.vs['name'] if graph.vcount() else []
+        descriptions = graph.vs['description'] if graph.vcount() else []
+        self.index = BM25Index()
+        for name, description in zip(names, descriptions):
+            # The name is repeated so a match on it outweighs a passing mention in a description
+            self.index.add(f"{name} {name} {' '.join(description)}")
+
+        weights = graph.es['weight'] if graph.ecount() else []
+        self.max_weight = max(weights, default=1.0) or 1.0
+
+    def neighbourhood(self, seed: int) -> list:
+        """
+        Returns [(vertex id, relevance)] for vertices within `hops` of the seed, where the
+        seed has relevance 1 and each hop multiplies by weight / max weight (best path wins).
+        """
+        cached = self._neighbourhoods.get(seed)
+        if cached is not None:
+            self._neighbourhoods.move_to_end(seed)
+            return cached
+
+        g = self.graph
+        relevance = {seed: 1.0}
+        frontier = {seed}
+        for _ in range(self.hops):
+            reached = {}
+            for vid in frontier:
+                for edge_id in g.incident(vid):
+                    edge = g.es[edge_id]
+                    other = edge.target if edge.source == vid else edge.source
+                    score = relevance[vid] * edge['weight'] / self.max_weight
+                    if score > relevance.get(other, 0.0) and score > reached.get(other, 0.0):
+                        reached[other] = score
+            relevance.update(reached)
+            frontier = set(reached)
+            if not frontier:
+                break
+
+        result = sorted(relevance.items(), key=lambda item: (-item[1], item[0]))
+        self._neighbourhoods[seed] = result
+        if len(self._neighbourhoods) > self.cache_size:
+            self._neighbourhoods.popitem(last=False)
+        return result
+
+    def build_context(self, query: str):
+        """
+        Returns (context, seed names). Roughly half of the budget goes to entities, a third
+        to relationships and the rest to community reports; unused budget flows onward.
+        """
+        g = self.graph
+        seeds = self.index.search(query, self.top_k_seeds)
+        if not seeds:
+            return "", []
+
+        top = seeds[0][1]
+        relevance = {}
+        for seed, score in seeds:
+            for vid, weight in self.neighbourhood(seed):
+                relevance[vid] = relevance.get(vid, 0.0) + (score / top) * weight
+        ranked = sorted(relevance, key=lambda v: (-relevance[v], v))
+
+        names = g.vs['name']
+        budget = self.max_context_tokens
+        used = 0
+
+        def pack(header: list, rows, limit: int) -> list:
+            nonlocal used
+            lines = list(header)
+            cost = count_tokens("\n".join(header)) + 1
+            if used + cost > limit:
+                return []
+            used += cost
+            for row in rows:
+                row_cost = count_tokens(row) + 1
+                if used + row_cost > limit:
+                    break
+                lines.append(row)
+                used += row_cost
+            return lines if len(lines) > len(header) else []
+
+        entity_rows = (
+            f"{i},{names[v]},{' '.join(g.vs[v]['description'])}" for i, v in enumerate(ranked, start=1)
+        )
+        entities = pack(["-----Entities-----", "id,entity,description"], entity_rows, budget // 2)
+
+        selected = set(ranked)
+        edges = sorted(
+            (e for e in g.es.select(_within=ranked)),
+            key=lambda e: (-(relevance[e.source] + relevance[e.target]) * e['weight'], e.index)
+        ) if selected else []
+        relationship_rows = (
+            f"{i},{names[r['source']]},{names[r['target']]},{' '.join(r['description'])}"
+            for i, r in enumerate((r for e in edges for r in edge_relationships(g, e)), start=1)
+        )
+        relationships = pack(["-----Relationships-----", "id,source,target,description"],
+                             relationship_rows, used + (budget - used) * 2 // 3)
+
+        report_rows = []
+        seen = set()
+        for seed, _ in seeds:
+            for level, by_id in self.reports.items():
+                community_id = self.communities.get(names[seed], {}).get(level)
+                report = by_id.get(community_id)
+                if report and (level, community_id) not in seen:
+                    seen.add((level, community_id))
+                    report_rows.append(report_text(report))
+        reports = pack(["-----Reports-----"], report_rows, budget)
+
+        sections = [s for s in (entities, relationships, reports) if s]
+        context = "\n\n".join("\n".join(section) for section in sections)
+        return context, [names[seed] for seed, _ in seeds]
+
+    async def stream(self, query: str, response_type: str = None):
+        """
+        Runs the search, yielding {"type": "context", "seeds": [...], "context_tokens": int,
+        "retrieval_ms": float} once the context is built, {"type": "token", "text": str} per
+        piece of the answer as it streams in, then {"type": "answer", "answer": str, ...}.
+        """
+        start = time.perf_counter()
+        context, seeds = self.build_context(query)
+        details = {
+            "seeds": seeds,
+            "context_tokens": count_tokens(context),
+            "retrieval_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        yield {"type": "context", **details}
+
+        system_message = LOCAL_SEARCH_SYSTEM_PROMPT.format(
+            response_type=response_type or self.response_type, context_data=context
+        )
+        parts = []
+        async for piece in self.scheduler.stream(
+            lambda: self.llm_client.generate_stream(prompt=query, system_message=system_message),
+            tokens=count_tokens(system_message) + count_tokens(query)
+        ):
+            parts.append(piece)
+            yield {"type": "token", "text": piece}
+        yield {"type": "answer", "answer": "".join(parts), **details}
+
+    async def search(self, query: str, response_type: str = None) -> dict:
+        result = None
+        async for event in self.stream(query, response_type=response_type):
+            if event["type"] == "answer":
+                result = {k: v for k, v in event.items() if k != "type"}
+        return result
@@ -0,0 +1,100 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from core.cache import sha256
+from core.telemetry import telemetry
+
+
+def normalize_query(query: str) -> str:
+    """
+    The form queries are cached under: Unicode-normalized, case-folded, whitespace
+    collapsed and trailing punctuation dropped, so "Who is Holmes?" and "who is  holmes"
+    share an entry.
+    """
+    text = unicodedata.normalize("NFKC", query or "").casefold()
+    return re.sub(r"\s+", " ", text).strip().rstrip("?!.").strip()
+
+
+class TTLCache:
+    """
+    In-memory LRU cache whose entries also expire `ttl` seconds after they were stored
+    (never, if `ttl` is None). Hits and misses are counted, and reported to telemetry
+    under the cache's `name`.
+    """
+    def __init__(self, name: str, max_entries: int = 1000, ttl: float = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        telemetry.inc("query_cache_requests_total", cache=self.name, result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class QueryCache:
+    """
+    Two tiers for global search:
+    answers - final answers by index version, level, response type and normalized query;
+    maps    - per-community map results by normalized query and the hash of the community
+              report, so after a partial re-index the unchanged communities still hit.
+    """
+    def __init__(self, max_answers: int = 1000, max_maps: int = 50000, ttl: float = None):
+        self.answers = TTLCache("answers", max_answers, ttl)
+        self.maps = TTLCache("maps", max_maps, ttl)
+
+    @staticmethod
+    def answer_key(index_version, level: str, response_type: str, query: str) -> tuple:
+        return (index_version, level, response_type, normalize_query(query))
+
+    @staticmethod
+    def map_key(query: str, report_text: str) -> tuple:
+        return (normalize_query(query), sha256(report_text))
+
+    def stats(self) -> dict:
+        return {"answers": self.answers.stats(), "maps": self.maps.stats()}
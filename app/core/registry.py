@@ -0,0 +1,210 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import igraph as ig
+from core.snapshot import SnapshotStore, load_snapshot
+from core.summarizer import load_reports
+from core.telemetry import telemetry
+
+REPORTS_FILE = "community_reports.json"
+
+# Rough CPython costs: a str object's header, a list slot, a dict entry with its small inner dict
+_STR_OVERHEAD = 49
+_SLOT = 8
+_MEMBERSHIP_ENTRY = 250
+# igraph's C core: edge list, incidence indices and attribute list slots
+_VERTEX_BYTES = 64
+_EDGE_BYTES = 48
+
+
+def _strings_size(values) -> int:
+    size = 0
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            size += _SLOT * (len(value) + 8) + _strings_size(value)
+        elif isinstance(value, str):
+            size += _STR_OVERHEAD + len(value) + _SLOT
+        else:
+            size += _SLOT * 4
+    return size
+
+
+def estimate_memory(graph: ig.Graph, communities: dict, reports: dict) -> int:
+    """
+    Estimated resident bytes of one loaded index: the graph and its string attributes,
+    the membership dict and its CommunityIndex, and the community reports. An estimate
+    (CPython object sizes are approximated), but proportional to what eviction frees.
+    """
+    size = graph.vcount() * _VERTEX_BYTES + graph.ecount() * _EDGE_BYTES
+    for attribute in graph.vs.attributes():
+        size += _strings_size(graph.vs[attribute])
+    for attribute in graph.es.attributes():
+        size += _strings_size(graph.es[attribute])
+    if 'layout' in graph.attributes() and graph['layout'] is not None:
+        size += graph.vcount() * 16
+    if 'relationships' in graph.attributes() and graph['relationships'] is not None:
+        size += graph['relationships'].nbytes + _strings_size(graph['relationships'].descriptions)
+
+    size += len(communities) * _MEMBERSHIP_ENTRY
+    index = getattr(communities, 'index', None)
+    if index is not None:
+        for by_level in (index.members, index.boundary):
+            for groups in by_level.values():
+                size += sum(group.nbytes + 112 for group in groups.values())
+
+    for by_id in reports.values():
+        for report in by_id.values():
+            size += 2 * len(json.dumps(report, ensure_ascii=False))
+    return size
+
+
+class LoadedIndex:
+    """
+    One index version in memory: graph, communities and reports, plus the local search
+    built on first use. Readers hold on to the object, so eviction or a reload never pulls
+    it out from under a running query.
+    """
+    def __init__(self, index_id: str, version: int, graph: ig.Graph, communities: dict, reports: dict,
+                 nbytes: int):
+        self.index_id = index_id
+        self.version = version
+        self.graph = graph
+        self.communities = communities
+        self.reports = reports
+        self.nbytes = nbytes
+        self.local = None
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class IndexRegistry:
+    """
+    Indexes by id, loaded on demand and kept in memory while they fit `memory_limit` bytes.
+
+    Each index id is a SnapshotStore root (`<root>/<index_id>` unless registered with
+    another path) whose current version is loaded together with its community reports on
+    first use and reloaded when its CURRENT pointer moves. Resident indexes are kept in
+    least-recently-used order; once their estimated footprint (see estimate_memory)
+    exceeds the limit, the least recently used ones are evicted. The index just requested
+    is never evicted, so one index larger than the limit still loads.
+
+    Each index loads under its own lock, so different indexes load in parallel and a
+    burst of requests for one index loads it once. While a new version loads, other
+    readers keep getting the resident version instead of waiting.
+    """
+    def __init__(self, root: str, memory_limit: int = None, paths: dict = None):
+        self.root = root
+        self.memory_limit = memory_limit
+        self.paths = dict(paths or {})
+        self._lock = threading.Lock()
+        self._loading = {}          # index id -> lock held while it loads
+        self._resident = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def path(self, index_id: str) -> str:
+        if index_id in self.paths:
+            return self.paths[index_id]
+        if not re.fullmatch(r"[\w.-]+", index_id) or index_id.strip(".") == "":
+            raise ValueError(f"Invalid index id '{index_id}'")
+        return os.path.join(self.root, index_id)
+
+    def register(self, index_id: str, path: str):
+        self.paths[index_id] = path
+        self.evict(index_id)
+
+    def store(self, index_id: str) -> SnapshotStore:
+        return SnapshotStore(self.path(index_id))
+
+    def index_ids(self) -> list:
+        """
+        Every index with a current version: registered paths and directories under the root.
+        """
+        ids = set(self.paths)
+        if os.path.isdir(self.root):
+            ids.update(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+        return sorted(i for i in ids if self.store(i).current_version() is not None)
+
+    def get(self, index_id: str) -> LoadedIndex:
+        """
+        The current version of an index, loading it if it is not resident or has moved on.
+        Blocking (disk and CPU): call it from a worker thread in async code.
+        Raises LookupError if the index does not exist or has no version yet.
+        """
+        store = self.store(index_id)
+        version = store.current_version()
+        if version is None:
+            raise LookupError(f"Index '{index_id}' has not been built yet")
+
+        with self._lock:
+            loaded = self._resident.get(index_id)
+            if loaded is not None and loaded.version == version:
+                return self._touch(loaded)
+            lock = self._loading.setdefault(index_id, threading.Lock())
+
+        # A reload is under way: serve the resident version rather than wait for it
+        if not lock.acquire(blocking=loaded is None):
+            with self._lock:
+                return self._touch(loaded)
+        try:
+            with self._lock:
+                current = self._resident.get(index_id)
+            if current is not None and current.version == version:
+                # Loaded by whoever held the lock before us
+                with self._lock:
+                    return self._touch(current)
+
+            path = store.path(version)
+            graph, communities, _ = load_snapshot(path)
+            reports_path = os.path.join(path, REPORTS_FILE)
+            reports = load_reports(reports_path) if os.path.exists(reports_path) else {}
+            loaded = LoadedIndex(index_id, version, graph, communities, reports,
+                                 estimate_memory(graph, communities, reports))
+            with self._lock:
+                self._resident[index_id] = loaded
+                self.loads += 1
+                telemetry.inc("index_loads_total")
+                self._touch(loaded)
+                self._evict_over_limit(keep=index_id)
+            return loaded
+        finally:
+            lock.release()
+
+    def _touch(self, loaded: LoadedIndex) -> LoadedIndex:
+        loaded.last_used = time.time()
+        if self._resident.get(loaded.index_id) is loaded:
+            self._resident.move_to_end(loaded.index_id)
+        return loaded
+
+    def _evict_over_limit(self, keep: str):
+        if self.memory_limit is None:
+            return
+        while self.resident_bytes() > self.memory_limit:
+            victim = next((i for i in self._resident if i != keep), None)
+            if victim is None:
+                return
+            self._resident.pop(victim)
+            self.evictions += 1
+            telemetry.inc("index_evictions_total")
+
+    def evict(self, index_id: str) -> bool:
+        with self._lock:
+            return self._resident.pop(index_id, None) is not None
+
+    def resident_bytes(self) -> int:
+        return sum(loaded.nbytes for loaded in self._resident.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": {i: {"version": l.version, "bytes": l.nbytes, "last_used": l.last_used}
+                             for i, l in self._resident.items()},
+                "resident_bytes": self.resident_bytes(),
+                "memory_limit": self.memory_limit,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
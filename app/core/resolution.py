@@ -0,0 +1,346 @@
+import re
+import sys
+import unicodedata
+import zlib
+from array import array
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class NameNormalizer:
+    """
+    Maps raw entity names to the key used for entity resolution.
+
+    Args:
+        lowercase (bool): Case-insensitive matching ("Sherlock Holmes" == "SHERLOCK HOLMES").
+        collapse_whitespace (bool): Strip and collapse runs of whitespace.
+        strip_punctuation (bool): Drop punctuation ("Mr. Holmes" == "Mr Holmes").
+        aliases (dict): Extra raw or normalized names mapped to a canonical name,
+            e.g. {"Holmes": "Sherlock Holmes"}.
+    """
+    def __init__(self, lowercase: bool = True, collapse_whitespace: bool = True,
+                 strip_punctuation: bool = False, aliases: dict = None):
+        self.lowercase = lowercase
+        self.collapse_whitespace = collapse_whitespace
+        self.strip_punctuation = strip_punctuation
+        self.aliases = {}
+        for alias, canonical in (aliases or {}).items():
+            self.aliases[self._normalize(alias)] = self._normalize(canonical)
+
+    def _normalize(self, name: str) -> str:
+        if self.strip_punctuation:
+            name = "".join(c for c in name if not unicodedata.category(c).startswith("P"))
+        if self.collapse_whitespace:
+            name = _WHITESPACE.sub(" ", name).strip()
+        if self.lowercase:
+            name = name.lower()
+        return name
+
+    def __call__(self, name: str) -> str:
+        key = self._normalize(name)
+        return self.aliases.get(key, key)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, for cheap near-duplicate detection.
+
+    The fraction of equal positions in two signatures estimates the Jaccard similarity of
+    the texts' shingle sets (lowercased words, `shingle_size` at a time; shorter texts are
+    one shingle). Shingles are hashed with CRC32, so signatures are the same in every
+    process and run.
+    """
+    def __init__(self, num_perm: int = 32, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # a * h + b stays below 2**64 for h < 2**32
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        words = _WORD.findall((text or "").lower())
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str):
+        """
+        Returns the signature (uint64 array of num_perm), or None for text without words.
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME).min(axis=0)
+
+    @staticmethod
+    def similarity(signature, signatures) -> np.ndarray:
+        """
+        Estimated Jaccard similarity of one signature to each row of a (n, num_perm) array.
+        """
+        return (signatures == signature).mean(axis=1)
+
+
+class EntityIndex:
+    """
+    Entity-resolution index: normalized names are interned to integer IDs once, and
+    entities and relationships are stored column-wise keyed by those IDs.
+
+    Relationship endpoints go through the same normalization as entity names, so an
+    edge is never lost to a casing or spacing mismatch. Names that only appear as a
+    relationship endpoint are interned too (so a later batch declaring them connects
+    the edge) but are not `declared` entities until an entity record names them.
+    """
+    def __init__(self, normalizer: NameNormalizer = None, near_duplicate_threshold: float = 0.8):
+        self.normalizer = normalizer or NameNormalizer()
+
+        # --- Entity columns (indexed by entity id) ---
+        self._ids = {}                 # normalized name -> entity id
+        self.names = []                # display name (first seen)
+        self.types = []                # entity type (None until declared)
+        self.descriptions = []         # list of distinct descriptions
+        self.declared = bytearray()    # 1 if an entity record named it
+
+        # --- Relationship columns (indexed by relationship id) ---
+        self._rel_ids = {}             # (source id, type id, target id) -> relationship id
+        self.rel_source = array('q')
+        self.rel_target = array('q')
+        self.rel_type = array('q')
+        self.rel_strength = array('d')
+        self.rel_descriptions = []
+
+        self.rel_type_names = []       # interned relationship type strings
+        self._rel_type_ids = {}
+
+        # hash((kind, id, description)) of every stored description, instead of a set per entity
+        self._seen = set()
+
+        # Descriptions whose estimated Jaccard similarity to one already stored for the same
+        # entity/relationship reaches the threshold are dropped (None keeps every distinct one)
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.near_duplicates = 0
+        self._minhash = MinHasher()
+        self._signatures = {}          # (kind, id) -> flat array('Q') of signatures, built lazily
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, name: str):
+        """
+        Returns the entity id for a raw name, or None if it was never seen.
+        """
+        return self._ids.get(self.normalizer(name))
+
+    def intern(self, name: str) -> int:
+        key = self.normalizer(name)
+        entity_id = self._ids.get(key)
+        if entity_id is None:
+            entity_id = len(self.names)
+            self._ids[key] = entity_id
+            self.names.append(name)
+            self.types.append(None)
+            self.descriptions.append([])
+            self.declared.append(0)
+        return entity_id
+
+    def _intern_rel_type(self, rel_type: str) -> int:
+        type_id = self._rel_type_ids.get(rel_type)
+        if type_id is None:
+            type_id = len(self.rel_type_names)
+            self._rel_type_ids[rel_type] = type_id
+            self.rel_type_names.append(sys.intern(rel_type))
+        return type_id
+
+    def _is_near_duplicate(self, kind: str, item_id: int, existing: list, description: str) -> bool:
+        # Items with a single description (most of them) are never hashed
+        if self.near_duplicate_threshold is None or not existing:
+            return False
+        signature = self._minhash.signature(description)
+        if signature is None:
+            return False
+        key = (kind, item_id)
+        stored = self._signatures.get(key)
+        if stored is None:
+            stored = self._signatures[key] = array('Q')
+            for text in existing:
+                previous = self._minhash.signature(text)
+                if previous is not None:
+                    stored.extend(previous.tolist())
+        if stored:
+            # A copy, not a view: the array is extended below
+            rows = np.array(stored, dtype=np.uint64).reshape(-1, self._minhash.num_perm)
+            if MinHasher.similarity(signature, rows).max() >= self.near_duplicate_threshold:
+                return True
+        stored.extend(signature.tolist())
+        return False
+
+    def _add_description(self, kind: str, item_id: int, column: list, description: str) -> bool:
+        marker = hash((kind, item_id, description))
+        if marker in self._seen:
+            return False
+        self._seen.add(marker)
+        if self._is_near_duplicate(kind, item_id, column[item_id], description):
+            self.near_duplicates += 1
+            return False
+        column[item_id].append(description)
+        return True
+
+    def add_entity(self, name: str, entity_type: str, description: str):
+        """
+        Adds or merges one entity record. Returns (entity id, changed).
+        """
+        entity_id = self.intern(name)
+        changed = False
+        if not self.declared[entity_id]:
+            self.declared[entity_id] = 1
+            self.names[entity_id] = name
+            self.types[entity_id] = sys.intern(entity_type) if entity_type else entity_type
+            changed = True
+        changed |= self._add_description("e", entity_id, self.descriptions, description)
+        return entity_id, changed
+
+    def add_relationship(self, source: str, target: str, rel_type: str, description: str, strength: float):
+        """
+        Adds or merges one relationship record (max strength wins). Returns (relationship id, changed).
+        """
+        key = (self.intern(source), self._intern_rel_type(rel_type), self.intern(target))
+        return self._merge_relationship(key, [description], strength)
+
+    def _merge_relationship(self, key: tuple, descriptions: list, strength: float):
+        rel_id = self._rel_ids.get(key)
+        changed = rel_id is None
+        if rel_id is None:
+            rel_id = len(self.rel_source)
+            self._rel_ids[key] = rel_id
+            self.rel_source.append(key[0])
+            self.rel_type.append(key[1])
+            self.rel_target.append(key[2])
+            self.rel_strength.append(strength)
+            self.rel_descriptions.append([])
+        elif strength > self.rel_strength[rel_id]:
+            self.rel_strength[rel_id] = strength
+            changed = True
+        for description in descriptions:
+            changed |= self._add_description("r", rel_id, self.rel_descriptions, description)
+        return rel_id, changed
+
+    def add_chunks(self, chunks: list):
+        """
+        Merges a batch of chunk results (the extractor's output format).
+        Returns (changed entity ids, changed relationship ids).
+        """
+        changed_entities = set()
+        changed_rels = set()
+        for chunk in chunks:
+            if chunk.get("status") != "success":
+                continue
+            data = chunk.get("data")
+            if not data:
+                continue
+
+            for entity in data.get("entities", []):
+                name = entity.get("name", "")
+                if not name or not self.normalizer(name):
+                    continue
+                entity_id, changed = self.add_entity(name, entity.get("type"), entity.get("description", ""))
+                if changed:
+                    changed_entities.add(entity_id)
+
+            for relationship in data.get("relationships", []):
+                source = relationship.get("source", "")
+                target = relationship.get("target", "")
+                if not source or not target:
+                    continue
+                rel_id, changed = self.add_relationship(
+                    source,
+                    target,
+                    relationship.get("relationship_type", "related"),  # Handle missing type
+                    relationship.get("description", ""),
+                    float(relationship.get("strength", 1.0))
+                )
+                if changed:
+                    changed_rels.add(rel_id)
+
+        return changed_entities, changed_rels
+
+    def export_tables(self) -> dict:
+        """
+        The entity and relationship columns as plain lists, without the lookup and
+        deduplication state: a compact partial table to pass between processes and merge
+        into another index with merge_tables.
+        """
+        return {
+            "names": self.names,
+            "types": self.types,
+            "descriptions": self.descriptions,
+            "declared": bytes(self.declared),
+            "rel_source": self.rel_source.tolist(),
+            "rel_target": self.rel_target.tolist(),
+            "rel_type": self.rel_type.tolist(),
+            "rel_type_names": self.rel_type_names,
+            "rel_strength": self.rel_strength.tolist(),
+            "rel_descriptions": self.rel_descriptions,
+            "near_duplicates": self.near_duplicates,
+        }
+
+    def merge_tables(self, tables: dict):
+        """
+        Merges a partial table (see export_tables) as if its chunks had been added after
+        everything already indexed: names resolve through this index's normalizer, the
+        first declaration of an entity wins, descriptions are deduplicated against what is
+        stored and the max strength is kept. Entities and relationships new to this index
+        get ids in the order they first appeared in the partial table.
+        Returns (changed entity ids, changed relationship ids).
+        """
+        changed_entities = set()
+        entity_ids = []
+        for name, entity_type, descriptions, declared in zip(
+                tables["names"], tables["types"], tables["descriptions"], tables["declared"]):
+            if not declared:
+                entity_ids.append(self.intern(name))
+                continue
+            entity_id, changed = self.add_entity(name, entity_type, descriptions[0])
+            for description in descriptions[1:]:
+                changed |= self._add_description("e", entity_id, self.descriptions, description)
+            entity_ids.append(entity_id)
+            if changed:
+                changed_entities.add(entity_id)
+
+        type_ids = [self._intern_rel_type(rel_type) for rel_type in tables["rel_type_names"]]
+        changed_rels = set()
+        for source, target, rel_type, strength, descriptions in zip(
+                tables["rel_source"], tables["rel_target"], tables["rel_type"],
+                tables["rel_strength"], tables["rel_descriptions"]):
+            key = (entity_ids[source], type_ids[rel_type], entity_ids[target])
+            rel_id, changed = self._merge_relationship(key, descriptions, strength)
+            if changed:
+                changed_rels.add(rel_id)
+
+        self.near_duplicates += tables["near_duplicates"]
+        return changed_entities, changed_rels
+
+    def to_dict(self) -> dict:
+        """
+        Returns the merged entities and relationships in clean_json's output format.
+        Only relationships between declared entities are included.
+        """
+        entities = [
+            {"name": self.names[i], "type": self.types[i], "description": list(self.descriptions[i])}
+            for i in range(len(self.names)) if self.declared[i]
+        ]
+        relationships = [
+            {
+                "source": self.names[self.rel_source[r]],
+                "target": self.names[self.rel_target[r]],
+                "type": self.rel_type_names[self.rel_type[r]],
+                "description": list(self.rel_descriptions[r]),
+                "strength": self.rel_strength[r]
+            }
+            for r in range(len(self.rel_source))
+            if self.declared[self.rel_source[r]] and self.declared[self.rel_target[r]]
+        ]
+        return {"entities": entities, "relationships": relationships}
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import random
+import time
+
+# HTTP statuses worth retrying: rate limiting and transient server-side failures.
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Decides whether a failed LLM call should be retried (429, 5xx, timeouts, dropped connections).
+    """
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+
+    try:
+        import openai
+        if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+            return True
+    except ImportError:
+        pass
+
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status in RETRYABLE_STATUS_CODES or (status is not None and status >= 500)
+
+
+def retry_after_seconds(exc: Exception):
+    """
+    Reads the provider's Retry-After hint from the error response, if there is one.
+    """
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket refilled continuously at `per_minute / 60` units per second.
+    Acquirers are served in FIFO order so a large request cannot be starved by small ones.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # A single request larger than the whole budget would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+
+class ExtractionScheduler:
+    """
+    Runs LLM calls with bounded concurrency, a requests/tokens-per-minute budget
+    and exponential backoff with jitter on 429/5xx/timeouts.
+
+    A 429 pauses the whole scheduler (not just the failing call) so the provider
+    sees the request rate drop immediately instead of a retry storm.
+    """
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        requests_per_minute: float = None,
+        tokens_per_minute: float = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        request_timeout: float = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._request_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        self._token_limiter = RateLimiter(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+
+        # Counters exposed through stats()
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.tokens_completed = 0
+        self.started_at = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds a scheduler from LLM_MAX_IN_FLIGHT, LLM_RPM, LLM_TPM, LLM_MAX_RETRIES and LLM_TIMEOUT.
+        """
+        def number(name, default=None, cast=float):
+            value = os.getenv(name)
+            return cast(value) if value else default
+
+        return cls(
+            max_in_flight=number("LLM_MAX_IN_FLIGHT", 8, int),
+            requests_per_minute=number("LLM_RPM"),
+            tokens_per_minute=number("LLM_TPM"),
+            max_retries=number("LLM_MAX_RETRIES", 6, int),
+            request_timeout=number("LLM_TIMEOUT"),
+        )
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        hint = retry_after_seconds(exc)
+        if hint is not None:
+            return min(hint, self.max_delay)
+        # "Full jitter": uniform in [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _wait_for_budget(self, tokens: int):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._request_limiter:
+            await self._request_limiter.acquire(1)
+        if self._token_limiter and tokens:
+            await self._token_limiter.acquire(tokens)
+
+    async def submit(self, make_call, tokens: int = 0):
+        """
+        Runs `make_call()` (a zero-argument function returning an awaitable) under the
+        scheduler's limits, retrying transient failures. Raises the last error if the
+        call keeps failing or the error is not retryable.
+        """
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            # Also runs when the caller is cancelled while still queued
+            self.queued -= 1
+        try:
+            attempt = 0
+            while True:
+                await self._wait_for_budget(tokens)
+                self.in_flight += 1
+                try:
+                    if self.request_timeout:
+                        result = await asyncio.wait_for(make_call(), self.request_timeout)
+                    else:
+                        result = await make_call()
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        self.failed += 1
+                        raise
+                    delay = self._backoff(attempt, e)
+                    if getattr(e, "status_code", None) == 429:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    self.retries += 1
+                    attempt += 1
+                else:
+                    self.completed += 1
+                    self.tokens_completed += tokens
+                    return result
+                finally:
+                    self.in_flight -= 1
+                # Back off outside the in-flight count
+                await asyncio.sleep(delay)
+        finally:
+            self._semaphore.release()
+
+    async def stream(self, make_stream, tokens: int = 0):
+        """
+        Like submit, for a streamed call: `make_stream()` returns an async iterator whose
+        items are yielded as they arrive. Transient failures are retried only until the
+        first item has been yielded; after that the caller already holds part of the
+        answer, so the error is raised. `request_timeout` applies to each item.
+        """
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            attempt = 0
+            while True:
+                await self._wait_for_budget(tokens)
+                self.in_flight += 1
+                started = False
+                try:
+                    iterator = make_stream().__aiter__()
+                    while True:
+                        try:
+                            if self.request_timeout:
+                                item = await asyncio.wait_for(iterator.__anext__(), self.request_timeout)
+                            else:
+                                item = await iterator.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        started = True
+                        yield item
+                except Exception as e:
+                    if started or not is_retryable(e) or attempt >= self.max_retries:
+                        self.failed += 1
+                        raise
+                    delay = self._backoff(attempt, e)
+                    if getattr(e, "status_code", None) == 429:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    self.retries += 1
+                    attempt += 1
+                else:
+                    self.completed += 1
+                    self.tokens_completed += tokens
+                    return
+                finally:
+                    self.in_flight -= 1
+                await asyncio.sleep(delay)
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "elapsed_s": round(elapsed, 3),
+            "requests_per_minute": round(self.completed / elapsed * 60, 2) if elapsed else 0.0,
+            "tokens_per_minute": round(self.tokens_completed / elapsed * 60, 2) if elapsed else 0.0,
+        }
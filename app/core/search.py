@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+
+from core.llm import LLMClient
+from core.query_cache import QueryCache
+from core.scheduler import ExtractionScheduler
+from core.summarizer import report_text, level_depth
+from core.text_utils import count_tokens, extract_json
+from prompts.global_search import (
+    MAP_SYSTEM_PROMPT,
+    MAP_USER_PROMPT,
+    REDUCE_SYSTEM_PROMPT,
+    NO_DATA_ANSWER,
+)
+
+# Map answers are scored 0-100, so no unseen answer can score above this
+MAX_SCORE = 100
+
+
+class PackedAnswers:
+    """
+    Map-phase answers kept sorted by score (ties: first arrival wins) as they stream in,
+    so the reduce context is always ready and the moment the budget is provably full is
+    known without waiting for the remaining map calls.
+    """
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self._keys = []      # (-score, arrival) for bisect
+        self._answers = []
+        self._arrivals = 0
+
+    def add(self, answer: dict):
+        key = (-answer["score"], self._arrivals)
+        self._arrivals += 1
+        position = bisect.bisect(self._keys, key)
+        self._keys.insert(position, key)
+        self._answers.insert(position, answer)
+
+    def packed(self) -> list:
+        """
+        The highest-scoring answers that fit in the token budget, best first.
+        """
+        selected = []
+        used = 0
+        for answer in self._answers:
+            if used + answer["tokens"] > self.token_budget:
+                break
+            selected.append(answer)
+            used += answer["tokens"]
+        return selected
+
+    def is_full(self, upper_bound: float = MAX_SCORE) -> bool:
+        """
+        True when answers scoring at least `upper_bound` already fill the budget: any answer
+        still to come scores at most `upper_bound`, ranks after them and cannot be packed.
+        """
+        used = 0
+        for answer in self._answers:
+            if answer["score"] < upper_bound:
+                return False
+            used += answer["tokens"]
+            if used >= self.token_budget:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self._answers)
+
+
+class GlobalSearch:
+    """
+    Map-reduce global search over community reports.
+
+    Map: every report is scored against the query concurrently, bounded by the scheduler.
+    Answers stream into a score-ordered pack as they arrive; zero scores are dropped.
+    As soon as the reduce budget is provably filled by top-scoring answers, the map calls
+    that have not started yet are cancelled, so latency is bounded by the useful calls.
+    Reduce: the packed answers go to one final LLM call.
+
+    With a QueryCache, map results are reused for reports whose text is unchanged, and,
+    given the `index_version` the reports belong to, a repeated query returns its cached
+    answer without any LLM call. Answers with failed map calls are not cached.
+    """
+    def __init__(self, llm_client: LLMClient, reports: dict, level: str = None,
+                 scheduler: ExtractionScheduler = None, reduce_token_budget: int = 8000,
+                 response_type: str = "multiple paragraphs", cache: QueryCache = None, index_version=None):
+        self.llm_client = llm_client
+        self.scheduler = scheduler or ExtractionScheduler()
+        self.reduce_token_budget = reduce_token_budget
+        self.response_type = response_type
+        self.cache = cache
+        self.index_version = index_version
+
+        # Default to the finest summarized level
+        self.level = level or max(reports, key=level_depth)
+        self.reports = [r for r in reports.get(self.level, {}).values() if r.get("status", "success") == "success"]
+
+    async def _map(self, query: str, report: dict) -> list:
+        text = report_text(report)
+        key = None
+        if self.cache is not None:
+            key = QueryCache.map_key(query, text)
+            cached = self.cache.maps.get(key)
+            if cached is not None:
+                # The same report text may belong to a renumbered community
+                return [{**answer, "community_id": report.get("community_id")} for answer in cached]
+        answers = await self._map_uncached(query, report, text)
+        if key is not None:
+            self.cache.maps.put(key, answers)
+        return answers
+
+    async def _map_uncached(self, query: str, report: dict, text: str) -> list:
+        prompt = MAP_USER_PROMPT.format(context_data=text, query=query)
+        tokens = count_tokens(MAP_SYSTEM_PROMPT) + count_tokens(prompt)
+        content = await self.scheduler.submit(
+            lambda: self.llm_client.generate(prompt=prompt, system_message=MAP_SYSTEM_PROMPT),
+            tokens=tokens
+        )
+        points = extract_json(content).get("points", [])
+
+        answers = []
+        for point in points:
+            try:
+                score = float(point.get("score", 0))
+            except (TypeError, ValueError):
+                continue
+            description = point.get("description", "")
+            if score <= 0 or not description:
+                continue
+            answers.append({
+                "community_id": report.get("community_id"),
+                "score": min(score, MAX_SCORE),
+                "answer": description,
+                "tokens": count_tokens(description),
+            })
+        return answers
+
+    def reduce_context(self, answers: list) -> str:
+        sections = []
+        for i, answer in enumerate(answers, start=1):
+            sections.append(f"----Analyst {i}----\nImportance Score: {answer['score']:g}\n{answer['answer']}")
+        return "\n\n".join(sections)
+
+    async def stream(self, query: str):
+        """
+        Runs the search, yielding events as it progresses:
+        {"type": "map", ...} once per finished map call, {"type": "token", "text": str} per
+        piece of the reduce answer as it streams in, then a final
+        {"type": "answer", "answer": str, "points": [...], "map_calls": int, "skipped": int}.
+        A cached answer is yielded alone, with "cached": True.
+        """
+        answer_key = None
+        if self.cache is not None and self.index_version is not None:
+            answer_key = QueryCache.answer_key(self.index_version, self.level, self.response_type, query)
+            cached = self.cache.answers.get(answer_key)
+            if cached is not None:
+                yield {**cached, "cached": True}
+                return
+
+        pack = PackedAnswers(self.reduce_token_budget)
+        tasks = [asyncio.create_task(self._map(query, report)) for report in self.reports]
+        finished = 0
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    answers = await next_done
+                except Exception as e:
+                    print(f"Map step failed: {e}")
+                    answers = []
+                    failed += 1
+                finished += 1
+                for answer in answers:
+                    pack.add(answer)
+                yield {"type": "map", "completed": finished, "total": len(tasks), "answers": len(answers)}
+                if pack.is_full():
+                    break
+        finally:
+            # Nothing that has not finished can make it into the reduce context any more
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        packed = pack.packed()
+        if not packed:
+            answer = NO_DATA_ANSWER
+        else:
+            system_message = REDUCE_SYSTEM_PROMPT.format(
+                response_type=self.response_type,
+                report_data=self.reduce_context(packed)
+            )
+            parts = []
+            async for piece in self.scheduler.stream(
+                lambda: self.llm_client.generate_stream(prompt=query, system_message=system_message),
+                tokens=count_tokens(system_message) + count_tokens(query)
+            ):
+                parts.append(piece)
+                yield {"type": "token", "text": piece}
+            answer = "".join(parts)
+
+        result = {
+            "type": "answer",
+            "answer": answer,
+            "points": [{k: a[k] for k in ("community_id", "score", "answer")} for a in packed],
+            "map_calls": finished,
+            "failed": failed,
+            "skipped": len(tasks) - finished,
+            "cached": False,
+        }
+        if answer_key is not None and not failed:
+            self.cache.answers.put(answer_key, result)
+        yield result
+
+    async def search(self, query: str) -> dict:
+        result = None
+        async for event in self.stream(query):
+            if event["type"] == "answer":
+                result = event
+        return result
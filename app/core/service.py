@@ -0,0 +1,339 @@
+import asyncio
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import Settings
+from core.cache import ResponseCache, sha256
+from core.consolidation import DescriptionConsolidator
+from core.extractor import EntityExtractor
+from core.graph import build_graph, find_communities, get_layout
+from core.jobs import Job, JobManager
+from core.journal import ChunkJournal
+from core.llm import LLMClient
+from core.local_search import LocalSearch
+from core.query_cache import QueryCache
+from core.registry import REPORTS_FILE, IndexRegistry, LoadedIndex
+from core.scheduler import ExtractionScheduler
+from core.search import GlobalSearch
+from core.shards import write_jsonl
+from core.snapshot import SnapshotStore, load_snapshot, save_snapshot
+from core.summarizer import Summarizer, save_reports
+from core.telemetry import telemetry
+from core.text_utils import list_documents
+from prompts.extract_entities import ENTITIES_EXTRACTION_PROMPT_JSON
+
+DEFAULT_INDEX = "default"
+
+
+def build_snapshot(extraction_path: str, index_dir: str, clustering: dict = None, workers: int = 1) -> dict:
+    """
+    Builds the graph and its communities from the extraction results and saves them as a
+    new, not yet active, snapshot version. CPU-bound: runs in a worker process, which
+    parses JSONL shards in `workers` processes of its own.
+    The current version's communities (if any) warm-start Leiden; `clustering` holds further
+    find_communities options. Stage timings are returned with the result, since this
+    process's telemetry is not the service's.
+    """
+    telemetry.reset()
+    store = SnapshotStore(index_dir)
+    graph = build_graph(extraction_path, workers=workers)
+    current = store.current()
+    communities = find_communities(graph, previous=current[2] if current is not None else None, **(clustering or {}))
+    # Computed here, off the event loop, and saved with the snapshot for visualization/export
+    get_layout(graph, communities)
+    version = store.publish(graph, communities, metadata={"source": extraction_path}, activate=False)
+    levels = {}
+    for memberships in communities.values():
+        for level, cid in memberships.items():
+            levels.setdefault(level, set()).add(cid)
+    return {
+        "version": version,
+        "vertices": graph.vcount(),
+        "edges": graph.ecount(),
+        "relationships": int(graph['relationships'].offsets[-1]) if 'relationships' in graph.attributes() else graph.ecount(),
+        "communities": {level: len(ids) for level, ids in sorted(levels.items())},
+        "stages": telemetry.report()["stages"],
+    }
+
+
+class GraphRAGService:
+    """
+    The ingest -> index -> query pipeline behind the HTTP API.
+
+    Ingest and index builds run as background jobs (one at a time, see JobManager).
+    CPU-bound graph building and Leiden run in a process pool so the event loop keeps
+    serving queries; the result is published as an inactive snapshot version, its
+    descriptions consolidated, summarized, and only then made current, so queries always see a graph together with its reports.
+    Queries pick up a new version on their next call.
+    """
+    def __init__(self, settings: Settings = None, llm_client: LLMClient = None,
+                 scheduler: ExtractionScheduler = None):
+        self.settings = settings or Settings()
+        os.makedirs(self.settings.documents_dir, exist_ok=True)
+        self.cache = ResponseCache.from_env(default_path=self.settings.cache_path)
+        self.llm_client = llm_client or LLMClient(cache=self.cache)
+        # One scheduler for the whole process: ingest, summaries and queries share the provider limits
+        self.scheduler = scheduler or ExtractionScheduler.from_env()
+        self.store = SnapshotStore(self.settings.index_dir)
+        # Queries can target any index under indexes_dir; the one this service builds is "default"
+        limit = self.settings.index_memory_limit_mb
+        self.registry = IndexRegistry(self.settings.indexes_dir, memory_limit=limit * 2 ** 20 if limit else None,
+                                      paths={DEFAULT_INDEX: self.settings.index_dir})
+        self.query_cache = QueryCache(max_answers=self.settings.query_cache_answers,
+                                      max_maps=self.settings.query_cache_maps, ttl=self.settings.query_cache_ttl)
+        self.jobs = JobManager(history=self.settings.job_history)
+        self.pool = None
+        # Documents are numbered by arrival, so concurrent additions take turns
+        self._documents_lock = threading.Lock()
+
+    async def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.settings.process_workers)
+        self.jobs.start()
+
+    async def stop(self):
+        await self.jobs.stop()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.cache is not None:
+            self.cache.close()
+        await LLMClient.close_shared()
+
+    def metrics(self) -> str:
+        """
+        Prometheus text: the telemetry registry plus the current state of the scheduler, the
+        LLM endpoints, the resident indexes and the query cache.
+        """
+        for name, value in self.scheduler.stats().items():
+            telemetry.set_gauge(f"scheduler_{name}", value)
+        for endpoint, stats in self.llm_client.endpoint_stats().items():
+            telemetry.set_gauge("llm_endpoint_in_flight", stats["in_flight"], endpoint=endpoint)
+            telemetry.set_gauge("llm_endpoint_healthy", int(stats["healthy"]), endpoint=endpoint)
+            if stats["latency_s"] is not None:
+                telemetry.set_gauge("llm_endpoint_latency_seconds", stats["latency_s"], endpoint=endpoint)
+        registry = self.registry.stats()
+        telemetry.set_gauge("indexes_resident", len(registry["resident"]))
+        telemetry.set_gauge("indexes_resident_bytes", registry["resident_bytes"])
+        for tier, stats in self.query_cache.stats().items():
+            telemetry.set_gauge("query_cache_entries", stats["entries"], cache=tier)
+            if stats["hit_rate"] is not None:
+                telemetry.set_gauge("query_cache_hit_ratio", stats["hit_rate"], cache=tier)
+        return telemetry.prometheus()
+
+    def write_report(self) -> dict:
+        return telemetry.write_report(self.settings.report_path)
+
+    # --- Ingest ---
+
+    def resolve_ingest_path(self, path: str) -> str:
+        """
+        The real path of a document path sent by a client, relative to `ingest_root`.
+        Raises PermissionError if path ingest is disabled or the path (after resolving
+        symlinks) leaves the root.
+        """
+        root = self.settings.ingest_root
+        if root is None:
+            raise PermissionError("Ingesting server paths is disabled (no ingest_root configured)")
+        root = os.path.realpath(root)
+        resolved = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, resolved]) != root:
+            raise PermissionError(f"{path} is outside the ingest root")
+        return resolved
+
+    def add_documents(self, text: str = None, path: str = None, doc_id: str = None) -> list:
+        """
+        Copies a document (inline text, or a file or directory under `ingest_root`) into the
+        corpus directory. Files are numbered in arrival order, so existing documents keep
+        their position (and their chunk ids) and a re-run only extracts what is new.
+        Blocking (file copies): call it from a worker thread in async code.
+        """
+        if text is None and path is None:
+            raise ValueError("Either 'text' or 'path' is required")
+        if path is not None:
+            path = self.resolve_ingest_path(path)
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+
+        sources = [] if path is None else list_documents(path)
+        if path is not None and not sources:
+            raise ValueError(f"No .txt or .md documents found at {path}")
+        for _, source in sources:
+            # A symlink below the root may still point outside it
+            self.resolve_ingest_path(source)
+
+        directory = self.settings.documents_dir
+        added = []
+        with self._documents_lock:
+            position = len(list_documents(directory))
+            if text is not None:
+                name = doc_id or sha256(text)[:16]
+                target = os.path.join(directory, f"{position:06d}_{_safe_name(name)}.txt")
+                with open(target, "w", encoding="utf-8") as f:
+                    f.write(text)
+                added.append(target)
+                position += 1
+            for source_id, source in sources:
+                name, extension = os.path.splitext(source_id)
+                if doc_id and len(sources) == 1:
+                    name = doc_id
+                target = os.path.join(directory, f"{position:06d}_{_safe_name(name)}{extension}")
+                shutil.copyfile(source, target)
+                added.append(target)
+                position += 1
+        return added
+
+    async def ingest(self, job: Job) -> dict:
+        """
+        Extracts entities from the whole corpus. Chunks already extracted from the same text
+        are reused from the journal, so only new documents reach the LLM.
+        """
+        try:
+            return await self._ingest(job)
+        finally:
+            self.write_report()
+
+    async def _ingest(self, job: Job) -> dict:
+        extractor = EntityExtractor(self.llm_client, scheduler=self.scheduler, stream=self.settings.stream_extraction,
+                                    pack_tokens=self.settings.extraction_pack_tokens)
+        job.progress(0, None, "extracting")
+        with ChunkJournal(self.settings.journal_path) as journal:
+            results = await extractor.process_chunks(
+                self.settings.documents_dir, ENTITIES_EXTRACTION_PROMPT_JSON, journal=journal,
+                workers=self.settings.process_workers,
+                on_progress=lambda completed, total: job.progress(completed, total)
+            )
+
+        write_jsonl(self.settings.extraction_path, results)
+
+        return {
+            "documents": len(list_documents(self.settings.documents_dir)),
+            "chunks": len(results),
+            "failed": sum(1 for r in results if r["status"] != "success"),
+        }
+
+    # --- Indexing ---
+
+    def clustering(self) -> dict:
+        """
+        find_communities options from the settings.
+        """
+        return {
+            "seeds": self.settings.leiden_seeds,
+            "resolutions": self.settings.leiden_resolutions,
+            "max_cluster_size": self.settings.max_cluster_size,
+            "max_levels": self.settings.max_community_levels,
+            "workers": self.settings.process_workers or os.cpu_count(),
+        }
+
+    async def build_index(self, job: Job, levels: list = None) -> dict:
+        try:
+            return await self._build_index(job, levels)
+        finally:
+            self.write_report()
+
+    async def _build_index(self, job: Job, levels: list = None) -> dict:
+        extraction_path = self.settings.extraction_input_path
+        if not os.path.exists(extraction_path):
+            raise RuntimeError("Nothing has been ingested yet")
+
+        job.progress(0, None, "building graph")
+        loop = asyncio.get_running_loop()
+        built = await loop.run_in_executor(
+            self.pool, build_snapshot, extraction_path, self.settings.index_dir, self.clustering(),
+            self.settings.process_workers or os.cpu_count()
+        )
+        for stage, timing in built.pop("stages").items():
+            telemetry.record_stage(stage, timing["wall_s"], timing["cpu_s"])
+        version = built["version"]
+
+        # Snapshot arrays are memory-mapped, so loading what the worker wrote is cheap
+        path = self.store.path(version)
+        graph, communities, manifest = load_snapshot(path)
+
+        if self.settings.description_max_tokens:
+            job.progress(0, None, "consolidating descriptions")
+            consolidator = DescriptionConsolidator(self.llm_client, scheduler=self.scheduler, cache=self.cache,
+                                                   max_tokens=self.settings.description_max_tokens)
+            consolidated = await consolidator.consolidate_graph(
+                graph, on_progress=lambda completed, total: job.progress(completed, total, "consolidating descriptions")
+            )
+            if consolidated["entities"] or consolidated["relationships"]:
+                # The version is not active yet, so it can be rewritten in place
+                await asyncio.to_thread(save_snapshot, path, graph, communities, manifest["metadata"])
+            built["descriptions"] = consolidated
+
+        summarizer = Summarizer(graph, communities, self.llm_client, scheduler=self.scheduler,
+                                cache=self.cache, max_context_tokens=self.settings.max_context_tokens)
+        job.progress(0, None, "summarizing")
+        reports = await summarizer.summarize_all(
+            levels, on_progress=lambda level, completed, total: job.progress(completed, total, f"summarizing {level}")
+        )
+        save_reports(reports, os.path.join(path, REPORTS_FILE))
+
+        self.store.activate(version)
+        self.store.prune(keep=2)
+        return {**built, "reports": {level: len(by_id) for level, by_id in reports.items()}}
+
+    # --- Querying ---
+
+    async def search_state(self, index_id: str = None) -> LoadedIndex:
+        """
+        The loaded current version of an index (default: the one this service builds):
+        graph, communities and reports, from the registry. Raises LookupError if it has not
+        been built; the local search index is built on first use.
+        """
+        return await asyncio.to_thread(self.registry.get, index_id or DEFAULT_INDEX)
+
+    async def query_stream(self, query: str, mode: str = "global", level: str = None,
+                           response_type: str = "multiple paragraphs", index_id: str = None):
+        """
+        Validates the query against the current version of an index and returns an async
+        iterator of search events (see GlobalSearch.stream and LocalSearch.stream); the last
+        one has type "answer".
+        Raises LookupError when there is no index and ValueError for an unknown level or index id.
+        """
+        state = await self.search_state(index_id)
+
+        if mode == "local":
+            if state.local is None:
+                # BM25 indexing is CPU-bound; keep it off the event loop
+                state.local = await asyncio.to_thread(
+                    LocalSearch, self.llm_client, state.graph, state.communities, state.reports,
+                    max_context_tokens=self.settings.max_context_tokens, scheduler=self.scheduler
+                )
+            search = state.local
+
+            async def events():
+                start = time.perf_counter()
+                async for event in search.stream(query, response_type=response_type):
+                    if event["type"] == "answer":
+                        telemetry.observe("query_seconds", time.perf_counter() - start, mode=mode)
+                        event = {**event, "version": state.version}
+                    yield event
+            return events()
+
+        reports = state.reports
+        if not reports:
+            raise LookupError("The current index has no community reports")
+        if level is not None and level not in reports:
+            raise ValueError(f"Unknown level '{level}', expected one of {sorted(reports)}")
+        search = GlobalSearch(self.llm_client, reports, level=level, scheduler=self.scheduler,
+                              reduce_token_budget=self.settings.max_context_tokens, response_type=response_type,
+                              cache=self.query_cache, index_version=(state.index_id, state.version))
+
+        async def events():
+            start = time.perf_counter()
+            async for event in search.stream(query):
+                if event["type"] == "answer":
+                    telemetry.observe("query_seconds", time.perf_counter() - start, mode=mode)
+                    event = {**event, "version": state.version}
+                yield event
+        return events()
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("._") or "document"
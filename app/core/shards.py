@@ -0,0 +1,94 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.resolution import EntityIndex, NameNormalizer
+
+# Byte ranges of one JSONL file are sharded at about this size
+SHARD_BYTES = 64 * 2 ** 20
+
+
+def is_jsonl(path: str) -> bool:
+    return os.path.isdir(path) or path.endswith(".jsonl")
+
+
+def write_jsonl(path: str, chunks: list):
+    """
+    Writes chunk results one per line, atomically (via a temporary file).
+    """
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write("\n")
+    os.replace(f"{path}.tmp", path)
+
+
+def list_shards(path: str, shard_bytes: int = SHARD_BYTES) -> list:
+    """
+    Splits extraction results in JSONL form (a .jsonl file, or a directory of them read in
+    name order) into (file, start, end) byte ranges of about `shard_bytes`. A line belongs
+    to the shard it starts in, so ranges do not need to fall on line boundaries.
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".jsonl")]
+    else:
+        files = [path]
+    shards = []
+    for file in files:
+        size = os.path.getsize(file)
+        start = 0
+        while start < size:
+            end = min(size, start + shard_bytes)
+            shards.append((file, start, end))
+            start = end
+    return shards
+
+
+def read_shard(shard: tuple):
+    """
+    Yields the chunk results of the lines starting in the shard's byte range.
+    """
+    file, start, end = shard
+    with open(file, "rb") as f:
+        if start > 0:
+            # The line under `start` began earlier and belongs to the previous shard
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def partial_tables(shard: tuple, normalizer: NameNormalizer = None) -> dict:
+    """
+    Parses one shard and merges its records into a shard-local EntityIndex. Runs in a
+    pool worker; only the compact tables (see EntityIndex.export_tables) go back.
+    Only exact duplicate descriptions are dropped here: whether a description is a near
+    duplicate depends on everything stored before it, so that is decided while merging,
+    in shard order, exactly as a single pass over all chunks would.
+    """
+    index = EntityIndex(normalizer, near_duplicate_threshold=None)
+    index.add_chunks(read_shard(shard))
+    return index.export_tables()
+
+
+def iter_partial_tables(path: str, normalizer: NameNormalizer = None, workers: int = 1,
+                        shard_bytes: int = SHARD_BYTES):
+    """
+    Yields the partial tables of every shard, in shard order, built in `workers` processes.
+    At most two shards per worker are in flight, so memory is bounded by the shard size.
+    """
+    shards = list_shards(path, shard_bytes)
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(shards) or 1))) as pool:
+        pending = deque()
+        for shard in shards:
+            pending.append(pool.submit(partial_tables, shard, normalizer))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
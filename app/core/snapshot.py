@@ -0,0 +1,346 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Sequence
+
+import igraph as ig
+import numpy as np
+from core.graph import Communities, CommunityIndex, RelationshipTable
+
+SNAPSHOT_FORMAT = 1
+CURRENT_FILE = "CURRENT"
+
+
+class StringTable:
+    """
+    Deduplicated UTF-8 string table: one byte blob plus an offsets array.
+    Columns refer to strings by their integer id.
+    """
+    def __init__(self):
+        self._ids = {}
+        self.strings = []
+
+    def add(self, value: str) -> int:
+        value = "" if value is None else str(value)
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def save(self, directory: str):
+        encoded = [s.encode("utf-8") for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(os.path.join(directory, "string_offsets.npy"), offsets)
+        with open(os.path.join(directory, "strings.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+
+    @staticmethod
+    def load(directory: str) -> 'MappedStrings':
+        return MappedStrings(directory)
+
+
+class MappedStrings:
+    """
+    Read-only view of a saved StringTable. The blob and its offsets stay memory-mapped;
+    a string is decoded from its byte range only when it is looked up.
+    """
+    def __init__(self, directory: str):
+        self.offsets = np.load(os.path.join(directory, "string_offsets.npy"), mmap_mode="r")
+        blob = os.path.join(directory, "strings.bin")
+        # np.memmap refuses empty files
+        self.blob = np.memmap(blob, dtype=np.uint8, mode="r") if os.path.getsize(blob) else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.blob[int(self.offsets[string_id]):int(self.offsets[string_id + 1])].tobytes().decode("utf-8")
+
+    def column(self, ids) -> list:
+        """
+        Decodes a column of string ids, each distinct string once.
+        """
+        unique, inverse = np.unique(np.asarray(ids, dtype=np.int64), return_inverse=True)
+        values = [self[i] for i in unique.tolist()]
+        return [values[i] for i in inverse.reshape(-1).tolist()]
+
+
+class LazyStrings(Sequence):
+    """
+    One row of a ragged string column (e.g. the descriptions of a vertex) of a loaded
+    snapshot. Its strings are decoded from the mapped table on first access and kept.
+    """
+    __slots__ = ("_strings", "_ids", "_start", "_end", "_values")
+
+    def __init__(self, strings: MappedStrings, ids, start: int, end: int):
+        self._strings = strings
+        self._ids = ids
+        self._start = start
+        self._end = end
+        self._values = None
+
+    def _decoded(self) -> list:
+        if self._values is None:
+            self._values = [self._strings[j] for j in self._ids[self._start:self._end].tolist()]
+            self._strings = self._ids = None
+        return self._values
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        return self._decoded()[index]
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, LazyStrings)):
+            return self._decoded() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self._decoded())
+
+
+def _ragged(table: StringTable, lists: list):
+    """
+    Encodes a list of string lists (e.g. descriptions per vertex) as CSR offsets + string ids.
+    """
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    ids = []
+    for i, values in enumerate(lists):
+        values = [values] if values is None or isinstance(values, str) else values
+        ids.extend(table.add(v) for v in values)
+        offsets[i + 1] = len(ids)
+    return offsets, np.asarray(ids, dtype=np.int64)
+
+
+def _unragged(strings: MappedStrings, offsets, ids) -> list:
+    # Rows only record their range of string ids; nothing is decoded until a row is read
+    offsets = offsets.tolist()
+    return [LazyStrings(strings, ids, offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1)]
+
+
+def save_snapshot(path: str, graph: ig.Graph, communities: dict, metadata: dict = None):
+    """
+    Writes the graph and its community membership as a snapshot directory:
+    edge list, weights, per-level membership and the typed relationships (see
+    RelationshipTable) as .npy arrays, plus a string table for names, types and
+    descriptions. The directory is written under a temporary name and renamed into place,
+    so readers never see a half-written snapshot.
+    """
+    tmp = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    table = StringTable()
+    names = graph.vs['name'] if graph.vcount() else []
+    levels = sorted({level for comms in communities.values() for level in comms})
+
+    np.save(os.path.join(tmp, "vertex_name.npy"), np.asarray([table.add(n) for n in names], dtype=np.int64))
+    np.save(os.path.join(tmp, "vertex_type.npy"),
+            np.asarray([table.add(t) for t in (graph.vs['type'] if graph.vcount() else [])], dtype=np.int64))
+    offsets, ids = _ragged(table, graph.vs['description'] if graph.vcount() else [])
+    np.save(os.path.join(tmp, "vertex_description_offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "vertex_description_ids.npy"), ids)
+
+    edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    np.save(os.path.join(tmp, "edges.npy"), edges)
+    np.save(os.path.join(tmp, "weights.npy"), np.asarray(graph.es['weight'] if graph.ecount() else [], dtype=np.float64))
+    relationships = graph['relationships'] if 'relationships' in graph.attributes() else None
+    if relationships is not None:
+        # Typed relationships as CSR columns, in edge order
+        pairs = graph.es['pair'] if graph.ecount() else []
+        if pairs != list(range(len(pairs))):
+            relationships = relationships.take(pairs)
+        np.save(os.path.join(tmp, "rel_offsets.npy"), relationships.offsets)
+        np.save(os.path.join(tmp, "rel_type.npy"), np.asarray(
+            [table.add(relationships.type_names[t]) for t in relationships.type_ids.tolist()], dtype=np.int64))
+        np.save(os.path.join(tmp, "rel_strength.npy"), relationships.strengths)
+        np.save(os.path.join(tmp, "rel_forward.npy"), relationships.forward)
+        offsets, ids = _ragged(table, relationships.descriptions)
+        np.save(os.path.join(tmp, "rel_description_offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "rel_description_ids.npy"), ids)
+    edge_attributes = graph.es.attributes()
+    if 'type' in edge_attributes:
+        np.save(os.path.join(tmp, "edge_type.npy"), np.asarray([table.add(t) for t in graph.es['type']], dtype=np.int64))
+    if 'description' in edge_attributes:
+        offsets, ids = _ragged(table, graph.es['description'])
+        np.save(os.path.join(tmp, "edge_description_offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "edge_description_ids.npy"), ids)
+
+    # One row per level; -1 for vertices without an assignment
+    membership = np.full((len(levels), graph.vcount()), -1, dtype=np.int64)
+    for vid, name in enumerate(names):
+        comms = communities.get(name, {})
+        for row, level in enumerate(levels):
+            if level in comms:
+                membership[row, vid] = comms[level]
+    np.save(os.path.join(tmp, "membership.npy"), membership)
+    # The cached layout (see get_layout) is kept with the graph it belongs to
+    if 'layout' in graph.attributes() and graph['layout'] is not None:
+        np.save(os.path.join(tmp, "layout.npy"), np.asarray(graph['layout'], dtype=np.float64).reshape(-1, 2))
+
+    table.save(tmp)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created": time.time(),
+        "vertex_count": graph.vcount(),
+        "edge_count": graph.ecount(),
+        "levels": levels,
+        "metadata": metadata or {},
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp, path)
+    return manifest
+
+
+def load_snapshot(path: str):
+    """
+    Loads a snapshot written by save_snapshot without parsing JSON or re-running Leiden.
+    The edge list, weights, names, types and membership are copied into the igraph graph
+    and community dict; descriptions stay in the memory-mapped string table and each
+    vertex's or relationship's list is decoded on first access (see LazyStrings).
+    Returns (graph, communities, manifest).
+    """
+    with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')} in {path}")
+
+    def array(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    def exists(name):
+        return os.path.exists(os.path.join(path, f"{name}.npy"))
+
+    strings = StringTable.load(path)
+    names = strings.column(array("vertex_name"))
+    edges = array("edges")
+
+    graph = ig.Graph(n=manifest["vertex_count"], edges=edges.tolist(), directed=False)
+    graph.vs['name'] = names
+    graph.vs['type'] = strings.column(array("vertex_type"))
+    graph.vs['description'] = _unragged(strings, array("vertex_description_offsets"), array("vertex_description_ids"))
+    graph.es['weight'] = array("weights").tolist()
+    if exists("edge_type"):
+        graph.es['type'] = strings.column(array("edge_type"))
+    if exists("edge_description_offsets"):
+        graph.es['description'] = _unragged(strings, array("edge_description_offsets"), array("edge_description_ids"))
+    if exists("rel_offsets"):
+        type_ids, inverse = np.unique(array("rel_type"), return_inverse=True)
+        graph['relationships'] = RelationshipTable(
+            np.array(array("rel_offsets")), inverse.reshape(-1), [strings[i] for i in type_ids.tolist()],
+            np.array(array("rel_strength")), np.array(array("rel_forward")),
+            _unragged(strings, array("rel_description_offsets"), array("rel_description_ids")),
+        )
+        graph.es['pair'] = list(range(graph.ecount()))
+    if exists("layout"):
+        graph['layout'] = array("layout")
+
+    membership = array("membership")
+    levels = manifest["levels"]
+    rows = [membership[row].tolist() for row in range(len(levels))]
+    communities = Communities()
+    for vid, name in enumerate(names):
+        comms = {level: rows[row][vid] for row, level in enumerate(levels) if rows[row][vid] >= 0}
+        if comms:
+            communities[name] = comms
+    communities.index = CommunityIndex(graph, communities)
+
+    return graph, communities, manifest
+
+
+class SnapshotStore:
+    """
+    Versioned snapshots under one root directory (`v000001/`, `v000002/`, ...) with a
+    CURRENT file naming the active version. Publishing a new version is an atomic
+    rename + pointer swap, and `current()` picks it up on the next call, so a running
+    service can hot-swap indexes without restarting.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._loaded = None  # (version, graph, communities, manifest)
+
+    def versions(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name[1:]) for name in os.listdir(self.root)
+                      if name.startswith("v") and name[1:].isdigit())
+
+    def path(self, version: int) -> str:
+        return os.path.join(self.root, f"v{version:06d}")
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def publish(self, graph: ig.Graph, communities: dict, metadata: dict = None, activate: bool = True) -> int:
+        """
+        Saves a new snapshot version and (unless `activate` is False) makes it current.
+        Returns the version number. An inactive version can be completed with more files
+        (e.g. community reports) and switched to later with `activate`.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            versions = self.versions()
+            version = (versions[-1] + 1) if versions else 1
+            save_snapshot(self.path(version), graph, communities, metadata={**(metadata or {}), "version": version})
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: int):
+        """
+        Atomically points CURRENT at an existing version.
+        """
+        if not os.path.isdir(self.path(version)):
+            raise FileNotFoundError(self.path(version))
+        with self._lock:
+            pointer = os.path.join(self.root, f"{CURRENT_FILE}.tmp")
+            with open(pointer, "w", encoding="utf-8") as f:
+                f.write(str(version))
+            os.replace(pointer, os.path.join(self.root, CURRENT_FILE))
+
+    def current(self):
+        """
+        Returns (version, graph, communities, manifest) for the current version, loading it
+        only when the CURRENT pointer has moved since the last call. Readers holding the
+        previous tuple keep using it undisturbed.
+        """
+        version = self.current_version()
+        if version is None:
+            return None
+        loaded = self._loaded
+        if loaded is not None and loaded[0] == version:
+            return loaded
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != version:
+                graph, communities, manifest = load_snapshot(self.path(version))
+                self._loaded = (version, graph, communities, manifest)
+            return self._loaded
+
+    def prune(self, keep: int = 2):
+        """
+        Deletes all but the newest `keep` versions (never the current one).
+        """
+        current = self.current_version()
+        for version in self.versions()[:-keep] if keep else self.versions():
+            if version != current:
+                shutil.rmtree(self.path(version), ignore_errors=True)
@@ -1,4 +1,238 @@
+import asyncio
+import json
+
+import igraph as ig
+
+from core.cache import ResponseCache, sha256
+from core.graph import CommunityIndex, edge_relationships
+from core.llm import LLMClient
+from core.scheduler import ExtractionScheduler
+from core.telemetry import telemetry
+from core.text_utils import count_tokens, extract_json
+from prompts.community_report import COMMUNITY_REPORT_PROMPT
+
+
+def level_depth(level: str) -> int:
+    """
+    'level_0' -> 0 (root), 'level_1' -> 1, ... Higher numbers are finer levels.
+    """
+    return int(level.rsplit('_', 1)[1])
+
+
+def report_text(report: dict) -> str:
+    """
+    Renders a report as plain text, the form used inside parent and search contexts.
+    """
+    lines = [f"# {report.get('title', '')}", "", report.get('summary', '')]
+    for finding in report.get('findings', []):
+        lines += ["", f"## {finding.get('summary', '')}", "", finding.get('explanation', '')]
+    return "\n".join(lines)
+
+
+def save_reports(reports: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {level: {str(cid): report for cid, report in by_id.items()} for level, by_id in reports.items()},
+            f, indent=2, ensure_ascii=False
+        )
+
+
+def load_reports(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {level: {int(cid): report for cid, report in by_id.items()} for level, by_id in data.items()}
+
+
 class Summarizer:
-    def __init__(self, graph: ig.Graph, communities: dict):
+    """
+    Generates a report per community, bottom-up.
+
+    The finest level is summarized from each community's entities and relationships,
+    prioritized by degree and cut to `max_context_tokens`. Every coarser level is then
+    summarized from its children's reports rather than from raw entities. All communities
+    of a level run concurrently through the scheduler (bounded parallelism). Reports are
+    cached by the hash of their input, so communities whose contents did not change after
+    a re-index are not summarized again.
+    """
+    def __init__(self, graph: ig.Graph, communities: dict, llm_client: LLMClient = None,
+                 scheduler: ExtractionScheduler = None, cache: ResponseCache = None,
+                 max_context_tokens: int = 8000, prompt: str = COMMUNITY_REPORT_PROMPT):
         self.graph = graph
-        self.communities = communities
\ No newline at end of file
+        self.communities = communities
+        self.llm_client = llm_client
+        self.scheduler = scheduler or ExtractionScheduler()
+        self.cache = cache
+        self.max_context_tokens = max_context_tokens
+        self.prompt = prompt
+
+        index = getattr(communities, 'index', None)
+        self.index = index if index is not None and index.graph is graph else CommunityIndex(graph, communities)
+        self.degrees = graph.degree()
+
+    # --- Context building ---
+
+    def build_entity_context(self, level: str, community_id: int) -> str:
+        """
+        Entities and relationships of one community as CSV-like tables, highest-degree first,
+        cut to the token budget. Relationships are added in order of combined endpoint degree,
+        each pulling in its endpoints; remaining entities fill what budget is left.
+        """
+        g = self.graph
+        vertices = self.index.vertices(level, community_id).tolist()
+        members = set(vertices)
+        names = g.vs['name']
+        edges = [e for e in g.es.select(_within=vertices)] if vertices else []
+        # Ties are broken by name, not by vertex/edge id, so an unchanged community renders
+        # the same context (and hits the report cache) after a re-index renumbers the graph
+        edges.sort(key=lambda e: (-(self.degrees[e.source] + self.degrees[e.target]),
+                                  names[e.source], names[e.target]))
+        # Each edge stands for one or more typed relationships, rendered one row each
+        relationships = [r for edge in edges for r in edge_relationships(g, edge)]
+
+        entity_rows = {}
+        relationship_rows = []
+        used = count_tokens("-----Entities-----\nid,entity,description\n\n-----Relationships-----\nid,source,target,description\n")
+
+        def entity_row(vid, position) -> str:
+            return f"{position},{names[vid]},{' '.join(g.vs[vid]['description'])}"
+
+        # A relationship is added together with any endpoint not yet in the context, or not at all
+        for relationship in relationships:
+            source, target = relationship["source"], relationship["target"]
+            missing = [v for v in dict.fromkeys((source, target)) if v not in entity_rows]
+            rows = [entity_row(v, len(entity_rows) + 1 + i) for i, v in enumerate(missing)]
+            row = f"{len(relationship_rows) + 1},{names[source]},{names[target]},{' '.join(relationship['description'])}"
+            cost = sum(count_tokens(r) + 1 for r in rows + [row])
+            if used + cost > self.max_context_tokens:
+                break
+            entity_rows.update(zip(missing, rows))
+            relationship_rows.append(row)
+            used += cost
+
+        # Spend what is left on the remaining entities, highest degree first
+        for vid in sorted(members, key=lambda v: (-self.degrees[v], names[v])):
+            if vid in entity_rows:
+                continue
+            row = entity_row(vid, len(entity_rows) + 1)
+            cost = count_tokens(row) + 1
+            if used + cost <= self.max_context_tokens:
+                entity_rows[vid] = row
+                used += cost
+
+        return "\n".join(
+            ["-----Entities-----", "id,entity,description", *entity_rows.values(), "",
+             "-----Relationships-----", "id,source,target,description", *relationship_rows]
+        )
+
+    def children(self, level: str, community_id: int, child_level: str) -> dict:
+        """
+        Child community ids at `child_level` whose members belong to this community,
+        with the number of members each contributes.
+        """
+        child_ids = {}
+        names = self.graph.vs['name']
+        for vid in self.index.vertices(level, community_id).tolist():
+            child = self.communities.get(names[vid], {}).get(child_level)
+            if child is not None:
+                child_ids[child] = child_ids.get(child, 0) + 1
+        return child_ids
+
+    def build_report_context(self, level: str, community_id: int, child_level: str, child_reports: dict) -> str:
+        """
+        The reports of a community's children, largest child first, cut to the token budget.
+        Children are identified by position, not id, so renumbering does not change the context.
+        """
+        children = self.children(level, community_id, child_level)
+        reports = [child_reports[c] for c in children
+                   if c in child_reports and child_reports[c].get("status") != "error"]
+        reports.sort(key=lambda r: (-children[r["community_id"]], r.get("hash", "")))
+
+        sections = []
+        used = 0
+        for position, report in enumerate(reports, start=1):
+            section = f"-----Sub-community {position}-----\n{report_text(report)}"
+            cost = count_tokens(section)
+            if used + cost > self.max_context_tokens:
+                break
+            sections.append(section)
+            used += cost
+        return "\n\n".join(sections)
+
+    # --- Summarization ---
+
+    async def summarize_community(self, level: str, community_id: int, context: str) -> dict:
+        content_hash = sha256(context)
+        # Keyed by the model too: another model's report is not reused after a switch
+        key = ResponseCache.make_key(f"community_report:{self.llm_client.serving_model()}", self.prompt, context)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                # Same contents may now sit under a different (renumbered) community id
+                return {**json.loads(cached), "level": level, "community_id": community_id}
+
+        report = {
+            "level": level,
+            "community_id": community_id,
+            "size": self.index.sizes.get(level, {}).get(community_id, 0),
+            "hash": content_hash,
+        }
+        try:
+            tokens = count_tokens(self.prompt) + count_tokens(context)
+            content = await self.scheduler.submit(
+                lambda: self.llm_client.generate(prompt=context, system_message=self.prompt),
+                tokens=tokens
+            )
+            data = extract_json(content)
+        except Exception as e:
+            print(f"Failed to summarize community {community_id} ({level}): {e}")
+            return {**report, "status": "error", "error": str(e)}
+
+        report.update({
+            "status": "success",
+            "title": data.get("title", ""),
+            "summary": data.get("summary", ""),
+            "rating": data.get("rating"),
+            "rating_explanation": data.get("rating_explanation", ""),
+            "findings": data.get("findings", []),
+        })
+        if self.cache is not None:
+            self.cache.put(key, json.dumps(report, ensure_ascii=False), model="community_report")
+        return report
+
+    @telemetry.timed("summarize")
+    async def summarize_all(self, levels: list = None, on_progress=None) -> dict:
+        """
+        Summarizes every community of the requested levels (default: all), finest level
+        first. Returns {level: {community_id: report}}.
+        `on_progress(level, completed, total)` is called as communities finish.
+        """
+        all_levels = sorted(self.index.levels(), key=level_depth, reverse=True)
+        wanted = set(levels or all_levels)
+        # A coarser level is built from the reports of every level below it, even if not requested
+        coarsest = min((level_depth(l) for l in wanted), default=0)
+        run = [l for l in all_levels if level_depth(l) >= coarsest]
+
+        reports = {}
+        finer = None
+        for level in run:
+            ids = self.index.community_ids(level)
+            if finer is None:
+                contexts = [self.build_entity_context(level, cid) for cid in ids]
+            else:
+                contexts = [self.build_report_context(level, cid, finer, reports[finer]) for cid in ids]
+            completed = 0
+
+            async def summarize(cid, context):
+                nonlocal completed
+                report = await self.summarize_community(level, cid, context)
+                completed += 1
+                if on_progress:
+                    on_progress(level, completed, len(ids))
+                return report
+
+            results = await asyncio.gather(*[summarize(cid, context) for cid, context in zip(ids, contexts)])
+            reports[level] = dict(zip(ids, results))
+            finer = level
+            print(f"Summarized {len(ids)} communities at {level}: {self.scheduler.stats()}")
+
+        return {level: by_id for level, by_id in reports.items() if level in wanted}
@@ -0,0 +1,325 @@
+import asyncio
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers cache hits through slow reasoning-model completions
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+
+PREFIX = "graphrag_"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus semantics: upper bounds, plus +Inf).
+    """
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimated by linear interpolation inside the bucket holding the q-th observation.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 4),
+            "p95": round(self.quantile(0.95), 4),
+            "p99": round(self.quantile(0.99), 4),
+        }
+
+
+class Telemetry:
+    """
+    In-process metrics registry: counters, gauges and histograms keyed by name and labels.
+
+    Instrumented code records LLM calls (tokens, latency, cache hits), pipeline stages
+    (wall and CPU time), chunk outcomes and in-flight concurrency. The registry renders
+    as Prometheus text (`prometheus()`) or as a JSON run report (`report()`), which is
+    enough to tell whether a slow run is waiting on the provider, on tokenization or on
+    graph work. Recording is cheap and thread-safe.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    # --- Primitives ---
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get(self._key(name, labels), 0.0)
+
+    # --- Pipeline events ---
+
+    def record_llm_call(self, model: str, latency: float, usage=None, status: str = "success"):
+        """
+        One provider call. `usage` is the OpenAI response's usage object (may be None).
+        """
+        model = model or "unknown"
+        self.inc("llm_requests_total", model=model, status=status)
+        self.observe("llm_latency_seconds", latency, model=model)
+        if usage is not None:
+            self.inc("llm_prompt_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, model=model)
+            self.inc("llm_completion_tokens_total", getattr(usage, "completion_tokens", 0) or 0, model=model)
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+            self.inc("llm_cached_tokens_total", cached or 0, model=model)
+
+    def record_cache_hit(self, model: str):
+        self.inc("llm_cache_hits_total", model=model or "unknown")
+
+    def record_chunk(self, status: str, truncated: bool = False):
+        self.inc("chunks_total", status=status)
+        if truncated:
+            self.inc("chunks_truncated_total")
+
+    def record_stage(self, stage: str, wall: float, cpu: float):
+        self.inc("stage_runs_total", stage=stage)
+        self.inc("stage_wall_seconds_total", wall, stage=stage)
+        self.inc("stage_cpu_seconds_total", cpu, stage=stage)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """
+        Times a block: wall clock and this process's CPU time. Inside asyncio code the CPU
+        time includes whatever else the event loop ran meanwhile.
+        """
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def timed(self, stage: str):
+        """
+        Decorator form of `stage` for plain and async functions.
+        """
+        def decorate(function):
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.stage(stage):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    async def timed_iter(self, iterable, stage: str):
+        """
+        Re-yields an async iterable, recording the time spent waiting for its items as one
+        `stage` run (e.g. how long extraction waited on the chunker).
+        """
+        iterator = iterable.__aiter__()
+        wall = 0.0
+        cpu = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                started_cpu = time.process_time()
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    wall += time.perf_counter() - started
+                    cpu += time.process_time() - started_cpu
+                yield item
+        finally:
+            self.record_stage(stage, wall, cpu)
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    @contextmanager
+    def in_flight(self, name: str = "llm"):
+        """
+        Tracks how many calls are running at once (current and peak).
+        """
+        key = self._key(f"{name}_in_flight", {})
+        peak_key = self._key(f"{name}_in_flight_max", {})
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + 1
+            self.gauges[peak_key] = max(self.gauges.get(peak_key, 0), self.gauges[key])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.gauges[key] -= 1
+
+    # --- Output ---
+
+    def prometheus(self) -> str:
+        """
+        Prometheus text exposition format.
+        """
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        def grouped(metrics):
+            by_name = {}
+            for (name, labels), value in sorted(metrics.items()):
+                by_name.setdefault(name, []).append((labels, value))
+            return by_name.items()
+
+        lines = []
+        with self._lock:
+            for name, series in grouped(self.counters):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines += [f"{PREFIX}{name}{labels_text(labels)} {value:g}" for labels, value in series]
+            for name, series in grouped(self.gauges):
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                lines += [f"{PREFIX}{name}{labels_text(labels)} {value:g}" for labels, value in series]
+            for name, series in grouped(self.histograms):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for labels, histogram in series:
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else f"{bound:g}"
+                        lines.append(f"{PREFIX}{name}_bucket{labels_text(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{labels_text(labels)} {histogram.sum:g}")
+                    lines.append(f"{PREFIX}{name}_count{labels_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> dict:
+        """
+        A JSON-friendly summary of the run so far.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+
+        def by_label(name: str, label: str) -> dict:
+            values = {}
+            for (metric, labels), value in counters.items():
+                if metric == name:
+                    key = dict(labels).get(label)
+                    values[key] = values.get(key, 0.0) + value
+            return values
+
+        llm = {}
+        for model, requests in by_label("llm_requests_total", "model").items():
+            errors = sum(v for (metric, labels), v in counters.items()
+                         if metric == "llm_requests_total" and dict(labels).get("model") == model
+                         and dict(labels).get("status") != "success")
+            latency = histograms.get(self._key("llm_latency_seconds", {"model": model}))
+            llm[model] = {
+                "requests": int(requests),
+                "errors": int(errors),
+                "prompt_tokens": int(by_label("llm_prompt_tokens_total", "model").get(model, 0)),
+                "completion_tokens": int(by_label("llm_completion_tokens_total", "model").get(model, 0)),
+                "cached_tokens": int(by_label("llm_cached_tokens_total", "model").get(model, 0)),
+                "latency_s": latency.summary() if latency else None,
+            }
+        cache_hits = by_label("llm_cache_hits_total", "model")
+
+        stages = {}
+        wall = by_label("stage_wall_seconds_total", "stage")
+        cpu = by_label("stage_cpu_seconds_total", "stage")
+        for stage, runs in by_label("stage_runs_total", "stage").items():
+            stages[stage] = {
+                "runs": int(runs),
+                "wall_s": round(wall.get(stage, 0.0), 4),
+                "cpu_s": round(cpu.get(stage, 0.0), 4),
+                # Close to 1: CPU-bound in this process; close to 0: waiting (provider, I/O, workers)
+                "cpu_ratio": round(cpu.get(stage, 0.0) / wall[stage], 3) if wall.get(stage) else None,
+            }
+
+        chunks = {status: int(n) for status, n in by_label("chunks_total", "status").items()}
+        total_chunks = sum(chunks.values())
+
+        return {
+            "generated": time.time(),
+            "uptime_s": round(time.time() - self.started, 3),
+            "llm": llm,
+            "llm_cache_hits": {model: int(n) for model, n in cache_hits.items()},
+            "stages": stages,
+            "chunks": {
+                **chunks,
+                "truncated": int(counters.get(self._key("chunks_truncated_total", {}), 0)),
+                "error_rate": round(chunks.get("error", 0) / total_chunks, 4) if total_chunks else 0.0,
+            },
+            "concurrency": {
+                "llm_in_flight": gauges.get(self._key("llm_in_flight", {}), 0),
+                "llm_in_flight_max": gauges.get(self._key("llm_in_flight_max", {}), 0),
+            },
+        }
+
+    def write_report(self, path: str) -> dict:
+        report = self.report()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        return report
+
+
+# Process-wide registry shared by all instrumented modules
+telemetry = Telemetry()
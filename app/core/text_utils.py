@@ -1,28 +1,249 @@
+import asyncio
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
 import tiktoken
 
+_ENCODER = None
+_ENCODER_LOCK = threading.Lock()
+
+# File extensions picked up when chunking a directory of documents
+DOCUMENT_EXTENSIONS = (".txt", ".md")
+
+def get_encoder():
+    """
+    Returns the process-wide cl100k_base encoder (created once, shared by every caller).
+    """
+    global _ENCODER
+    if _ENCODER is None:
+        with _ENCODER_LOCK:
+            if _ENCODER is None:
+                _ENCODER = tiktoken.get_encoding("cl100k_base")
+    return _ENCODER
+
+@dataclass
+class Chunk:
+    """
+    A chunk of one document together with its position in that document's token stream.
+    `token_count` is known from chunking, so later stages never need to re-encode the text.
+    """
+    doc_id: str
+    index: int
+    text: str
+    start_token: int
+    end_token: int
+
+    @property
+    def token_count(self) -> int:
+        return self.end_token - self.start_token
+
 def chunk_text(text: str, chunk_size: int, overlap: int):
     """
     Splits the input text into chunks of tokens using the cl100k_base encoding (used by GPT-4/3.5).
-    
+
     Args:
         text (str): The input text to be chunked.
         chunk_size (int): The maximum number of tokens in each chunk.
         overlap (int): The number of overlapping tokens between consecutive chunks.
-        
+
     Yields:
         str: A chunk of text decoded from tokens.
     """
-    encoder = tiktoken.get_encoding("cl100k_base")
+    encoder = get_encoder()
     tokens = encoder.encode(text)
-    
+
     for i in range(0, len(tokens), chunk_size - overlap):
         yield encoder.decode(tokens[i:i + chunk_size])
 
+def count_tokens(text: str) -> int:
+    """
+    Returns the number of cl100k_base tokens in the text.
+    """
+    return len(get_encoder().encode(text))
+
+def load_text(file_path: str):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def extract_json(content: str):
+    """
+    Extracts JSON from a string that might contain markdown code blocks or other text.
+    """
+    try:
+        # Try parsing directly first
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    # Try to find markdown code blocks
+    match = re.search(r'```(?:json)?\s*(.*?)```', content, re.DOTALL)
+    if match:
+        json_str = match.group(1).strip()
+        try:
+            return json.loads(json_str)
+        except json.JSONDecodeError:
+            pass
+    
+    # Try to find the first { and last }
+    start = content.find('{')
+    end = content.rfind('}')
+    
+    if start != -1 and end != -1 and end > start:
+        json_str = content[start:end+1]
+        try:
+            return json.loads(json_str)
+        except json.JSONDecodeError:
+            pass
+            
+    # If all else fails, raise the original error or a new one
+    raise ValueError("Could not extract valid JSON from response")
+
+def _split_point(text: str) -> int:
+    """
+    Position of the last non-space -> space/tab transition. No cl100k token spans such a
+    boundary (trailing newlines can stick to punctuation, spaces cannot), so encoding the
+    two halves separately yields exactly the tokens of the whole.
+    """
+    i = len(text) - 1
+    while i > 0:
+        if text[i] in " \t" and not text[i - 1].isspace():
+            return i
+        i -= 1
+    return 0
+
+def stream_chunks(file_path: str, chunk_size: int, overlap: int, doc_id: str = None, block_chars: int = 1 << 20):
+    """
+    Streams the chunks of one file without reading or encoding the whole file at once.
+
+    The file is read `block_chars` characters at a time and encoded incrementally; only the
+    tokens of the current window plus one block are held in memory. Produces the same
+    chunks as `chunk_text(load_text(file_path), ...)`.
+
+    Yields:
+        Chunk: Successive chunks with their token offsets in the document.
+    """
+    encoder = get_encoder()
+    step = chunk_size - overlap
+    doc_id = doc_id if doc_id is not None else os.path.basename(file_path)
+
+    window = []       # tokens not yet fully consumed by emitted chunks
+    window_start = 0  # absolute token offset of window[0]
+    index = 0
+    carry = ""
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(block_chars)
+            eof = not block
+            text = carry + block
+            if eof:
+                ready, carry = text, ""
+            else:
+                cut = _split_point(text)
+                ready, carry = text[:cut], text[cut:]
+            if ready:
+                window.extend(encoder.encode(ready))
+
+            # Emit every chunk whose full window is available (all remaining ones at EOF)
+            while len(window) >= chunk_size or (eof and window):
+                piece = window[:chunk_size]
+                yield Chunk(doc_id, index, encoder.decode(piece), window_start, window_start + len(piece))
+                index += 1
+                if len(window) <= step and eof:
+                    window = []
+                    break
+                window = window[step:]
+                window_start += step
+
+            if eof:
+                return
+
+def list_documents(path: str) -> list:
+    """
+    Returns [(doc_id, file_path)] for a single file or, for a directory, every
+    document below it in a stable (sorted) order.
+    """
+    if os.path.isfile(path):
+        return [(os.path.basename(path), path)]
+
+    documents = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(DOCUMENT_EXTENSIONS):
+                full_path = os.path.join(root, name)
+                documents.append((os.path.relpath(full_path, path), full_path))
+    return sorted(documents)
+
+def _chunk_document(file_path: str, doc_id: str, chunk_size: int, overlap: int) -> list:
+    # Runs inside a pool worker; each worker process builds its own encoder singleton once
+    return list(stream_chunks(file_path, chunk_size, overlap, doc_id=doc_id))
+
+async def astream_chunks(path: str, chunk_size: int, overlap: int, workers: int = None):
+    """
+    Asynchronously yields the chunks of a file or a directory of documents, in document order.
+
+    A single document is chunked incrementally in a background thread, so the first chunk
+    is available as soon as the first block is encoded. Several documents are tokenized in
+    parallel in a process pool, keeping at most `2 * workers` documents in flight so memory
+    stays bounded by the documents being processed rather than the corpus.
+    """
+    documents = list_documents(path)
+    loop = asyncio.get_running_loop()
+
+    if len(documents) == 1 or workers == 1:
+        queue = asyncio.Queue(maxsize=64)
+        done = object()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for doc_id, file_path in documents:
+                    for chunk in stream_chunks(file_path, chunk_size, overlap, doc_id=doc_id):
+                        if stop.is_set():
+                            return
+                        asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            # If the consumer stopped early, unblock a producer waiting on a full queue
+            stop.set()
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            await producer
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        documents = iter(documents)
+        while True:
+            while len(pending) < 2 * workers:
+                try:
+                    doc_id, file_path = next(documents)
+                except StopIteration:
+                    break
+                pending.append(loop.run_in_executor(pool, _chunk_document, file_path, doc_id, chunk_size, overlap))
+            if not pending:
+                return
+            for chunk in await pending.pop(0):
+                yield chunk
+
 if __name__ == "__main__":
     text = 'word ' * 5000
     for chunk in chunk_text(text, chunk_size=2400, overlap=100):
         print(chunk)
-
-def load_text(file_path: str):
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
\ No newline at end of file
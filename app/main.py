@@ -1,26 +1,142 @@
 import asyncio
-from core.llm import LLMClient
-from core.extractor import EntityExtractor
-from prompts.extract_entities import ENTITIES_EXTRACTION_PROMPT_JSON
 import json
 import os
+import sys
+from contextlib import asynccontextmanager
 
-async def main():
-    llm = LLMClient()
-    extractor = EntityExtractor(llm)
-    results = await extractor.process_chunks("/home/ziatit/Codes/ms_graphrag_replica/data/sherlock_holmes_clean.txt", ENTITIES_EXTRACTION_PROMPT_JSON)
+# `uvicorn app.main:app` imports this file as part of the `app` package; the modules
+# below are imported as top-level `core`, `models`, ... so the app directory must be on the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-    for result in results:
-        if result["status"] == "success":
-            print(f"Chunk {result['chunk_id']}: {result['data']}")
-        else:
-            print(f"Chunk {result['chunk_id']} failed: {result['error']}")
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-    # Save results to output directory
-    output_path = os.path.join("output", "extracted_entities_whole_book.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    print(f"Results saved to {output_path}")
+from config import Settings
+from core.service import GraphRAGService
+from core.telemetry import telemetry
+from models import IngestRequest, BuildIndexRequest, QueryRequest, JobStatus
+
+
+def sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def create_app(service: GraphRAGService = None) -> FastAPI:
+    """
+    Builds the API. The service (LLM client, process pool, job queue) is created on
+    startup, so importing this module does not need any credentials.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.service = service or GraphRAGService(Settings())
+        await app.state.service.start()
+        try:
+            yield
+        finally:
+            await app.state.service.stop()
+
+    app = FastAPI(title="GraphRAG", lifespan=lifespan)
+
+    def get_job(job_id: str) -> JobStatus:
+        job = app.state.service.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+        return JobStatus(**job.to_dict())
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "index_version": app.state.service.store.current_version()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """
+        Prometheus scrape endpoint: LLM tokens and latency, stage timings, chunk outcomes, concurrency.
+        """
+        return PlainTextResponse(app.state.service.metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/indexes")
+    async def indexes():
+        """
+        Queryable index ids, and the resident ones with their estimated memory footprint.
+        """
+        registry = app.state.service.registry
+        return {"indexes": await asyncio.to_thread(registry.index_ids), **registry.stats()}
+
+    @app.get("/report")
+    async def report():
+        return telemetry.report()
+
+    @app.post("/ingest", status_code=202, response_model=JobStatus)
+    async def ingest(request: IngestRequest):
+        """
+        Adds a document to the corpus and queues entity extraction.
+        """
+        service = app.state.service
+        try:
+            await asyncio.to_thread(service.add_documents, text=request.text, path=request.path,
+                                    doc_id=request.doc_id)
+        except PermissionError as e:
+            raise HTTPException(status_code=403, detail=str(e))
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=f"No such file or directory: {e}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        job = service.jobs.submit("ingest", service.ingest)
+        return get_job(job.id)
+
+    @app.post("/build-index", status_code=202, response_model=JobStatus)
+    async def build_index(request: BuildIndexRequest = None):
+        """
+        Queues graph building, community detection and community summarization.
+        """
+        service = app.state.service
+        levels = request.levels if request else None
+        job = service.jobs.submit("build-index", lambda job: service.build_index(job, levels=levels))
+        return get_job(job.id)
+
+    @app.get("/jobs", response_model=list[JobStatus])
+    async def list_jobs():
+        return [JobStatus(**job.to_dict()) for job in app.state.service.jobs.list()]
+
+    @app.get("/jobs/{job_id}", response_model=JobStatus)
+    async def job_status(job_id: str):
+        return get_job(job_id)
+
+    @app.post("/query")
+    async def query(request: QueryRequest):
+        """
+        Answers a query against the current index. With `stream`, progress, the answer as it
+        is generated and the final answer with its metadata are sent as server-sent events
+        (`event: map` or `event: context`, `event: token` ..., then `event: answer`).
+        """
+        try:
+            events = await app.state.service.query_stream(
+                request.query, mode=request.mode, level=request.level, response_type=request.response_type,
+                index_id=request.index_id
+            )
+        except LookupError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if request.stream:
+            async def body():
+                async for event in events:
+                    yield sse(event)
+            return StreamingResponse(body(), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        answer = None
+        async for event in events:
+            if event["type"] == "answer":
+                answer = event
+        return answer
+
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,6 @@
+from models.api import (
+    IngestRequest,
+    BuildIndexRequest,
+    QueryRequest,
+    JobStatus,
+)
@@ -0,0 +1,44 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class IngestRequest(BaseModel):
+    """
+    A document to add to the corpus: either inline `text` or a `path` on the server
+    (a file or a directory of .txt/.md files), relative to the configured ingest_root
+    and only accepted if one is configured.
+    """
+    text: Optional[str] = None
+    path: Optional[str] = None
+    doc_id: Optional[str] = None
+
+
+class BuildIndexRequest(BaseModel):
+    # Levels to summarize (default: all)
+    levels: Optional[list[str]] = None
+
+
+class QueryRequest(BaseModel):
+    query: str = Field(min_length=1)
+    mode: Literal["global", "local"] = "global"
+    # Community level for global search (default: the finest summarized level)
+    level: Optional[str] = None
+    response_type: str = "multiple paragraphs"
+    # Answer as server-sent events instead of a single JSON response
+    stream: bool = False
+    # Index to query (default: the one this service builds)
+    index_id: Optional[str] = None
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    stage: Optional[str] = None
+    completed: int = 0
+    total: Optional[int] = None
+    created: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
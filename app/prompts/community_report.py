@@ -0,0 +1,35 @@
+COMMUNITY_REPORT_PROMPT = """
+-Goal-
+Write a comprehensive report of a community, given a list of entities that belong to the community as well as their relationships and optional associated claims. The report will be used to inform decision-makers about information associated with the community and their potential impact. The content of this report includes an overview of the community's key entities, their relationships, and noteworthy facts about the plot.
+
+The input is either:
+- the community's entities and relationships, as CSV-like tables, or
+- the reports of the sub-communities the community is made of. In that case, combine them into one report about the whole community; do not simply list them.
+
+-Report Structure-
+The report should include the following sections:
+- TITLE: community's name that represents its key entities - title should be short but specific. When possible, include representative named entities in the title.
+- SUMMARY: An executive summary of the community's overall structure, how its entities are related to each other, and significant information associated with its entities.
+- IMPACT SEVERITY RATING: a float score between 0-10 that represents the importance of the community to the plot.
+- RATING EXPLANATION: Give a single sentence explanation of the rating.
+- DETAILED FINDINGS: A list of 5-10 key insights about the community. Each insight should have a short summary followed by multiple paragraphs of explanatory text grounded in the input.
+
+IMPORTANT:
+- Output MUST be valid JSON.
+- Do NOT include comments (like // or #) in the JSON output.
+- Do NOT use trailing commas.
+- Ensure all keys and string values are enclosed in double quotes.
+- Do NOT make up facts that are not supported by the input.
+
+Return output as a well-formed JSON-formatted string with the following format:
+{
+  "title": <report_title>,
+  "summary": <executive_summary>,
+  "rating": <impact_severity_rating>,
+  "rating_explanation": <rating_explanation>,
+  "findings": [
+    {"summary": <insight_1_summary>, "explanation": <insight_1_explanation>},
+    {"summary": <insight_2_summary>, "explanation": <insight_2_explanation>}
+  ]
+}
+"""
@@ -0,0 +1,10 @@
+CONSOLIDATE_DESCRIPTIONS_PROMPT = """
+You are a helpful assistant responsible for generating a comprehensive summary of the data provided below.
+Given an entity (or a relationship between two entities) and a list of descriptions of it, all related to the same entity or relationship, concatenate all of these into a single, comprehensive description. Make sure to include information collected from all the descriptions.
+If the descriptions are contradictory, resolve the contradictions and provide a single, coherent summary.
+Write in third person, and include the entity names so we have the full context.
+Do NOT make up facts that are not supported by the descriptions.
+Limit the description to {max_words} words.
+
+Return only the description text, without any preamble, headings or formatting.
+"""
@@ -75,4 +75,17 @@ JSON Output:
     {"source": "Wedding Ring", "target": "3 Lauriston Gardens", "relationship_type": "LOCATED_AT", "description": "The ring was found at the crime scene.", "strength": 6}
   ]
 }
-"""
\ No newline at end of file
+"""
+# Appended to the extraction prompt when several chunks are packed into one request
+PACKED_CHUNKS_INSTRUCTIONS = """
+-Multiple chunks-
+The input contains several independent text chunks, each wrapped as <chunk id="N">...</chunk>.
+Extract entities and relationships from every chunk separately, as if each were the only input text.
+Return one entry per chunk, in the same order, with its chunk id:
+
+{
+  "chunks": [
+    {"chunk_id": N, "entities": [...], "relationships": [...]}
+  ]
+}
+"""
@@ -0,0 +1,57 @@
+MAP_SYSTEM_PROMPT = """
+---Role---
+You are a helpful assistant responding to questions about data in the tables provided.
+
+---Goal---
+Generate a response consisting of a list of key points that responds to the user's question, summarizing all relevant information in the input data tables.
+
+You should use the data provided in the data tables below as the primary context for generating the response.
+If you don't know the answer or if the input data tables do not contain sufficient information to provide an answer, just say so. Do not make anything up.
+
+Each key point in the response should have the following element:
+- Description: A comprehensive description of the point.
+- Importance Score: An integer score between 0-100 that indicates how important the point is in answering the user's question. An 'I don't know' type of response should have a score of 0.
+
+IMPORTANT:
+- Output MUST be valid JSON.
+- Do NOT include comments (like // or #) in the JSON output.
+- Ensure all keys and string values are enclosed in double quotes.
+
+The response should be JSON formatted as follows:
+{
+  "points": [
+    {"description": "Description of point 1", "score": score_value},
+    {"description": "Description of point 2", "score": score_value}
+  ]
+}
+"""
+
+MAP_USER_PROMPT = """
+---Data tables---
+{context_data}
+
+---Question---
+{query}
+"""
+
+REDUCE_SYSTEM_PROMPT = """
+---Role---
+You are a helpful assistant responding to questions about a dataset by synthesizing perspectives from multiple analysts.
+
+---Goal---
+Generate a response of the target length and format that responds to the user's question, summarizing all the reports from multiple analysts who focused on different parts of the dataset.
+
+Note that the analysts' reports provided below are ranked in the **descending order of importance**.
+
+If you don't know the answer or if the provided reports do not contain sufficient information to provide an answer, just say so. Do not make anything up.
+
+The final response should remove all irrelevant information from the analysts' reports and merge the cleaned information into a comprehensive answer that provides explanations of all the key points and implications appropriate for the response length and format.
+
+---Target response length and format---
+{response_type}
+
+---Analyst Reports---
+{report_data}
+"""
+
+NO_DATA_ANSWER = "I am sorry but I am unable to answer this question given the provided data."
@@ -0,0 +1,176 @@
+"""
+A local stand-in for an OpenAI-compatible chat completions endpoint, for benchmarks.
+
+Responses are derived deterministically from the request: extraction prompts get the
+capitalized names found in the chunk as entities (chained into relationships), community
+report, map and reduce prompts get well-formed JSON or text of the expected shape.
+Latency (mean, jitter and a slow tail), error rate (429/500) and the random seed are configurable.
+
+    python -m benchmarks.mock_llm_server --port 8765 --latency 0.2 --jitter 0.05 --error-rate 0.02
+    LLM_BASE_URL=http://127.0.0.1:8765/v1 LLM_API_KEY=mock LLM_MODEL=mock ...
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+NAME = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)?\b")
+CHUNK = re.compile(r'<chunk id="(\d+)">\n(.*?)\n</chunk>', re.DOTALL)
+
+
+def extract(text: str, max_entities: int = 16) -> dict:
+    names = list(dict.fromkeys(m.group(0) for m in NAME.finditer(text) if " " in m.group(0)))[:max_entities]
+    entities = [{"name": name, "type": "PERSON", "description": f"{name} is mentioned in the text."} for name in names]
+    relationships = [
+        {"source": a, "target": b, "relationship_type": "MEETS", "description": f"{a} meets {b}.",
+         "strength": 1 + int(hashlib.md5(f"{a}|{b}".encode()).hexdigest(), 16) % 10}
+        for a, b in zip(names, names[1:])
+    ]
+    return {"entities": entities, "relationships": relationships}
+
+
+def completion_content(system: str, user: str) -> str:
+    """
+    The response text for a request, chosen by the kind of prompt.
+    """
+    if '<chunk id="' in user:
+        return json.dumps({"chunks": [{"chunk_id": int(cid), **extract(text)} for cid, text in CHUNK.findall(user)]})
+    if '"entities"' in system:
+        return json.dumps(extract(user))
+    if '"findings"' in system:
+        names = [m.group(0) for m in NAME.finditer(user)][:3]
+        return json.dumps({
+            "title": " and ".join(names) or "Community",
+            "summary": f"A community around {', '.join(names)}.",
+            "rating": 5.0,
+            "rating_explanation": "Synthetic.",
+            "findings": [{"summary": name, "explanation": f"{name} is central."} for name in names],
+        })
+    if '"points"' in system:
+        score = int(hashlib.md5(user.encode()).hexdigest(), 16) % 101
+        return json.dumps({"points": [{"description": "A synthetic key point. " * 5, "score": score}]})
+    return "A synthetic answer. " * 20
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+               chunk_chars: int = 64, slow_rate: float = 0.0, slow_factor: float = 10.0) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+    app.state.stats = stats
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            delay = max(0.0, rng.gauss(latency, jitter)) if jitter else latency
+            # A fraction of requests is much slower: the long tail hedging is meant to cut
+            if rng.random() < slow_rate:
+                delay *= slow_factor
+            await asyncio.sleep(delay)
+            if rng.random() < error_rate:
+                stats["errors"] += 1
+                status = rng.choice([429, 500])
+                return JSONResponse({"error": {"message": "mock failure", "code": status}}, status_code=status,
+                                    headers={"retry-after": "0"} if status == 429 else None)
+        finally:
+            stats["in_flight"] -= 1
+
+        content = completion_content(system, user)
+        model = body.get("model") or "mock"
+        prompt_tokens = (len(system) + len(user)) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                 "total_tokens": prompt_tokens + len(content) // 4}
+        created = int(time.time())
+
+        if not body.get("stream"):
+            return {
+                "id": "mock", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            }
+
+        async def events():
+            for i in range(0, len(content), chunk_chars):
+                delta = {"content": content[i:i + chunk_chars]}
+                yield "data: " + json.dumps({"id": "mock", "object": "chat.completion.chunk", "created": created,
+                                             "model": model, "choices": [{"index": 0, "delta": delta,
+                                                                          "finish_reason": None}]}) + "\n\n"
+            yield "data: " + json.dumps({"id": "mock", "object": "chat.completion.chunk", "created": created,
+                                         "model": model, "choices": [{"index": 0, "delta": {},
+                                                                      "finish_reason": "stop"}]}) + "\n\n"
+            # Like OpenAI, usage is only reported on a stream when the client asks for it
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield "data: " + json.dumps({"id": "mock", "object": "chat.completion.chunk", "created": created,
+                                             "model": model, "choices": [], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class MockServer:
+    """
+    Runs the mock server in a background thread (for in-process benchmarks and tests).
+    """
+    def __init__(self, port: int = 8765, **options):
+        self.app = create_app(**options)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.config.port}/v1"
+
+    @property
+    def stats(self) -> dict:
+        return self.app.state.stats
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency standard deviation (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests slowed down")
+    parser.add_argument("--slow-factor", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    app = create_app(args.latency, args.jitter, args.error_rate, args.seed,
+                     slow_rate=args.slow_rate, slow_factor=args.slow_factor)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
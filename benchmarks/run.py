@@ -0,0 +1,316 @@
+"""
+Offline benchmark suite. Nothing here talks to a real provider: extraction runs against
+the local mock server and all inputs come from benchmarks.synthetic.
+
+    python -m benchmarks.run --scale 10
+    python -m benchmarks.run --scale 100 --only graph leiden subgraph --compare benchmarks/results/abc1234.json
+
+Results are written to benchmarks/results/<commit>.json (plus a timestamped history line in
+benchmarks/results/history.jsonl), so regressions show up when comparing commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from benchmarks import synthetic
+from benchmarks.mock_llm_server import MockServer
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BENCHMARKS = ["chunking", "extraction", "graph", "leiden", "subgraph", "layout"]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_memory(function, *args, **kwargs) -> float:
+    """
+    Peak Python heap allocated while running `function`, in MB.
+    """
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 2),
+        "p95_us": round(samples[int(len(samples) * 0.95)] * 1e6, 2),
+        "max_us": round(samples[-1] * 1e6, 2),
+    }
+
+
+def commit_id() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=ROOT) != 0
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# --- Benchmarks ---
+
+def bench_chunking(workdir: str, scale: float) -> dict:
+    from core.text_utils import stream_chunks
+    path = synthetic.write_corpus(os.path.join(workdir, "corpus"), scale)[0]
+    size_mb = os.path.getsize(path) / 2 ** 20
+    chunks, seconds = timed(lambda: list(stream_chunks(path, 1200, 100)))
+    tokens = sum(chunk.token_count for chunk in chunks)
+    return {
+        "size_mb": round(size_mb, 2),
+        "chunks": len(chunks),
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(size_mb / seconds, 2),
+        "tokens_per_s": round(tokens / seconds),
+    }
+
+
+def bench_extraction(workdir: str, concurrency: list, latency: float, error_rate: float, port: int,
+                     slow_rate: float = 0.0) -> dict:
+    from core.extractor import EntityExtractor
+    from core.llm import Endpoint, LLMClient
+    from core.scheduler import ExtractionScheduler
+
+    # A fixed-size corpus: extraction throughput is bounded by latency x concurrency, not size
+    corpus = os.path.join(workdir, "extraction_corpus")
+    synthetic.write_corpus(corpus, 2, documents=4)
+    options = dict(latency=latency, jitter=latency / 4, error_rate=error_rate, slow_rate=slow_rate)
+
+    def run(llm, limit, servers):
+        requests_before = sum(server.stats["requests"] for server in servers)
+        for server in servers:
+            server.stats["max_in_flight"] = 0
+        # Every request has to reach the mock server
+        llm.cache = None
+        extractor = EntityExtractor(llm, scheduler=ExtractionScheduler(max_in_flight=limit, base_delay=0.01))
+        chunks, seconds = timed(lambda: asyncio.run(extractor.process_chunks(corpus, "\"entities\"", workers=2)))
+        return {
+            "chunks": len(chunks),
+            "failed": sum(1 for c in chunks if c["status"] != "success"),
+            "seconds": round(seconds, 3),
+            "chunks_per_s": round(len(chunks) / seconds, 2),
+            "requests": sum(server.stats["requests"] for server in servers) - requests_before,
+            "server_max_in_flight": sum(server.stats["max_in_flight"] for server in servers),
+        }
+
+    results = {}
+    with MockServer(port=port, **options) as first, MockServer(port=port + 1, seed=1, **options) as second:
+        os.environ.update(LLM_MODEL="mock")
+        for limit in concurrency:
+            single = LLMClient(endpoints=[Endpoint(first.base_url, "mock")])
+            results[f"concurrency_{limit}"] = run(single, limit, [first])
+        # Two endpoints, least-loaded routing, with and without hedging
+        for hedge in (False, True):
+            pool = LLMClient(endpoints=[Endpoint(first.base_url, "mock", name="a"),
+                                        Endpoint(second.base_url, "mock", name="b")], hedge=hedge)
+            pool.hedge_min_delay = latency
+            results[f"pool_{'hedged' if hedge else 'routed'}_{concurrency[-1]}"] = run(pool, concurrency[-1], [first, second])
+    return results
+
+
+def bench_graph(workdir: str, scale: float) -> dict:
+    from core.graph import build_graph, clean_json
+    from core.shards import write_jsonl
+    path = synthetic.write_extraction(os.path.join(workdir, "extraction.json"), scale)
+    _, clean_seconds = timed(clean_json, path)
+    graph, build_seconds = timed(build_graph, path)
+
+    # The same results as JSONL: read shard by shard, in one process and in a pool
+    jsonl = os.path.join(workdir, "extraction.jsonl")
+    with open(path, "r", encoding="utf-8") as f:
+        write_jsonl(jsonl, json.load(f))
+    workers = max(2, os.cpu_count() or 1)
+    _, jsonl_seconds = timed(build_graph, jsonl)
+    _, parallel_seconds = timed(build_graph, jsonl, workers=workers)
+    return {
+        "input_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+        "vertices": graph.vcount(),
+        "edges": graph.ecount(),
+        # Typed relationships behind the edges (one simple weighted edge per entity pair)
+        "relationships": int(graph['relationships'].offsets[-1]),
+        "clean_json_s": round(clean_seconds, 3),
+        "build_graph_s": round(build_seconds, 3),
+        "build_graph_jsonl_s": round(jsonl_seconds, 3),
+        f"build_graph_jsonl_{workers}_workers_s": round(parallel_seconds, 3),
+        "clean_json_peak_mb": round(peak_memory(clean_json, path), 1),
+        "build_graph_peak_mb": round(peak_memory(build_graph, path), 1),
+        "build_graph_jsonl_peak_mb": round(peak_memory(build_graph, jsonl), 1),
+    }
+
+
+def load_graph(workdir: str, scale: float):
+    from core.graph import build_graph
+    path = os.path.join(workdir, "extraction.json")
+    if not os.path.exists(path):
+        synthetic.write_extraction(path, scale)
+    return build_graph(path)
+
+
+def bench_leiden(workdir: str, scale: float, seeds: int = 4, max_cluster_size: int = 10) -> dict:
+    from core.graph import find_communities
+    graph = load_graph(workdir, scale)
+    workers = os.cpu_count()
+
+    def counts(communities):
+        levels = {}
+        for memberships in communities.values():
+            for level, cid in memberships.items():
+                levels.setdefault(level, set()).add(cid)
+        return {level: len(ids) for level, ids in sorted(levels.items())}
+
+    def modularity(communities):
+        membership = [communities[name]["level_1"] for name in graph.vs["name"]]
+        return round(graph.modularity(membership, weights=graph.es["weight"]), 4)
+
+    communities, seconds = timed(find_communities, graph)
+    _, warm_seconds = timed(find_communities, graph, previous=communities, changed=set())
+    best, best_seconds = timed(find_communities, graph, seeds=seeds, workers=workers)
+    hierarchy, hierarchy_seconds = timed(find_communities, graph, max_cluster_size=max_cluster_size,
+                                         seeds=seeds, workers=workers)
+    return {
+        "vertices": graph.vcount(),
+        "seconds": round(seconds, 3),
+        "incremental_no_change_s": round(warm_seconds, 3),
+        "communities": counts(communities),
+        "modularity": modularity(communities),
+        f"seeds_{seeds}": {"seconds": round(best_seconds, 3), "modularity": modularity(best)},
+        f"hierarchical_{max_cluster_size}": {"seconds": round(hierarchy_seconds, 3),
+                                             "communities": counts(hierarchy)},
+    }
+
+
+def bench_subgraph(workdir: str, scale: float, lookups: int = 2000) -> dict:
+    from core.graph import CommunityIndex, find_communities, get_community_subgraph
+    graph = load_graph(workdir, scale)
+    communities = find_communities(graph)
+    rng = random.Random(0)
+    ids = sorted({c["level_1"] for c in communities.values()})
+    queries = [rng.choice(ids) for _ in range(lookups)]
+
+    index, build_seconds = timed(CommunityIndex, graph, communities)
+    uncached = CommunityIndex(graph, communities, cache_size=0)
+    cold = [timed(uncached.subgraph, "level_1", cid)[1] for cid in queries]
+    warm = [timed(index.subgraph, "level_1", cid)[1] for cid in queries]
+    # The pre-index path: a full scan of the membership dict per lookup
+    plain = dict(communities)
+    scan = [timed(get_community_subgraph, graph, plain, cid, "level_1")[1] for cid in queries[:200]]
+    return {
+        "communities": len(ids),
+        "index_build_s": round(build_seconds, 4),
+        "uncached": percentiles(cold),
+        "cached": percentiles(warm),
+        "full_scan": percentiles(scan),
+    }
+
+
+def bench_layout(workdir: str, scale: float) -> dict:
+    from core.graph import compute_layout, export_graph, find_communities, visualize_graph
+    graph = load_graph(workdir, scale)
+    communities = find_communities(graph)
+    layout, seconds = timed(compute_layout, graph, communities)
+    graph['layout'] = layout
+    _, render_seconds = timed(visualize_graph, graph, communities, os.path.join(workdir, "graph.png"), aggregate=True)
+    _, export_seconds = timed(export_graph, graph, communities, os.path.join(workdir, "graph.gexf"))
+    return {
+        "vertices": graph.vcount(),
+        "layout_s": round(seconds, 3),
+        "render_aggregated_s": round(render_seconds, 3),
+        "export_gexf_s": round(export_seconds, 3),
+    }
+
+
+# --- Results ---
+
+def save(results: dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    with open(os.path.join(RESULTS_DIR, "history.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(results) + "\n")
+    return path
+
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = flatten(baseline["results"])
+    after = flatten(current["results"])
+    print(f"\nCompared with {baseline['commit']} (scale {baseline['scale']}):")
+    for name in sorted(after):
+        if name in before and before[name]:
+            change = (after[name] - before[name]) / before[name] * 100
+            print(f"  {name:55s} {before[name]:>12g} -> {after[name]:>12g}  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--scale", type=float, default=10, help="input size relative to the Sherlock book")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--latency", type=float, default=0.05, help="mock LLM mean latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="fraction of mock LLM requests 10x slower")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--compare", help="a previous results file to compare with")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    results = {
+        "commit": commit_id(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "scale": args.scale,
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in BENCHMARKS:
+            if name not in args.only:
+                continue
+            print(f"Running {name}...")
+            if name == "extraction":
+                result = bench_extraction(workdir, args.concurrency, args.latency, args.error_rate, args.port,
+                                          args.slow_rate)
+            else:
+                result = globals()[f"bench_{name}"](workdir, args.scale)
+            results["results"][name] = result
+            print(json.dumps(result, indent=2))
+
+    if not args.no_save:
+        print(f"Saved {save(results)}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Synthetic inputs for the benchmarks, sized relative to the Sherlock Holmes book
+(scale 1 = one book). Everything is generated from a seed, so runs are comparable.
+
+    python -m benchmarks.synthetic --scale 10 --out benchmarks/data
+"""
+import argparse
+import json
+import os
+import random
+
+# Reference sizes measured on output/extracted_entities_whole_book.json and the source text
+BOOK_CHARS = 250_000
+BOOK_CHUNKS = 53
+BOOK_UNIQUE_ENTITIES = 505
+ENTITIES_PER_CHUNK = 16
+RELATIONSHIPS_PER_CHUNK = 19
+
+TYPES = ["PERSON", "LOCATION", "ORGANIZATION", "EVIDENCE", "CRIME", "TIME"]
+RELATIONSHIP_TYPES = ["KNOWS", "VISITED", "FOUND_AT", "INVESTIGATES", "LIVES_WITH", "VICTIM_OF", "OWNS", "MEETS"]
+SYLLABLES = ["ar", "bel", "cor", "dan", "el", "fen", "gar", "hol", "is", "jor", "kel", "lan",
+             "mor", "nor", "or", "pel", "quin", "ros", "sten", "tor", "ul", "vin", "wat", "yor"]
+FILLER = ("the a of and to in that was he it with as his on at by had which but from this be not "
+          "there one were all said upon we they so my no could been an or would who up into her "
+          "more very then time little man out over any only about some can what know").split()
+
+
+def entity_names(count: int, rng: random.Random) -> list:
+    """
+    `count` distinct two-word capitalized names.
+    """
+    names = set()
+    while len(names) < count:
+        first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        names.add(f"{first} {last}")
+    return sorted(names)
+
+
+def zipf_picker(names: list, rng: random.Random, exponent: float = 1.1):
+    """
+    Picks names with a Zipf-like skew: a few main characters, a long tail of minor ones.
+    """
+    weights = [1 / (rank + 1) ** exponent for rank in range(len(names))]
+    order = list(names)
+    rng.shuffle(order)
+    return lambda k: rng.choices(order, weights=weights, k=k)
+
+
+def generate_extraction(scale: float, seed: int = 0) -> list:
+    """
+    Extraction results in the extractor's output format, `scale` books' worth of chunks.
+    """
+    rng = random.Random(seed)
+    names = entity_names(max(10, int(BOOK_UNIQUE_ENTITIES * scale)), rng)
+    types = {name: rng.choice(TYPES) for name in names}
+    pick = zipf_picker(names, rng)
+
+    chunks = []
+    for chunk_id in range(max(1, int(BOOK_CHUNKS * scale))):
+        present = list(dict.fromkeys(pick(ENTITIES_PER_CHUNK)))
+        entities = [{"name": name, "type": types[name], "description": f"{name} appears in chunk {chunk_id}."}
+                    for name in present]
+        relationships = []
+        for _ in range(RELATIONSHIPS_PER_CHUNK if len(present) > 1 else 0):
+            source, target = rng.sample(present, 2)
+            relationships.append({
+                "source": source,
+                "target": target,
+                "relationship_type": rng.choice(RELATIONSHIP_TYPES),
+                "description": f"{source} and {target} meet in chunk {chunk_id}.",
+                "strength": rng.randint(1, 10),
+            })
+        chunks.append({"chunk_id": chunk_id, "status": "success",
+                       "data": {"entities": entities, "relationships": relationships}})
+    return chunks
+
+
+def generate_corpus(scale: float, seed: int = 0, documents: int = 1):
+    """
+    Yields (doc_id, text) for `scale` books' worth of prose-like text split into `documents` files.
+    Entity names are woven into the filler so mock extraction finds a realistic graph.
+    """
+    rng = random.Random(seed)
+    names = entity_names(max(10, int(BOOK_UNIQUE_ENTITIES * scale)), rng)
+    pick = zipf_picker(names, rng)
+    per_document = int(BOOK_CHARS * scale / documents)
+
+    for doc in range(documents):
+        parts = []
+        size = 0
+        while size < per_document:
+            words = rng.choices(FILLER, k=rng.randint(8, 20))
+            for name in pick(rng.randint(1, 2)):
+                words.insert(rng.randrange(len(words) + 1), name)
+            sentence = " ".join(words)
+            sentence = sentence[0].upper() + sentence[1:] + "."
+            if rng.random() < 0.1:
+                sentence += "\n\n"
+            parts.append(sentence)
+            size += len(sentence) + 1
+        yield f"doc_{doc:04d}.txt", " ".join(parts)
+
+
+def write_corpus(directory: str, scale: float, seed: int = 0, documents: int = 1) -> list:
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for doc_id, text in generate_corpus(scale, seed, documents):
+        path = os.path.join(directory, doc_id)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def write_extraction(path: str, scale: float, seed: int = 0) -> str:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(generate_extraction(scale, seed), f)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark inputs")
+    parser.add_argument("--scale", type=float, default=10, help="size relative to the Sherlock book")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "data"))
+    parser.add_argument("--documents", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = write_corpus(os.path.join(args.out, f"corpus_x{args.scale:g}"), args.scale, args.seed, args.documents)
+    extraction = write_extraction(os.path.join(args.out, f"extraction_x{args.scale:g}.json"), args.scale, args.seed)
+    print(f"Wrote {len(corpus)} documents and {extraction}")
+
+
+if __name__ == "__main__":
+    main()
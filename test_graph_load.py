@@ -4,8 +4,9 @@ import json
 
 # Add the current directory to sys.path to allow importing from app
 sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), 'app'))
 
-from app.core.graph import build_graph, find_communities, visualize_graph
+from app.core.graph import build_graph, find_communities, get_layout, visualize_graph, export_graph
 import igraph as ig
 
 def test_load():
@@ -43,11 +44,18 @@ def test_load():
             
         print("\nGenerating visualizations...")
         
+        # Computed once and cached on the graph; both levels below reuse it
+        get_layout(graph, communities)
+        
         visualize_graph(graph, communities, "graph_visualization_L1.png", level='level_1')
         print("Saved graph_visualization_L1.png")
         
         visualize_graph(graph, communities, "graph_visualization_L0.png", level='level_0')
         print("Saved graph_visualization_L0.png")
+        
+        visualize_graph(graph, communities, "output/graph_communities_L1.png", level='level_1', aggregate=True)
+        export_graph(graph, communities, "output/graph.gexf")
+        print("Saved output/graph_communities_L1.png and output/graph.gexf")
             
     except Exception as e:
         print(f"Error testing graph: {e}")
@@ -1,4 +1,10 @@
+import sys
+import os
 import igraph as ig
+
+# app/ must be importable as the root of the `core` package used inside app.core
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
 from app.core.graph import get_community_subgraph
 
 def test_subgraph():
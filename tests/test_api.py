@@ -0,0 +1,151 @@
+import sys
+import os
+import json
+import time
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.main import create_app
+from app.config import Settings
+from app.core.service import GraphRAGService
+from app.core.llm import LLMClient
+
+PEOPLE = ["SHERLOCK HOLMES", "JOHN WATSON", "LESTRADE", "GREGSON", "ENOCH DREBBER", "JEFFERSON HOPE"]
+
+class FakeLLMClient(LLMClient):
+    """
+    Answers extraction, community report, map and reduce prompts without a provider.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        self.calls += 1
+        system_message = system_message or ""
+        if '"entities"' in system_message:
+            entities = [{"name": name, "type": "PERSON", "description": f"{name.title()} appears in the story."}
+                        for name in PEOPLE]
+            relationships = [{"source": a, "target": b, "relationship_type": "KNOWS", "description": f"{a} knows {b}.", "strength": 5}
+                             for a, b in zip(PEOPLE, PEOPLE[1:])]
+            return json.dumps({"entities": entities, "relationships": relationships})
+        if '"findings"' in system_message:
+            return json.dumps({"title": "Scotland Yard", "summary": "Detectives at work.", "rating": 5,
+                               "rating_explanation": "", "findings": []})
+        if '"points"' in system_message:
+            return json.dumps({"points": [{"description": "Holmes solves the case.", "score": 80}]})
+        return "Holmes solved it."
+
+    async def generate_stream(self, prompt: str, system_message: str = None):
+        answer = await self.generate(prompt, system_message)
+        for i in range(0, len(answer), 4):
+            yield answer[i:i + 4]
+
+class TestAPI(unittest.TestCase):
+    def wait(self, client, job_id):
+        for _ in range(200):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail("job did not finish")
+
+    def test_ingest_build_and_query(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            llm = FakeLLMClient()
+            service = GraphRAGService(Settings(data_dir=tmp, process_workers=1), llm_client=llm)
+            with TestClient(create_app(service)) as client:
+                self.assertEqual(client.post("/query", json={"query": "who?"}).status_code, 409)
+                self.assertEqual(client.post("/ingest", json={}).status_code, 400)
+
+                response = client.post("/ingest", json={"text": "Holmes met Watson. " * 50, "doc_id": "study"})
+                self.assertEqual(response.status_code, 202)
+                job = self.wait(client, response.json()["id"])
+                self.assertEqual(job["status"], "succeeded", job)
+                self.assertEqual(job["result"]["chunks"], 1)
+
+                job = self.wait(client, client.post("/build-index", json={}).json()["id"])
+                self.assertEqual(job["status"], "succeeded", job)
+                self.assertEqual(job["result"]["version"], 1)
+                self.assertEqual(job["result"]["vertices"], len(PEOPLE))
+                self.assertEqual(client.get("/health").json()["index_version"], 1)
+
+                answer = client.post("/query", json={"query": "Who solved it?"}).json()
+                self.assertEqual(answer["answer"], "Holmes solved it.")
+                self.assertEqual(answer["version"], 1)
+                calls = llm.calls
+                repeat = client.post("/query", json={"query": "who solved it"}).json()
+                self.assertTrue(repeat["cached"])
+                self.assertEqual(llm.calls, calls)
+
+                local = client.post("/query", json={"query": "Lestrade", "mode": "local"}).json()
+                self.assertEqual(local["seeds"][0], "LESTRADE")
+
+                self.assertEqual(client.post("/query", json={"query": "x", "level": "level_9"}).status_code, 400)
+                self.assertEqual(client.post("/query", json={"query": "x", "index_id": "../etc"}).status_code, 400)
+                self.assertEqual(client.post("/query", json={"query": "x", "index_id": "acme"}).status_code, 409)
+                indexes = client.get("/indexes").json()
+                self.assertEqual(indexes["indexes"], ["default"])
+                self.assertEqual(indexes["resident"]["default"]["version"], 1)
+
+                with client.stream("POST", "/query", json={"query": "Who found the ring?", "stream": True}) as stream:
+                    self.assertTrue(stream.headers["content-type"].startswith("text/event-stream"))
+                    events = [line[len("event: "):] for line in stream.iter_lines() if line.startswith("event: ")]
+                self.assertEqual(events[0], "map")
+                self.assertEqual(events[-1], "answer")
+                self.assertGreater(events.count("token"), 1)
+
+                with client.stream("POST", "/query", json={"query": "Who is Holmes?", "mode": "local",
+                                                          "stream": True}) as stream:
+                    events = [line[len("event: "):] for line in stream.iter_lines() if line.startswith("event: ")]
+                self.assertEqual(events[0], "context")
+                self.assertGreater(events.count("token"), 1)
+                self.assertEqual(events[-1], "answer")
+
+                metrics = client.get("/metrics")
+                self.assertIn("graphrag_chunks_total{status=\"success\"} ", metrics.text)
+                self.assertIn("graphrag_stage_wall_seconds_total{stage=\"find_communities\"}", metrics.text)
+                self.assertTrue(os.path.exists(os.path.join(tmp, "run_report.json")))
+
+                # Re-ingesting the same corpus reuses journaled chunks
+                calls = llm.calls
+                job = self.wait(client, client.post("/ingest", json={"text": "Gregson arrived. " * 50}).json()["id"])
+                self.assertEqual(job["result"]["documents"], 2)
+                self.assertEqual(llm.calls, calls + 1)
+
+    def test_ingest_paths_stay_inside_the_root(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, "incoming")
+            os.makedirs(os.path.join(root, "cases"))
+            with open(os.path.join(root, "cases", "study.txt"), "w") as f:
+                f.write("Holmes met Watson.")
+            secret = os.path.join(tmp, "secret.txt")
+            with open(secret, "w") as f:
+                f.write("Not for clients.")
+
+            closed = GraphRAGService(Settings(data_dir=os.path.join(tmp, "closed")), llm_client=FakeLLMClient())
+            with self.assertRaises(PermissionError):
+                closed.add_documents(path=os.path.join(root, "cases"))
+
+            service = GraphRAGService(Settings(data_dir=os.path.join(tmp, "data"), ingest_root=root),
+                                      llm_client=FakeLLMClient())
+            self.assertEqual(len(service.add_documents(path="cases")), 1)
+            for path in (secret, "../secret.txt", os.path.join(root, "..", "secret.txt")):
+                with self.assertRaises(PermissionError):
+                    service.add_documents(path=path)
+            os.symlink(secret, os.path.join(root, "cases", "link.txt"))
+            with self.assertRaises(PermissionError):
+                service.add_documents(path="cases")
+
+            with TestClient(create_app(service)) as client:
+                self.assertEqual(client.post("/ingest", json={"path": secret}).status_code, 403)
+                self.assertEqual(client.post("/ingest", json={"path": "missing"}).status_code, 404)
+            self.assertEqual(len(os.listdir(service.settings.documents_dir)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
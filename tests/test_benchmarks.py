@@ -0,0 +1,47 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from benchmarks import synthetic
+from benchmarks.mock_llm_server import completion_content
+from app.core.graph import build_graph
+from prompts.extract_entities import PACKED_CHUNKS_INSTRUCTIONS
+
+class TestSyntheticInputs(unittest.TestCase):
+    def test_extraction_is_deterministic_and_builds(self):
+        self.assertEqual(synthetic.generate_extraction(0.5, seed=3), synthetic.generate_extraction(0.5, seed=3))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = synthetic.write_extraction(os.path.join(tmp, "extraction.json"), 0.5)
+            graph = build_graph(path)
+        self.assertGreater(graph.vcount(), 50)
+        self.assertGreater(graph.ecount(), graph.vcount())
+
+    def test_corpus_scale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = synthetic.write_corpus(tmp, 0.2, documents=2)
+            size = sum(os.path.getsize(p) for p in paths)
+        self.assertEqual(len(paths), 2)
+        self.assertAlmostEqual(size, 0.2 * synthetic.BOOK_CHARS, delta=0.05 * synthetic.BOOK_CHARS)
+
+class TestMockServer(unittest.TestCase):
+    def test_extraction_response(self):
+        text = "Sherlock Holmes met John Watson near Baker Street."
+        data = json.loads(completion_content('Return "entities" and relationships', text))
+        self.assertEqual([e["name"] for e in data["entities"]], ["Sherlock Holmes", "John Watson", "Baker Street"])
+        self.assertEqual(len(data["relationships"]), 2)
+        self.assertEqual(completion_content('"entities"', text), completion_content('"entities"', text))
+
+    def test_packed_response(self):
+        user = '<chunk id="3">\nIrene Adler\n</chunk>\n\n<chunk id="4">\nMary Morstan\n</chunk>'
+        data = json.loads(completion_content('"entities"' + PACKED_CHUNKS_INSTRUCTIONS, user))
+        self.assertEqual([c["chunk_id"] for c in data["chunks"]], [3, 4])
+        self.assertEqual(data["chunks"][1]["entities"][0]["name"], "Mary Morstan")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.cache import ResponseCache
+from app.core.llm import LLMClient
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, messages, model):
+        self.calls += 1
+        message = SimpleNamespace(content=f"answer to {messages[-1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_depends_on_model_system_and_prompt(self):
+        key = ResponseCache.make_key("m", "sys", "user")
+        self.assertEqual(key, ResponseCache.make_key("m", "sys", "user"))
+        self.assertNotEqual(key, ResponseCache.make_key("m2", "sys", "user"))
+        self.assertNotEqual(key, ResponseCache.make_key("m", "sys2", "user"))
+        self.assertNotEqual(key, ResponseCache.make_key("m", "sys", "user2"))
+
+    def test_size_based_eviction_drops_least_recently_used(self):
+        cache = ResponseCache(self.path, max_bytes=250)
+        for i in range(5):
+            cache.put(f"k{i}", "x" * 100)
+            cache.get("k0")  # keep k0 hot
+        self.assertLessEqual(cache.size_bytes(), 250)
+        self.assertIsNotNone(cache.get("k0"))
+        self.assertIsNone(cache.get("k1"))
+
+    def test_read_only_never_writes(self):
+        ResponseCache(self.path).put("k", "v")
+        cache = ResponseCache(self.path, read_only=True)
+        cache.put("other", "v")
+        self.assertEqual(cache.get("k"), "v")
+        self.assertIsNone(cache.get("other"))
+
+    def test_generate_is_served_from_cache(self):
+        llm = LLMClient.__new__(LLMClient)
+        completions = FakeCompletions()
+        llm.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        llm.cache = ResponseCache(self.path)
+
+        first = asyncio.run(llm.generate("chunk", system_message="prompt"))
+        second = asyncio.run(llm.generate("chunk", system_message="prompt"))
+        self.assertEqual(first, second)
+        self.assertEqual(completions.calls, 1)
+        self.assertEqual(llm.cache.stats()["hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.text_utils import chunk_text, stream_chunks, astream_chunks, get_encoder
+
+SAMPLE = "It was a dark night.\n\nHolmes said: 'Elementary!'  Watson   nodded.\n" * 400
+
+class TestStreamingChunker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_stream_matches_whole_text_chunking(self):
+        path = self.write("book.txt", SAMPLE)
+        expected = list(chunk_text(SAMPLE, chunk_size=300, overlap=50))
+        for block_chars in (64, 1000, 1 << 20):
+            chunks = list(stream_chunks(path, 300, 50, block_chars=block_chars))
+            self.assertEqual([c.text for c in chunks], expected)
+
+    def test_chunks_carry_offsets_and_token_counts(self):
+        path = self.write("book.txt", SAMPLE)
+        chunks = list(stream_chunks(path, 300, 50, block_chars=128))
+        tokens = get_encoder().encode(SAMPLE)
+        for i, chunk in enumerate(chunks):
+            self.assertEqual(chunk.doc_id, "book.txt")
+            self.assertEqual(chunk.index, i)
+            self.assertEqual(chunk.start_token, i * 250)
+            self.assertEqual(chunk.token_count, len(tokens[chunk.start_token:chunk.start_token + 300]))
+
+    def test_directory_is_chunked_in_document_order(self):
+        self.write("b.txt", SAMPLE)
+        self.write("a.txt", "Short document about Lestrade.")
+        self.write("ignored.bin", "not a document")
+
+        async def collect():
+            return [c async for c in astream_chunks(self.tmp.name, 300, 50, workers=2)]
+
+        chunks = asyncio.run(collect())
+        self.assertEqual(chunks[0].doc_id, "a.txt")
+        self.assertEqual({c.doc_id for c in chunks}, {"a.txt", "b.txt"})
+        self.assertEqual([c.text for c in chunks if c.doc_id == "b.txt"], list(chunk_text(SAMPLE, 300, 50)))
+
+if __name__ == '__main__':
+    unittest.main()
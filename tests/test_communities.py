@@ -0,0 +1,157 @@
+import sys
+import os
+import random
+import unittest
+from unittest import mock
+import igraph as ig
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import app.core.graph as graph_module
+from app.core.graph import find_communities, get_community_subgraph, CommunityIndex
+
+def cliques(count, size, extra=()):
+    """
+    `count` cliques of `size` vertices joined in a ring by single weak edges.
+    """
+    g = ig.Graph()
+    g.add_vertices(count * size)
+    g.vs['name'] = [f"n{i}" for i in range(count * size)]
+    edges = []
+    for c in range(count):
+        members = range(c * size, (c + 1) * size)
+        edges += [(a, b) for a in members for b in members if a < b]
+        edges.append((c * size, ((c + 1) % count) * size + 1))
+    g.add_edges(edges)
+    g.es['weight'] = [5.0] * len(edges)
+    for name, neighbours in extra:
+        g.add_vertex(name)
+        v = g.vcount() - 1
+        g.add_edges([(v, n) for n in neighbours])
+        g.es[-len(neighbours):]['weight'] = [5.0] * len(neighbours)
+    return g
+
+class TestIncrementalCommunities(unittest.TestCase):
+    def test_full_run_reports_every_community(self):
+        communities = find_communities(cliques(6, 5))
+        self.assertEqual(len(communities.changed['level_1']), len({c['level_1'] for c in communities.values()}))
+
+    def test_incremental_run_keeps_ids_and_reports_changes(self):
+        before = find_communities(cliques(6, 5))
+        # Shuffle the previous ids so stability cannot come from Leiden's own numbering
+        renamed = {name: {'level_1': c['level_1'] + 100, 'level_0': c['level_0'] + 50} for name, c in before.items()}
+
+        graph = cliques(6, 5, extra=[("newcomer", [0, 1, 2])])
+        after = find_communities(graph, previous=renamed, changed={"newcomer"})
+
+        for name, comms in renamed.items():
+            self.assertEqual(after[name]['level_1'], comms['level_1'])
+        self.assertEqual(after["newcomer"]['level_1'], renamed["n0"]['level_1'])
+        self.assertEqual(after.changed['level_1'], {renamed["n0"]['level_1']})
+
+    def test_unchanged_graph_reports_no_changes(self):
+        graph = cliques(4, 4)
+        before = find_communities(graph)
+        after = find_communities(graph, previous=before, changed=set())
+        self.assertEqual(dict(after), dict(before))
+        self.assertEqual(after.changed, {'level_1': set(), 'level_0': set()})
+
+def random_graph(vertices, edges, seed=1):
+    random.seed(seed)
+    g = ig.Graph.Erdos_Renyi(n=vertices, m=edges)
+    g.vs['name'] = [f"n{i}" for i in range(vertices)]
+    g.es['weight'] = [1.0 + random.random() for _ in range(edges)]
+    return g
+
+class TestHierarchicalCommunities(unittest.TestCase):
+    def levels(self, communities):
+        return sorted({level for c in communities.values() for level in c}, key=lambda l: int(l.split('_')[1]))
+
+    def test_splits_until_under_the_cap_and_levels_nest(self):
+        graph = random_graph(300, 900)
+        communities = find_communities(graph, max_cluster_size=5)
+        levels = self.levels(communities)
+        self.assertGreater(len(levels), 2)
+        for coarse, fine in zip(levels, levels[1:]):
+            parents = {}
+            for c in communities.values():
+                self.assertEqual(parents.setdefault(c[fine], c[coarse]), c[coarse])
+        # Whatever is still over the cap could not be split any further
+        deepest = levels[-1]
+        for cid, size in communities.index.sizes[deepest].items():
+            if size > 5:
+                members = communities.index.vertices(deepest, cid).tolist()
+                self.assertEqual(len(set(find_communities(graph.subgraph(members), max_cluster_size=5)
+                                         .index.community_ids('level_0'))), 1)
+
+    def test_max_levels(self):
+        communities = find_communities(random_graph(300, 900), max_cluster_size=10, max_levels=2)
+        self.assertEqual(self.levels(communities), ['level_0', 'level_1'])
+
+    def test_reproducible_and_independent_of_workers(self):
+        graph = random_graph(200, 600)
+        options = dict(max_cluster_size=15, seeds=3, resolutions=[1.0, 1.5])
+        sequential = find_communities(graph, **options)
+        self.assertEqual(dict(find_communities(graph, **options)), dict(sequential))
+        with mock.patch.object(graph_module, '_PARALLEL_MIN_EDGES', 0):
+            parallel = find_communities(graph, workers=2, **options)
+        self.assertEqual(dict(parallel), dict(sequential))
+
+    def test_more_seeds_never_lower_modularity(self):
+        graph = random_graph(200, 600)
+        def modularity(communities):
+            return graph.modularity([communities[name]['level_1'] for name in graph.vs['name']],
+                                    weights=graph.es['weight'])
+        self.assertGreaterEqual(modularity(find_communities(graph, seeds=4)), modularity(find_communities(graph)))
+
+    def test_rerun_keeps_ids(self):
+        graph = random_graph(200, 600)
+        before = find_communities(graph, max_cluster_size=15)
+        renamed = {name: {level: cid + 100 for level, cid in c.items()} for name, c in before.items()}
+        after = find_communities(graph, previous=renamed, max_cluster_size=15)
+        self.assertEqual(dict(after), renamed)
+        self.assertTrue(all(not ids for ids in after.changed.values()))
+
+class TestCommunityIndex(unittest.TestCase):
+    def setUp(self):
+        # 0-1-2 (Comm 0), 3-4 (Comm 1), one edge between the communities
+        self.graph = ig.Graph()
+        self.graph.add_vertices(5)
+        self.graph.vs['name'] = ['A', 'B', 'C', 'D', 'E']
+        self.graph.add_edges([(0, 1), (1, 2), (3, 4), (2, 3)])
+        self.communities = {
+            'A': {'level_1': 0, 'level_0': 0},
+            'B': {'level_1': 0, 'level_0': 0},
+            'C': {'level_1': 0, 'level_0': 0},
+            'D': {'level_1': 1, 'level_0': 0},
+            'E': {'level_1': 1, 'level_0': 0},
+        }
+        self.index = CommunityIndex(self.graph, self.communities, cache_size=1)
+
+    def test_members_sizes_and_boundary(self):
+        self.assertEqual(self.index.vertices('level_1', 0).tolist(), [0, 1, 2])
+        self.assertEqual(self.index.sizes['level_1'], {0: 3, 1: 2})
+        self.assertEqual(self.index.sizes['level_0'], {0: 5})
+        self.assertEqual(self.index.boundary['level_1'][0].tolist(), [3])
+        self.assertEqual(self.index.boundary['level_1'][1].tolist(), [3])
+        self.assertEqual(self.index.boundary['level_0'][0].tolist(), [])
+
+    def test_subgraph_cache_is_lru(self):
+        first = self.index.subgraph('level_1', 0)
+        self.assertEqual(sorted(first.vs['name']), ['A', 'B', 'C'])
+        self.assertIs(self.index.subgraph('level_1', 0), first)
+        self.index.subgraph('level_1', 1)
+        self.assertIsNot(self.index.subgraph('level_1', 0), first)
+
+    def test_find_communities_attaches_index(self):
+        graph = cliques(4, 4)
+        communities = find_communities(graph)
+        for cid in communities.index.community_ids('level_1'):
+            expected = sorted(n for n, c in communities.items() if c['level_1'] == cid)
+            subgraph = get_community_subgraph(graph, communities, cid)
+            self.assertEqual(sorted(subgraph.vs['name']), expected)
+
+if __name__ == '__main__':
+    unittest.main()
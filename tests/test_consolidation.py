@@ -0,0 +1,122 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+import igraph as ig
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.consolidation import DescriptionConsolidator, deduplicate
+from app.core.cache import ResponseCache
+from app.core.llm import Endpoint, LLMClient
+
+class FakeLLMClient(LLMClient):
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def generate(self, prompt, system_message=None):
+        self.calls.append(prompt)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return f"Merged ({prompt.count('- ')} descriptions)"
+
+WORDS = ["violin", "chemistry", "tobacco", "boxing", "London", "client", "cab", "poison", "letter", "ring",
+         "garden", "footprint", "telegram", "revolver", "lodging", "inspector", "newspaper", "carriage"]
+# Distinct descriptions of ~12 words each (no near-duplicates among them)
+LONG = [" ".join(WORDS[(i * 7 + j * (i % 5 + 1)) % len(WORDS)] + str(i) for j in range(12)) for i in range(30)]
+
+class TestConsolidation(unittest.TestCase):
+    def test_deduplicate(self):
+        descriptions = ["A consulting detective living at Baker Street in London.",
+                        "a consulting detective living at Baker Street, in London",
+                        "", "Plays the violin."]
+        self.assertEqual(deduplicate(descriptions), [descriptions[0], descriptions[3]])
+
+    def test_merges_only_over_budget(self):
+        llm = FakeLLMClient()
+        consolidator = DescriptionConsolidator(llm, max_tokens=100)
+        short = ["A detective.", "A violinist."]
+        self.assertEqual(asyncio.run(consolidator.consolidate("Holmes", short)), short)
+        self.assertEqual(llm.calls, [])
+
+        merged = asyncio.run(consolidator.consolidate("Holmes", LONG))
+        self.assertEqual(merged, ["Merged (30 descriptions)"])
+        self.assertEqual(len(llm.calls), 1)
+        self.assertIn("Subject: Holmes", llm.calls[0])
+
+    def test_large_inputs_are_merged_in_rounds(self):
+        llm = FakeLLMClient()
+        consolidator = DescriptionConsolidator(llm, max_tokens=100, max_input_tokens=100)
+        merged = asyncio.run(consolidator.consolidate("Holmes", LONG))
+        self.assertEqual(len(merged), 1)
+        self.assertGreater(len(llm.calls), 2)
+        self.assertTrue(all(call.count("- ") <= 8 for call in llm.calls))
+
+    def test_cache_by_input_and_failure_keeps_descriptions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(os.path.join(tmp, "cache.sqlite"))
+            first = FakeLLMClient()
+            asyncio.run(DescriptionConsolidator(first, cache=cache, max_tokens=100).consolidate("Holmes", LONG))
+            second = FakeLLMClient()
+            merged = asyncio.run(DescriptionConsolidator(second, cache=cache, max_tokens=100).consolidate("Holmes", LONG))
+            self.assertEqual(merged, ["Merged (30 descriptions)"])
+            self.assertEqual(second.calls, [])
+            cache.close()
+
+        failing = DescriptionConsolidator(FakeLLMClient(fail=True), max_tokens=100)
+        self.assertEqual(asyncio.run(failing.consolidate("Holmes", LONG)), LONG)
+
+    def test_cached_merges_belong_to_their_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(os.path.join(tmp, "cache.sqlite"))
+            first = FakeLLMClient()
+            first.endpoints = [Endpoint(model="model-a")]
+            asyncio.run(DescriptionConsolidator(first, cache=cache, max_tokens=100).consolidate("Holmes", LONG))
+            second = FakeLLMClient()
+            second.endpoints = [Endpoint(model="model-b")]
+            asyncio.run(DescriptionConsolidator(second, cache=cache, max_tokens=100).consolidate("Holmes", LONG))
+            self.assertEqual(len(second.calls), 1)
+            cache.close()
+
+    def test_consolidate_graph(self):
+        g = ig.Graph()
+        g.add_vertices(3)
+        g.vs['name'] = ['Holmes', 'Watson', 'Lestrade']
+        g.vs['description'] = [list(LONG), ["A doctor.", "A writer."], ["An inspector."]]
+        g.add_edges([(0, 1), (0, 2)])
+        g.es['type'] = ['LIVES_WITH', 'ASSISTS']
+        g.es['description'] = [list(LONG[:20]), ["Helps.", "helps"]]
+        progress = []
+        consolidator = DescriptionConsolidator(FakeLLMClient(), max_tokens=100)
+        stats = asyncio.run(consolidator.consolidate_graph(g, on_progress=lambda done, total: progress.append((done, total))))
+
+        self.assertEqual(g.vs[0]['description'], ["Merged (30 descriptions)"])
+        self.assertEqual(g.vs[1]['description'], ["A doctor.", "A writer."])
+        self.assertEqual(g.es[0]['description'], ["Merged (20 descriptions)"])
+        self.assertEqual(g.es[1]['description'], ["Helps."])
+        self.assertEqual(stats, {"entities": 1, "relationships": 2, "removed": 29 + 19 + 1})
+        self.assertEqual(progress[-1], (4, 4))
+
+    def test_consolidate_relationship_table(self):
+        from app.core.graph import GraphStore, edge_relationships
+        from test_graph_store import chunk
+        store = GraphStore()
+        store.add_chunks([chunk(
+            [("Holmes", "PERSON", "A detective."), ("Watson", "PERSON", "A doctor.")],
+            [("Holmes", "Watson", "LIVES_WITH", d, 8) for d in LONG[:20]] + [("Watson", "Holmes", "ASSISTS", "Helps.", 4)]
+        )])
+        g = store.to_graph(min_component_size=1)
+        llm = FakeLLMClient()
+        stats = asyncio.run(DescriptionConsolidator(llm, max_tokens=100).consolidate_graph(g))
+
+        relationships = edge_relationships(g, g.es[0])
+        self.assertEqual([r['description'] for r in relationships], [["Merged (20 descriptions)"], ["Helps."]])
+        self.assertIn("Holmes -> Watson (LIVES_WITH)", llm.calls[0])
+        self.assertEqual(stats["relationships"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,10 @@ from dotenv import load_dotenv
 
 # Add the project root to the python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
 
 from app.core.llm import LLMClient
+from app.core.cache import ResponseCache
 
 load_dotenv()
 
@@ -15,7 +17,9 @@ from app.prompts.extract_entities import ENTITIES_EXTRACTION_PROMPT_JSON
 async def test_generation():
     os.environ["LLM_MODEL"] = "deepseek-reasoner"
     print(f"LLM_MODEL: {os.getenv('LLM_MODEL')}")
-    llm = LLMClient()
+    # Repeated runs are answered from the on-disk cache instead of the network
+    cache_path = os.path.join(os.path.dirname(__file__), '..', 'output', 'llm_cache.sqlite')
+    llm = LLMClient(cache=ResponseCache.from_env(default_path=cache_path))
     
     prompt = ENTITIES_EXTRACTION_PROMPT_JSON
     
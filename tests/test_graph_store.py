@@ -0,0 +1,120 @@
+import sys
+import os
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.graph import GraphStore, edge_relationships
+
+def chunk(entities, relationships=()):
+    return {
+        "status": "success",
+        "data": {
+            "entities": [{"name": n, "type": t, "description": d} for n, t, d in entities],
+            "relationships": [
+                {"source": s, "target": t, "relationship_type": r, "description": d, "strength": w}
+                for s, t, r, d, w in relationships
+            ]
+        }
+    }
+
+BATCH_1 = [chunk(
+    [("Sherlock Holmes", "PERSON", "A detective."), ("John Watson", "PERSON", "A doctor.")],
+    [("Sherlock Holmes", "John Watson", "LIVES_WITH", "Share rooms.", 8)]
+)]
+BATCH_2 = [chunk(
+    [("Sherlock Holmes", "PERSON", "Plays the violin."), ("Baker Street", "LOCATION", "Their address.")],
+    [("Sherlock Holmes", "John Watson", "LIVES_WITH", "Share rooms.", 9),
+     ("John Watson", "Baker Street", "LIVES_AT", "Watson lives there.", 5)]
+)]
+
+class TestGraphStore(unittest.TestCase):
+    def edges(self, store):
+        g = store.to_graph(min_component_size=1)
+        return sorted((g.vs[r['source']]['name'], g.vs[r['target']]['name'], r['type'], r['strength'])
+                      for e in g.es for r in edge_relationships(g, e))
+
+    def test_incremental_merge_matches_single_batch(self):
+        incremental = GraphStore()
+        incremental.add_chunks(BATCH_1)
+        incremental.add_chunks(BATCH_2)
+
+        whole = GraphStore()
+        whole.add_chunks(BATCH_1 + BATCH_2)
+
+        self.assertEqual(incremental.graph.vcount(), 3)
+        self.assertEqual(self.edges(incremental), self.edges(whole))
+        holmes = incremental.graph.vs.find(name="Sherlock Holmes")
+        self.assertEqual(holmes['description'], ["A detective.", "Plays the violin."])
+        self.assertIn(("Sherlock Holmes", "John Watson", "LIVES_WITH", 9.0), self.edges(incremental))
+
+    def test_reports_changed_vertices(self):
+        store = GraphStore()
+        self.assertEqual(store.add_chunks(BATCH_1), {"Sherlock Holmes", "John Watson"})
+        changed = store.add_chunks([chunk([("Baker Street", "LOCATION", "Their address.")])])
+        self.assertEqual(changed, {"Baker Street"})
+        # Re-adding known facts changes nothing
+        self.assertEqual(store.add_chunks([chunk([("John Watson", "PERSON", "A doctor.")])]), set())
+
+    def test_relationship_waits_for_later_entities(self):
+        store = GraphStore()
+        store.add_chunks([chunk([("Lestrade", "PERSON", "Inspector.")],
+                                [("Lestrade", "Scotland Yard", "WORKS_FOR", "Employer.", 7)])])
+        self.assertEqual(store.graph.ecount(), 0)
+        changed = store.add_chunks([chunk([("Scotland Yard", "ORGANIZATION", "Police.")])])
+        self.assertEqual(store.graph.ecount(), 1)
+        self.assertEqual(changed, {"Lestrade", "Scotland Yard"})
+
+    def test_to_graph_prunes_small_components(self):
+        store = GraphStore()
+        store.add_chunks(BATCH_1 + BATCH_2 + [chunk([("Lone Entity", "PERSON", "Isolated.")])])
+        self.assertEqual(store.to_graph().vcount(), 3)
+        self.assertEqual(store.graph.vcount(), 4)
+
+    def test_one_weighted_edge_per_pair(self):
+        store = GraphStore()
+        store.add_chunks(BATCH_1 + [chunk(
+            [("John Watson", "PERSON", "A doctor.")],
+            [("John Watson", "Sherlock Holmes", "ASSISTS", "Takes notes.", 4),
+             ("Sherlock Holmes", "John Watson", "LIVES_WITH", "Pays the rent.", 6)]
+        )])
+        g = store.graph
+        self.assertEqual(g.ecount(), 1)
+        self.assertFalse(g.has_multiple())
+        self.assertEqual(g.es[0]['weight'], 12.0)  # LIVES_WITH (max 8) + ASSISTS (4)
+        self.assertEqual(self.edges(store), [
+            ("John Watson", "Sherlock Holmes", "ASSISTS", 4.0),
+            ("Sherlock Holmes", "John Watson", "LIVES_WITH", 8.0),
+        ])
+        lives_with = [r for r in edge_relationships(store.to_graph(1), g.es[0]) if r['type'] == "LIVES_WITH"][0]
+        self.assertEqual(lives_with['description'], ["Share rooms.", "Pays the rent."])
+
+    def test_weight_follows_later_batches(self):
+        store = GraphStore()
+        store.add_chunks(BATCH_1)
+        first = store.relationships
+        store.add_chunks([chunk([], [("John Watson", "Sherlock Holmes", "ASSISTS", "Takes notes.", 3)])])
+        self.assertEqual(store.graph.es[0]['weight'], 11.0)
+        self.assertIsNot(store.relationships, first)
+        self.assertEqual(len(store.relationships), 1)
+        self.assertEqual(store.relationships.offsets.tolist(), [0, 2])
+
+    def test_to_graph_compacts_relationships(self):
+        store = GraphStore()
+        store.add_chunks([chunk([("Mycroft", "PERSON", "Brother."), ("Diogenes Club", "ORGANIZATION", "A club.")],
+                                [("Mycroft", "Diogenes Club", "MEMBER_OF", "Founded it.", 5)])]
+                         + BATCH_1 + BATCH_2)
+        g = store.to_graph()
+        self.assertEqual(g.ecount(), 2)
+        self.assertEqual(len(g['relationships']), 2)
+        self.assertEqual(g.es['pair'], [0, 1])
+        self.assertEqual(
+            sorted((g.vs[r['source']]['name'], g.vs[r['target']]['name'], r['type'], r['strength'])
+                   for e in g.es for r in edge_relationships(g, e)),
+            [("John Watson", "Baker Street", "LIVES_AT", 5.0), ("Sherlock Holmes", "John Watson", "LIVES_WITH", 9.0)]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
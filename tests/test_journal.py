@@ -0,0 +1,81 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.extractor import EntityExtractor
+from app.core.journal import ChunkJournal
+from app.core.llm import LLMClient
+
+class CountingLLMClient(LLMClient):
+    def __init__(self, fail_chunks=()):
+        self.calls = 0
+        self.fail_chunks = set(fail_chunks)
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        self.calls += 1
+        chunk_id = int(prompt.split(":", 1)[0].split()[1])
+        if chunk_id in self.fail_chunks:
+            return "not json"
+        return '{"entities": [], "relationships": []}'
+
+class TestChunkJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.text_path = os.path.join(self.tmp.name, "book.txt")
+        with open(self.text_path, "w", encoding="utf-8") as f:
+            f.write("word " * 3000)
+        self.journal_path = os.path.join(self.tmp.name, "journal.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_extraction(self, llm):
+        extractor = EntityExtractor(llm)
+        with ChunkJournal(self.journal_path) as journal:
+            return asyncio.run(extractor.process_chunks(self.text_path, "prompt", journal=journal))
+
+    def test_restart_only_reruns_failed_chunks(self):
+        first = CountingLLMClient(fail_chunks={1})
+        results = self.run_extraction(first)
+        self.assertEqual([r["status"] for r in results], ["success", "error", "success"])
+        self.assertEqual(first.calls, 3)
+
+        second = CountingLLMClient()
+        results = self.run_extraction(second)
+        self.assertEqual(second.calls, 1)
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertNotIn("chunk_hash", results[0])
+
+    def test_torn_last_line_is_ignored(self):
+        journal = ChunkJournal(self.journal_path)
+        with journal:
+            journal.append({"chunk_id": 0, "status": "success", "data": {}})
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"chunk_id": 1, "stat')
+        self.assertEqual(list(journal.completed()), [0])
+
+    def test_append_after_torn_line_survives_reload(self):
+        with ChunkJournal(self.journal_path) as journal:
+            journal.append({"chunk_id": 0, "status": "success", "data": {}})
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"chunk_id": 1, "stat')
+
+        with ChunkJournal(self.journal_path) as journal:
+            journal.append({"chunk_id": 2, "status": "success", "data": {}})
+        self.assertEqual(sorted(ChunkJournal(self.journal_path).completed()), [0, 2])
+
+        # A file that is nothing but a fragment is emptied
+        with open(self.journal_path, "w", encoding="utf-8") as f:
+            f.write('{"chunk_id": 3')
+        with ChunkJournal(self.journal_path, fsync_every=1) as journal:
+            journal.append({"chunk_id": 4, "status": "success", "data": {}})
+        self.assertEqual(list(ChunkJournal(self.journal_path).completed()), [4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.json_stream import JSONStreamParser, parse_json_prefix
+from app.core.extractor import EntityExtractor
+from app.core.cache import ResponseCache
+from app.core.llm import LLMClient
+
+DOCUMENT = {
+    "entities": [
+        {"name": "Sherlock \"the\" Holmes", "type": "PERSON", "description": "A detective {brackets] inside}."},
+        {"name": "Watson", "type": "PERSON", "description": "A doctor."},
+    ],
+    "relationships": [
+        {"source": "Watson", "target": "Sherlock \"the\" Holmes", "relationship_type": "LIVES_WITH",
+         "description": "Shares rooms.", "strength": 8, "extra": {"nested": [1, 2]}},
+    ],
+}
+
+def pieces(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class StreamingLLMClient(LLMClient):
+    def __init__(self, content, fail_after=None):
+        self.content = content
+        self.fail_after = fail_after
+
+    async def generate_stream(self, prompt: str, system_message: str = None):
+        for i, piece in enumerate(pieces(self.content, 5)):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise ConnectionError("stream dropped")
+            yield piece
+
+class TruncatingCompletions:
+    """
+    Chat completions that stop after `limit` characters with finish_reason "length",
+    streamed or not.
+    """
+    def __init__(self, content, limit):
+        self.content = content
+        self.limit = limit
+        self.calls = 0
+
+    async def create(self, messages, model, stream=False, **kwargs):
+        self.calls += 1
+        text = self.content[:self.limit]
+        if not stream:
+            message = SimpleNamespace(content=text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="length")], usage=None)
+
+        async def events():
+            for piece in pieces(text, 5):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)],
+                                      usage=None)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="length")],
+                                  usage=None)
+        return events()
+
+class TestJSONStreamParser(unittest.TestCase):
+    def test_items_emitted_as_they_complete(self):
+        text = "Here you go:\n```json\n" + json.dumps(DOCUMENT, indent=2) + "\n```"
+        parser = JSONStreamParser()
+        events = []
+        first_at = None
+        for position, piece in enumerate(pieces(text, 3)):
+            events.extend(parser.feed(piece))
+            if events and first_at is None:
+                first_at = position * 3
+        # The first entity is available long before the response ends
+        self.assertLess(first_at, len(text) // 2)
+        self.assertEqual(parser.close(), DOCUMENT)
+        self.assertTrue(parser.done)
+        self.assertEqual([key for key, _ in events], ["entities", "entities", "relationships"])
+
+    def test_truncated_response_keeps_valid_prefix(self):
+        text = json.dumps(DOCUMENT)
+        cut = text.index('"relationships"') + 30
+        result = parse_json_prefix(text[:cut])
+        self.assertEqual(result["entities"], DOCUMENT["entities"])
+        self.assertEqual(result["relationships"], [])
+
+    def test_malformed_items_and_preamble(self):
+        result = parse_json_prefix('Thinking {about it}... {"entities": [{"name": "A"}, {"name": tru}, {"name": "B"}], "n": -2.5}')
+        self.assertEqual(result, {"entities": [{"name": "A"}, {"name": "B"}], "n": -2.5})
+        self.assertEqual(parse_json_prefix("no json here"), {})
+
+class TestStreamingExtraction(unittest.TestCase):
+    def test_streaming_chunk_reports_items(self):
+        items = []
+        extractor = EntityExtractor(StreamingLLMClient(json.dumps(DOCUMENT)), stream=True)
+        result = asyncio.run(extractor.process_single_chunk(
+            0, "text", "prompt", on_item=lambda chunk_id, key, item: items.append((chunk_id, key)))
+        )
+        self.assertEqual(result, {"chunk_id": 0, "status": "success", "data": DOCUMENT})
+        self.assertEqual(items, [(0, "entities"), (0, "entities"), (0, "relationships")])
+
+    def test_dropped_stream_keeps_prefix(self):
+        extractor = EntityExtractor(StreamingLLMClient(json.dumps(DOCUMENT), fail_after=json.dumps(DOCUMENT).index('"relationships"') // 5), stream=True)
+        extractor.scheduler.max_retries = 0
+        result = asyncio.run(extractor.process_single_chunk(0, "text", "prompt"))
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(result["truncated"])
+        self.assertEqual(len(result["data"]["entities"]), 2)
+        self.assertIn("stream dropped", result["error"])
+
+        failed = asyncio.run(EntityExtractor(StreamingLLMClient("no json"), stream=True).process_single_chunk(0, "t", "p"))
+        self.assertEqual(failed["status"], "error")
+
+    def test_truncated_responses_are_not_cached(self):
+        text = json.dumps(DOCUMENT)
+        for stream in (True, False):
+            with tempfile.TemporaryDirectory() as tmp:
+                completions = TruncatingCompletions(text, text.index('"relationships"') + 30)
+                llm = LLMClient(cache=ResponseCache(os.path.join(tmp, "cache.sqlite")))
+                llm.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+                extractor = EntityExtractor(llm, stream=stream)
+
+                first = asyncio.run(extractor.process_single_chunk(0, "text", "prompt"))
+                if stream:
+                    self.assertTrue(first["truncated"])
+                # The re-run that retries the chunk reaches the LLM again instead of the cache
+                asyncio.run(extractor.process_single_chunk(0, "text", "prompt"))
+                self.assertEqual(completions.calls, 2)
+                self.assertEqual(llm.cache.stats()["hits"], 0)
+                llm.cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
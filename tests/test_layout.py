@@ -0,0 +1,87 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+import igraph as ig
+import numpy as np
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.graph import CommunityIndex, Communities, compute_layout, get_layout, community_graph, export_graph
+
+def clustered_graph():
+    # Three cliques of 5 (level_1 communities 0..2), the first two in level_0 community 0
+    g = ig.Graph()
+    g.add_vertices(15)
+    g.vs['name'] = [f'E{i}' for i in range(15)]
+    g.vs['type'] = ['PERSON'] * 15
+    edges = [(b + i, b + j) for b in (0, 5, 10) for i in range(5) for j in range(i + 1, 5)]
+    edges += [(4, 5), (9, 10)]
+    g.add_edges(edges)
+    g.es['weight'] = [2.0] * (len(edges) - 2) + [1.0, 3.0]
+    communities = Communities({f'E{i}': {'level_1': i // 5, 'level_0': 0 if i < 10 else 1} for i in range(15)})
+    communities.index = CommunityIndex(g, communities)
+    return g, communities
+
+class TestLayout(unittest.TestCase):
+    def test_layout_is_deterministic_and_cached(self):
+        graph, communities = clustered_graph()
+        layout = compute_layout(graph, communities)
+        self.assertEqual(layout.shape, (15, 2))
+        self.assertTrue(np.allclose(layout, compute_layout(graph, communities)))
+
+        cached = get_layout(graph, communities)
+        self.assertIs(get_layout(graph, communities), cached)
+        self.assertIs(graph['layout'], cached)
+        # A graph without communities still gets a layout
+        self.assertEqual(compute_layout(graph).shape, (15, 2))
+
+    def test_communities_do_not_overlap(self):
+        graph, communities = clustered_graph()
+        layout = compute_layout(graph, communities)
+        centers = [layout[i * 5:(i + 1) * 5].mean(axis=0) for i in range(3)]
+        spread = max(np.abs(layout[i * 5:(i + 1) * 5] - centers[i]).max() for i in range(3))
+        for a in range(3):
+            for b in range(a + 1, 3):
+                self.assertGreater(np.linalg.norm(centers[a] - centers[b]), spread)
+
+    def test_community_graph(self):
+        graph, communities = clustered_graph()
+        aggregated = community_graph(graph, communities, 'level_1')
+        self.assertEqual(aggregated.vs['community'], [0, 1, 2])
+        self.assertEqual(aggregated.vs['size'], [5, 5, 5])
+        weights = {tuple(e.tuple): w for e, w in zip(aggregated.es, aggregated.es['weight'])}
+        self.assertEqual(weights, {(0, 1): 1.0, (1, 2): 3.0})
+
+        coarse = community_graph(graph, communities, 'level_0')
+        self.assertEqual(coarse.vs['size'], [10, 5])
+        self.assertEqual(coarse.es['weight'], [3.0])
+        self.assertEqual(coarse.es['count'], [1])
+
+    def test_export(self):
+        graph, communities = clustered_graph()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.json")
+            export_graph(graph, communities, path)
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.assertEqual(len(data["nodes"]), 15)
+            self.assertEqual(len(data["edges"]), graph.ecount())
+            self.assertEqual(data["nodes"][12]["level_1"], 2)
+
+            path = os.path.join(tmp, "communities.gexf")
+            export_graph(graph, communities, path, level='level_1', aggregate=True)
+            ns = {"g": "http://gexf.net/1.3"}
+            root = ET.parse(path).getroot()
+            self.assertEqual(len(root.findall(".//g:node", ns)), 3)
+            self.assertEqual(len(root.findall(".//g:edge", ns)), 2)
+
+            with self.assertRaises(ValueError):
+                export_graph(graph, communities, os.path.join(tmp, "graph.csv"))
+
+if __name__ == '__main__':
+    unittest.main()
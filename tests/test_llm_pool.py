@@ -0,0 +1,160 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.cache import ResponseCache
+from app.core.llm import Endpoint, LLMClient
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class FakeCompletions:
+    def __init__(self, answer, delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def create(self, messages, model, stream=False):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        message = SimpleNamespace(content=self.answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+def endpoint(name, completions, latency=None, model=None):
+    e = Endpoint(name=name, model=model, client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    for _ in range(20 if latency is not None else 0):
+        e.record_success(latency)
+    return e
+
+class TestEndpointPool(unittest.TestCase):
+    def test_routes_to_least_loaded_healthy_endpoint(self):
+        a = endpoint("a", FakeCompletions("a"), latency=0.1)
+        b = endpoint("b", FakeCompletions("b"), latency=0.1)
+        llm = LLMClient(cache=None, endpoints=[a, b])
+        a.in_flight = 3
+        self.assertIs(llm.pick(), b)
+        # Slower on average but idle beats fast and busy
+        b.latency = 0.3
+        self.assertIs(llm.pick(), b)
+        b.record_failure(HTTPError(429))
+        self.assertFalse(b.healthy)
+        self.assertIs(llm.pick(), a)
+        # A non-retryable error says nothing about the endpoint's health
+        a.record_failure(HTTPError(400))
+        self.assertTrue(a.healthy)
+
+    def test_failed_endpoint_is_taken_out_of_rotation(self):
+        broken = FakeCompletions("a", error=HTTPError(503))
+        working = FakeCompletions("b")
+        llm = LLMClient(cache=None, endpoints=[endpoint("a", broken), endpoint("b", working)])
+        llm.endpoints[1].in_flight = 1  # the first call goes to "a"
+
+        async def run():
+            with self.assertRaises(HTTPError):
+                await llm.generate("x")
+            llm.endpoints[1].in_flight = 0
+            return [await llm.generate("x") for _ in range(3)]
+
+        self.assertEqual(asyncio.run(run()), ["b", "b", "b"])
+        self.assertEqual(broken.calls, 1)
+        self.assertEqual(llm.endpoint_stats()["a"]["errors"], 1)
+
+    def test_hedged_request_takes_first_response(self):
+        slow = FakeCompletions("slow", delay=2.0)
+        fast = FakeCompletions("fast", delay=0.01)
+        a = endpoint("a", slow, latency=0.05)
+        b = endpoint("b", fast, latency=0.05)
+        b.in_flight = 1  # so the first attempt goes to the slow endpoint
+        llm = LLMClient(cache=None, endpoints=[a, b], hedge=True)
+        llm.hedge_min_delay = 0.05
+
+        async def run():
+            start = time.perf_counter()
+            answer = await llm.generate("x")
+            await asyncio.sleep(0)
+            return answer, time.perf_counter() - start
+
+        answer, seconds = asyncio.run(run())
+        self.assertEqual(answer, "fast")
+        self.assertLess(seconds, 1.0)
+        self.assertEqual(slow.cancelled, 1)
+        self.assertEqual((a.in_flight, b.in_flight), (0, 1))
+        # The cancelled call still tells the hedge delay it took at least this long
+        self.assertEqual(len(a.latencies), 21)
+        self.assertGreaterEqual(a.latencies[-1], 0.05)
+
+    def test_hedge_stays_on_the_same_model(self):
+        a = endpoint("a", FakeCompletions("a", delay=0.3), latency=0.05, model="m1")
+        b = endpoint("b", FakeCompletions("b"), latency=0.05, model="m2")
+        llm = LLMClient(cache=None, endpoints=[a, b], hedge=True)
+        llm.hedge_min_delay = 0.05
+        self.assertIsNone(llm.pick(exclude={a}, model="m1"))
+        b.in_flight = 1
+        self.assertEqual(asyncio.run(llm.generate("x")), "a")
+        self.assertEqual(b.requests, 20)
+
+    def test_cache_is_keyed_by_the_serving_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = FakeCompletions("from m1")
+            second = FakeCompletions("from m2")
+            a = endpoint("a", first, model="m1")
+            b = endpoint("b", second, model="m2")
+            llm = LLMClient(cache=ResponseCache(os.path.join(tmp, "cache.sqlite")), endpoints=[a, b])
+
+            b.in_flight = 1
+            self.assertEqual(asyncio.run(llm.generate("x")), "from m1")
+            # Routed to the other model: its own answer, not m1's cached one
+            b.in_flight, a.in_flight = 0, 1
+            self.assertEqual(asyncio.run(llm.generate("x")), "from m2")
+            self.assertEqual(asyncio.run(llm.generate("x")), "from m2")
+            self.assertEqual((first.calls, second.calls), (1, 1))
+            llm.cache.close()
+
+    def test_no_hedge_without_enough_samples_or_when_disabled(self):
+        a = endpoint("a", FakeCompletions("a", delay=0.2))
+        b = endpoint("b", FakeCompletions("b"))
+        llm = LLMClient(cache=None, endpoints=[a, b], hedge=True)
+        self.assertIsNone(llm.hedge_delay())
+        llm.hedge = False
+        for e in (a, b):
+            for _ in range(20):
+                e.record_success(0.01)
+        b.in_flight = 1
+        self.assertEqual(asyncio.run(llm.generate("x")), "a")
+
+    def test_endpoints_from_env(self):
+        saved = {k: os.environ.pop(k, None) for k in ("LLM_ENDPOINTS", "LLM_API_KEYS", "LLM_BASE_URL", "LLM_API_KEY")}
+        try:
+            os.environ["LLM_BASE_URL"] = "http://provider/v1"
+            os.environ["LLM_API_KEYS"] = "k1, k2"
+            endpoints = LLMClient.endpoints_from_env()
+            self.assertEqual([(e.base_url, e.api_key) for e in endpoints], [("http://provider/v1", "k1"), ("http://provider/v1", "k2")])
+            os.environ["LLM_ENDPOINTS"] = '[{"base_url": "http://a/v1", "api_key": "x", "model": "m", "name": "a"}]'
+            endpoints = LLMClient.endpoints_from_env()
+            self.assertEqual([(e.name, e.model) for e in endpoints], [("a", "m")])
+        finally:
+            for key, value in saved.items():
+                os.environ.pop(key, None)
+                if value is not None:
+                    os.environ[key] = value
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import sys
+import os
+import asyncio
+import unittest
+
+import igraph as ig
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.local_search import BM25Index, LocalSearch
+from app.core.llm import LLMClient
+from app.core.scheduler import ExtractionScheduler
+
+def make_graph():
+    g = ig.Graph()
+    g.add_vertices(5)
+    g.vs['name'] = ["SHERLOCK HOLMES", "BRIXTON ROAD", "ENOCH DREBBER", "LESTRADE", "MRS. HUDSON"]
+    g.vs['type'] = ["PERSON", "LOCATION", "PERSON", "PERSON", "PERSON"]
+    g.vs['description'] = [
+        ["The consulting detective."],
+        ["A road where the empty house stands and a body was found."],
+        ["An American found dead in the house."],
+        ["A Scotland Yard inspector."],
+        ["The landlady of Baker Street."],
+    ]
+    g.add_edges([(0, 1), (1, 2), (0, 3), (3, 4)])
+    g.es['weight'] = [8.0, 10.0, 4.0, 2.0]
+    g.es['type'] = ["VISITED", "FOUND_AT", "WORKS_WITH", "KNOWS"]
+    g.es['description'] = [["Holmes examined the house."], ["The body lay at Brixton Road."],
+                           ["They work together."], ["They have met."]]
+    return g
+
+class RecordingLLMClient(LLMClient):
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        self.calls.append((prompt, system_message))
+        return "answer"
+
+    async def generate_stream(self, prompt: str, system_message: str = None):
+        answer = await self.generate(prompt, system_message)
+        for i in range(0, len(answer), 4):
+            yield answer[i:i + 4]
+
+class TestBM25Index(unittest.TestCase):
+    def test_rare_terms_rank_higher(self):
+        index = BM25Index()
+        index.add("the house on the road")
+        index.add("the detective")
+        index.add("the road")
+        results = index.search("detective road")
+        self.assertEqual(results[0][0], 1)
+        self.assertEqual({doc for doc, _ in results}, {0, 1, 2})
+        self.assertEqual(index.search("unknown"), [])
+
+class TestLocalSearch(unittest.TestCase):
+    def test_seeds_and_weighted_neighbourhood(self):
+        search = LocalSearch(RecordingLLMClient(), make_graph(), hops=2)
+        context, seeds = search.build_context("What was found at Brixton Road?")
+        self.assertEqual(seeds[0], "BRIXTON ROAD")
+
+        neighbourhood = dict(search.neighbourhood(1))
+        self.assertEqual(neighbourhood[1], 1.0)
+        self.assertAlmostEqual(neighbourhood[2], 1.0)
+        self.assertAlmostEqual(neighbourhood[0], 0.8)
+        self.assertAlmostEqual(neighbourhood[3], 0.8 * 0.4)
+        self.assertNotIn(4, neighbourhood)  # three hops away
+        self.assertIs(search.neighbourhood(1), search.neighbourhood(1))
+
+        self.assertIn("ENOCH DREBBER", context)
+        self.assertIn("The body lay at Brixton Road.", context)
+
+    def test_context_respects_budget_and_includes_reports(self):
+        g = make_graph()
+        communities = {name: {'level_0': 0} for name in g.vs['name']}
+        reports = {'level_0': {0: {"community_id": 0, "title": "A Study in Scarlet", "summary": "Murder.", "findings": []}}}
+        search = LocalSearch(RecordingLLMClient(), g, communities, reports)
+        context, _ = search.build_context("Brixton Road")
+        self.assertIn("# A Study in Scarlet", context)
+
+        small = LocalSearch(RecordingLLMClient(), g, max_context_tokens=80)
+        context, _ = small.build_context("Brixton Road")
+        self.assertIn("BRIXTON ROAD", context)
+        self.assertNotIn("-----Reports-----", context)
+
+    def test_single_llm_call(self):
+        llm = RecordingLLMClient()
+        result = asyncio.run(LocalSearch(llm, make_graph()).search("Who is Lestrade?"))
+        self.assertEqual(result["answer"], "answer")
+        self.assertEqual(result["seeds"][0], "LESTRADE")
+        self.assertEqual(len(llm.calls), 1)
+        self.assertIn("Scotland Yard", llm.calls[0][1])
+
+    def test_stream_reports_context_then_answer_pieces(self):
+        async def collect():
+            return [event async for event in LocalSearch(RecordingLLMClient(), make_graph()).stream("Who is Lestrade?")]
+
+        events = asyncio.run(collect())
+        self.assertEqual(events[0]["type"], "context")
+        self.assertEqual(events[0]["seeds"][0], "LESTRADE")
+        self.assertEqual([e["text"] for e in events[1:-1]], ["answ", "er"])
+        self.assertEqual(events[-1]["answer"], "answer")
+
+    def test_answer_goes_through_the_scheduler(self):
+        scheduler = ExtractionScheduler()
+        llm = RecordingLLMClient()
+        asyncio.run(LocalSearch(llm, make_graph(), scheduler=scheduler).search("Who is Lestrade?"))
+        self.assertEqual(scheduler.stats()["completed"], 1)
+        self.assertGreater(scheduler.tokens_completed, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import os
+import re
+import json
+import asyncio
+import tempfile
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.extractor import EntityExtractor
+from app.core.llm import LLMClient
+
+def extraction(chunk_id):
+    return {"entities": [{"name": f"Entity {chunk_id}", "type": "PERSON", "description": "Someone."}], "relationships": []}
+
+class PackingLLMClient(LLMClient):
+    """
+    Answers packed requests for every chunk except those in `drop` (missing) and `garble` (malformed).
+    """
+    def __init__(self, drop=(), garble=()):
+        self.drop = set(drop)
+        self.garble = set(garble)
+        self.requests = []
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        ids = [int(i) for i in re.findall(r'<chunk id="(\d+)">', prompt)]
+        self.requests.append(ids)
+        if not ids:
+            chunk_id = int(prompt.split(":")[0].split()[1])
+            return json.dumps(extraction(chunk_id))
+        entries = []
+        for chunk_id in ids:
+            if chunk_id in self.drop:
+                continue
+            if chunk_id in self.garble:
+                entries.append({"chunk_id": chunk_id, "entities": "not a list"})
+                continue
+            entries.append({"chunk_id": chunk_id, **extraction(chunk_id)})
+        return "```json\n" + json.dumps({"chunks": entries}) + "\n```"
+
+class TestPacking(unittest.TestCase):
+    def test_packed_response_is_demultiplexed(self):
+        llm = PackingLLMClient(drop={1}, garble={2})
+        extractor = EntityExtractor(llm)
+        chunks = [(i, f"Text of chunk {i}.", 5) for i in range(4)]
+        results = asyncio.run(extractor.process_packed(chunks, "prompt"))
+        self.assertEqual([r["chunk_id"] for r in results], [0, 1, 2, 3])
+        for result in results:
+            self.assertEqual(result["status"], "success")
+            self.assertEqual(result["data"], extraction(result["chunk_id"]))
+        # One packed request plus individual retries of the missing and the malformed chunk
+        self.assertEqual(sorted(map(tuple, llm.requests)), [(), (), (0, 1, 2, 3)])
+
+    def test_process_chunks_packs_up_to_budget(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "book.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(" ".join(f"word{i % 500}" for i in range(12000)))
+
+            unpacked = PackingLLMClient()
+            expected = asyncio.run(EntityExtractor(unpacked).process_chunks(path, "prompt", workers=1))
+
+            packed = PackingLLMClient()
+            results = asyncio.run(EntityExtractor(packed, pack_tokens=3000).process_chunks(path, "prompt", workers=1))
+
+        self.assertEqual(results, expected)
+        self.assertGreater(len(expected), 4)
+        self.assertLess(len(packed.requests), len(unpacked.requests))
+        self.assertTrue(all(len(ids) <= 2 for ids in packed.requests))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import os
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.query_cache import QueryCache, TTLCache, normalize_query
+from app.core.search import GlobalSearch
+from test_search import ScoringLLMClient, reports
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_eviction_and_hit_rate(self):
+        cache = TTLCache("test", max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats(), {"entries": 2, "hits": 2, "misses": 1, "evictions": 1, "hit_rate": 0.6667})
+
+    def test_entries_expire(self):
+        cache = TTLCache("test", ttl=10)
+        cache.put("a", 1)
+        with mock.patch("app.core.query_cache.time.monotonic", return_value=time.monotonic() + 11):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_normalized_queries_share_a_key(self):
+        self.assertEqual(normalize_query("  Who is  HOLMES? "), normalize_query("who is holmes"))
+        self.assertNotEqual(normalize_query("who is holmes"), normalize_query("who is watson"))
+
+class CountingLLMClient(ScoringLLMClient):
+    def __init__(self, scores):
+        super().__init__(scores)
+        self.calls = 0
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        self.calls += 1
+        return await super().generate(prompt, system_message)
+
+class TestCachedGlobalSearch(unittest.TestCase):
+    def search(self, llm, cache, data, version, query="What happened?"):
+        return asyncio.run(GlobalSearch(llm, data, cache=cache, index_version=version).search(query))
+
+    def test_repeat_query_makes_no_llm_calls(self):
+        llm = CountingLLMClient({1: 30, 2: 80})
+        cache = QueryCache()
+        first = self.search(llm, cache, reports(3), ("default", 1))
+        calls = llm.calls
+        self.assertEqual(calls, 4)
+
+        again = self.search(llm, cache, reports(3), ("default", 1), query="what happened")
+        self.assertEqual(llm.calls, calls)
+        self.assertTrue(again["cached"])
+        self.assertFalse(first["cached"])
+        self.assertEqual(again["answer"], first["answer"])
+        self.assertEqual(cache.answers.stats()["hits"], 1)
+
+    def test_new_version_reuses_map_results_of_unchanged_reports(self):
+        llm = CountingLLMClient({1: 30, 2: 80})
+        cache = QueryCache()
+        self.search(llm, cache, reports(3), ("default", 1))
+        changed = reports(3)
+        changed['level_1'][2]["summary"] = "Rewritten after a re-index."
+        llm.map_calls = 0
+        result = self.search(llm, cache, changed, ("default", 2))
+        # Only the changed report is mapped again (plus the reduce call)
+        self.assertEqual(llm.map_calls, 1)
+        self.assertFalse(result["cached"])
+        self.assertEqual([p["community_id"] for p in result["points"]], [2, 1])
+
+    def test_without_index_version_only_maps_are_cached(self):
+        llm = CountingLLMClient({1: 30})
+        cache = QueryCache()
+        self.search(llm, cache, reports(2), None)
+        self.search(llm, cache, reports(2), None)
+        self.assertEqual(llm.map_calls, 2)
+        self.assertEqual(len(cache.answers), 0)
+
+if __name__ == '__main__':
+    unittest.main()
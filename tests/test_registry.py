@@ -0,0 +1,111 @@
+import sys
+import os
+import tempfile
+import threading
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.registry import IndexRegistry, REPORTS_FILE, estimate_memory
+from app.core.snapshot import SnapshotStore
+from app.core.summarizer import save_reports
+from test_snapshot import sample_graph
+
+def publish(root, index_id, title="Baker Street"):
+    graph, communities = sample_graph()
+    store = SnapshotStore(os.path.join(root, index_id))
+    version = store.publish(graph, communities, activate=False)
+    save_reports({"level_0": {0: {"title": title, "summary": "", "findings": []}}},
+                 os.path.join(store.path(version), REPORTS_FILE))
+    store.activate(version)
+    return version
+
+class TestIndexRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_loads_on_demand_and_once(self):
+        publish(self.root, "acme")
+        registry = IndexRegistry(self.root)
+        loaded = registry.get("acme")
+        self.assertIs(registry.get("acme"), loaded)
+        self.assertEqual(loaded.reports["level_0"][0]["title"], "Baker Street")
+        self.assertEqual(loaded.graph.vcount(), 4)
+        self.assertGreater(loaded.nbytes, 0)
+        self.assertEqual(registry.loads, 1)
+        self.assertEqual(registry.index_ids(), ["acme"])
+
+    def test_unknown_and_invalid_ids(self):
+        registry = IndexRegistry(self.root)
+        with self.assertRaises(LookupError):
+            registry.get("missing")
+        for bad in ("..", "a/b", ""):
+            with self.assertRaises(ValueError):
+                registry.get(bad)
+
+    def test_evicts_least_recently_used_over_the_limit(self):
+        for index_id in ("a", "b", "c"):
+            publish(self.root, index_id)
+        size = IndexRegistry(self.root).get("a").nbytes
+        registry = IndexRegistry(self.root, memory_limit=int(size * 2.5))
+        first = registry.get("a")
+        registry.get("b")
+        registry.get("a")
+        registry.get("c")
+        self.assertEqual(list(registry.stats()["resident"]), ["a", "c"])
+        self.assertEqual(registry.evictions, 1)
+        # Evicted indexes stay usable by whoever holds them, and reload on demand
+        self.assertEqual(first.graph.vcount(), 4)
+        registry.get("b")
+        self.assertEqual(registry.loads, 4)
+        self.assertLessEqual(registry.resident_bytes(), registry.memory_limit)
+
+    def test_index_larger_than_the_limit_still_loads(self):
+        publish(self.root, "big")
+        registry = IndexRegistry(self.root, memory_limit=1)
+        self.assertEqual(registry.get("big").graph.vcount(), 4)
+
+    def test_reload_serves_the_resident_version_meanwhile(self):
+        publish(self.root, "acme")
+        registry = IndexRegistry(self.root)
+        old = registry.get("acme")
+        publish(self.root, "acme", title="Scotland Yard")
+
+        # Another reader is reloading: this one gets the old version without waiting
+        registry._loading["acme"].acquire()
+        try:
+            self.assertIs(registry.get("acme"), old)
+        finally:
+            registry._loading["acme"].release()
+
+        new = registry.get("acme")
+        self.assertEqual(new.version, old.version + 1)
+        self.assertEqual(new.reports["level_0"][0]["title"], "Scotland Yard")
+        self.assertEqual(old.reports["level_0"][0]["title"], "Baker Street")
+
+    def test_concurrent_first_loads_load_once(self):
+        publish(self.root, "acme")
+        registry = IndexRegistry(self.root)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("acme"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(registry.loads, 1)
+        self.assertTrue(all(loaded is results[0] for loaded in results))
+
+    def test_estimate_grows_with_content(self):
+        graph, communities = sample_graph()
+        small = estimate_memory(graph, communities, {})
+        graph.vs['description'] = [["x" * 10000]] * graph.vcount()
+        self.assertGreater(estimate_memory(graph, communities, {}), small + 4 * 9000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.resolution import EntityIndex, MinHasher, NameNormalizer
+from app.core.graph import GraphStore
+
+CHUNKS = [{
+    "status": "success",
+    "data": {
+        "entities": [
+            {"name": "Sherlock Holmes", "type": "PERSON", "description": "A detective."},
+            {"name": "The Brixton Road", "type": "LOCATION", "description": "A street."},
+            {"name": "SHERLOCK  HOLMES", "type": "PERSON", "description": "A detective."},
+        ],
+        "relationships": [
+            {"source": "sherlock holmes", "target": "the Brixton Road", "relationship_type": "VISITS",
+             "description": "Holmes examines the house.", "strength": 6},
+            {"source": "Sherlock Holmes", "target": "The Brixton Road", "relationship_type": "VISITS",
+             "description": "Holmes examines the house.", "strength": 8},
+        ]
+    }
+}]
+
+class TestNameNormalizer(unittest.TestCase):
+    def test_defaults_fold_case_and_whitespace(self):
+        normalize = NameNormalizer()
+        self.assertEqual(normalize("  Sherlock \n Holmes "), "sherlock holmes")
+        self.assertNotEqual(normalize("Mr. Holmes"), normalize("Mr Holmes"))
+
+    def test_punctuation_and_aliases(self):
+        normalize = NameNormalizer(strip_punctuation=True, aliases={"Holmes": "Sherlock Holmes"})
+        self.assertEqual(normalize("Mr. Holmes"), normalize("Mr Holmes"))
+        self.assertEqual(normalize("holmes"), normalize("Sherlock Holmes"))
+
+class TestEntityIndex(unittest.TestCase):
+    def test_interns_names_and_merges_records(self):
+        index = EntityIndex()
+        index.add_chunks(CHUNKS)
+        self.assertEqual(len(index), 2)
+        holmes = index.lookup("sherlock holmes")
+        self.assertEqual(index.names[holmes], "Sherlock Holmes")
+        self.assertEqual(index.descriptions[holmes], ["A detective."])
+        self.assertEqual(len(index.rel_source), 1)
+        self.assertEqual(index.rel_strength[0], 8.0)
+
+    def test_casing_mismatch_does_not_drop_edges(self):
+        store = GraphStore()
+        store.add_chunks(CHUNKS)
+        self.assertEqual(store.graph.vcount(), 2)
+        self.assertEqual(store.graph.ecount(), 1)
+        self.assertEqual(store.graph.es[0]['weight'], 8.0)
+
+    def test_undeclared_endpoint_is_not_an_entity(self):
+        index = EntityIndex()
+        index.add_relationship("Holmes", "Gregson", "MEETS", "They meet.", 3.0)
+        index.add_entity("Holmes", "PERSON", "Detective.")
+        data = index.to_dict()
+        self.assertEqual([e["name"] for e in data["entities"]], ["Holmes"])
+        self.assertEqual(data["relationships"], [])
+
+    def test_near_duplicate_descriptions_are_dropped(self):
+        index = EntityIndex()
+        index.add_entity("Holmes", "PERSON", "A consulting detective living at 221B Baker Street in London.")
+        index.add_entity("Holmes", "PERSON", "A consulting detective living at 221B Baker Street, London.")
+        index.add_entity("Holmes", "PERSON", "Plays the violin when thinking.")
+        index.add_entity("Watson", "PERSON", "A consulting detective living at 221B Baker Street in London!")
+        holmes = index.lookup("Holmes")
+        self.assertEqual(len(index.descriptions[holmes]), 2)
+        self.assertEqual(index.near_duplicates, 1)
+        # Similarity is only checked within one entity
+        self.assertEqual(len(index.descriptions[index.lookup("Watson")]), 1)
+
+        index = EntityIndex(near_duplicate_threshold=None)
+        index.add_entity("Holmes", "PERSON", "A consulting detective living at 221B Baker Street in London.")
+        index.add_entity("Holmes", "PERSON", "A consulting detective living at 221B Baker Street, London.")
+        self.assertEqual(len(index.descriptions[0]), 2)
+
+class TestMinHasher(unittest.TestCase):
+    def test_similarity_estimates_jaccard(self):
+        minhash = MinHasher(num_perm=128)
+        a = minhash.signature("the quick brown fox jumps over the lazy dog near the river bank")
+        b = minhash.signature("the quick brown fox jumps over the lazy dog near the river")
+        c = minhash.signature("an entirely different sentence about chemistry experiments")
+        self.assertGreater(MinHasher.similarity(a, b[None, :])[0], 0.7)
+        self.assertLess(MinHasher.similarity(a, c[None, :])[0], 0.1)
+        self.assertTrue((minhash.signature("Same  text") == MinHasher(num_perm=128).signature("same text")).all())
+        self.assertIsNone(minhash.signature("..."))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import asyncio
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.scheduler import ExtractionScheduler, is_retryable
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class TestExtractionScheduler(unittest.TestCase):
+    def test_retryable_classification(self):
+        self.assertTrue(is_retryable(StatusError(429)))
+        self.assertTrue(is_retryable(StatusError(503)))
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(is_retryable(StatusError(400)))
+        self.assertFalse(is_retryable(ValueError("bad json")))
+
+    def test_retries_rate_limit_then_succeeds(self):
+        scheduler = ExtractionScheduler(max_in_flight=2, base_delay=0.001, max_delay=0.01)
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise StatusError(429)
+            return "ok"
+
+        result = asyncio.run(scheduler.submit(flaky))
+        self.assertEqual(result, "ok")
+        self.assertEqual(scheduler.retries, 2)
+        self.assertEqual(scheduler.stats()["completed"], 1)
+
+    def test_stream_retries_only_before_the_first_item(self):
+        scheduler = ExtractionScheduler(base_delay=0.001, max_delay=0.01)
+        attempts = []
+
+        async def flaky_start():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise StatusError(503)
+            for piece in ("a", "b"):
+                yield piece
+
+        async def collect(make_stream):
+            return [piece async for piece in scheduler.stream(make_stream)]
+
+        self.assertEqual(asyncio.run(collect(flaky_start)), ["a", "b"])
+        self.assertEqual(scheduler.retries, 1)
+
+        async def broken_midway():
+            yield "a"
+            raise StatusError(503)
+
+        with self.assertRaises(StatusError):
+            asyncio.run(collect(broken_midway))
+        self.assertEqual(scheduler.retries, 1)
+        self.assertEqual(scheduler.stats()["in_flight"], 0)
+
+    def test_non_retryable_error_is_raised(self):
+        scheduler = ExtractionScheduler(base_delay=0.001)
+
+        async def broken():
+            raise StatusError(401)
+
+        with self.assertRaises(StatusError):
+            asyncio.run(scheduler.submit(broken))
+        self.assertEqual(scheduler.failed, 1)
+        self.assertEqual(scheduler.retries, 0)
+
+    def test_max_in_flight_is_respected(self):
+        scheduler = ExtractionScheduler(max_in_flight=3)
+        peak = []
+
+        async def call():
+            peak.append(scheduler.in_flight)
+            await asyncio.sleep(0.01)
+            return scheduler.in_flight
+
+        async def run():
+            return await asyncio.gather(*[scheduler.submit(call) for _ in range(10)])
+
+        asyncio.run(run())
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
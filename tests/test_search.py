@@ -0,0 +1,104 @@
+import sys
+import os
+import json
+import asyncio
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.search import GlobalSearch, PackedAnswers
+from app.core.scheduler import ExtractionScheduler
+from app.core.llm import LLMClient
+from app.prompts.global_search import NO_DATA_ANSWER
+
+def reports(count):
+    return {'level_1': {
+        i: {"community_id": i, "status": "success", "title": f"Community {i}", "summary": f"About topic {i}.", "findings": []}
+        for i in range(count)
+    }}
+
+class ScoringLLMClient(LLMClient):
+    """
+    Scores each report by the number in its title; reports listed in `slow` take a long time.
+    """
+    def __init__(self, scores, slow=()):
+        self.scores = scores
+        self.slow = set(slow)
+        self.map_calls = 0
+        self.reduce_prompt = None
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        if "Analyst Reports" in (system_message or ""):
+            self.reduce_prompt = system_message
+            return "final answer"
+        self.map_calls += 1
+        community = int(prompt.split("# Community ")[1].split("\n")[0])
+        if community in self.slow:
+            await asyncio.sleep(5)
+        score = self.scores.get(community, 0)
+        return json.dumps({"points": [{"description": f"Point from community {community}. " * 5, "score": score}]})
+
+    async def generate_stream(self, prompt: str, system_message: str = None):
+        answer = await self.generate(prompt, system_message)
+        for i in range(0, len(answer), 4):
+            yield answer[i:i + 4]
+
+class TestPackedAnswers(unittest.TestCase):
+    def test_packing_and_full_detection(self):
+        pack = PackedAnswers(token_budget=10)
+        pack.add({"score": 40, "tokens": 6, "answer": "a"})
+        pack.add({"score": 90, "tokens": 6, "answer": "b"})
+        self.assertEqual([a["answer"] for a in pack.packed()], ["b"])
+        self.assertFalse(pack.is_full())
+        pack.add({"score": 100, "tokens": 6, "answer": "c"})
+        pack.add({"score": 100, "tokens": 6, "answer": "d"})
+        self.assertTrue(pack.is_full())
+
+class TestGlobalSearch(unittest.TestCase):
+    def test_zero_scores_dropped_and_answers_ranked(self):
+        llm = ScoringLLMClient({0: 0, 1: 30, 2: 80})
+        result = asyncio.run(GlobalSearch(llm, reports(3)).search("what happened?"))
+        self.assertEqual(result["answer"], "final answer")
+        self.assertEqual([p["community_id"] for p in result["points"]], [2, 1])
+        self.assertLess(llm.reduce_prompt.index("community 2"), llm.reduce_prompt.index("community 1"))
+
+    def test_reduce_answer_is_streamed(self):
+        llm = ScoringLLMClient({1: 30, 2: 80})
+
+        async def collect():
+            return [event async for event in GlobalSearch(llm, reports(3)).stream("what happened?")]
+
+        events = asyncio.run(collect())
+        tokens = [e["text"] for e in events if e["type"] == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual([e["type"] for e in events[-len(tokens) - 1:]], ["token"] * len(tokens) + ["answer"])
+        self.assertEqual("".join(tokens), events[-1]["answer"])
+
+    def test_no_useful_answers(self):
+        llm = ScoringLLMClient({})
+        result = asyncio.run(GlobalSearch(llm, reports(2)).search("what happened?"))
+        self.assertEqual(result["answer"], NO_DATA_ANSWER)
+        self.assertIsNone(llm.reduce_prompt)
+
+    def test_stops_once_budget_is_provably_full(self):
+        # Two top-scoring answers fill the budget; the slow remaining calls are never awaited
+        llm = ScoringLLMClient({0: 100, 1: 100}, slow=range(2, 20))
+        search = GlobalSearch(llm, reports(20), scheduler=ExtractionScheduler(max_in_flight=4), reduce_token_budget=40)
+
+        async def timed():
+            start = asyncio.get_running_loop().time()
+            result = await asyncio.wait_for(search.search("what happened?"), timeout=2)
+            return result, asyncio.get_running_loop().time() - start
+
+        result, elapsed = asyncio.run(timed())
+        self.assertLess(elapsed, 1)
+        self.assertEqual(result["map_calls"], 2)
+        self.assertEqual(result["skipped"], 18)
+        # Only the first wave (plus slots freed by the finished calls) ever reached the provider
+        self.assertLessEqual(llm.map_calls, 6)
+        self.assertEqual(search.scheduler.stats()["queue_depth"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
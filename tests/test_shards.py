@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from benchmarks import synthetic
+from app.core.graph import GraphStore, build_graph, clean_json, load_entity_index
+from app.core.resolution import EntityIndex
+from config import Settings
+from core.service import build_snapshot
+from core.telemetry import telemetry
+from app.core.shards import list_shards, partial_tables, read_shard, write_jsonl
+from test_graph_store import BATCH_1, BATCH_2, chunk
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.chunks = synthetic.generate_extraction(0.3, seed=5)
+        self.json_path = os.path.join(self.tmp.name, "results.json")
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(self.chunks, f)
+        self.jsonl_path = os.path.join(self.tmp.name, "results.jsonl")
+        write_jsonl(self.jsonl_path, self.chunks)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_every_line_is_read_once_whatever_the_shard_size(self):
+        for shard_bytes in (1, 97, 1000, 10 ** 9):
+            shards = list_shards(self.jsonl_path, shard_bytes)
+            read = [c for shard in shards for c in read_shard(shard)]
+            self.assertEqual(read, self.chunks, shard_bytes)
+
+    def test_directory_of_shards_is_read_in_name_order(self):
+        directory = os.path.join(self.tmp.name, "shards")
+        os.makedirs(directory)
+        write_jsonl(os.path.join(directory, "batch_001.jsonl"), self.chunks[10:])
+        write_jsonl(os.path.join(directory, "batch_000.jsonl"), self.chunks[:10])
+        self.assertEqual([c for shard in list_shards(directory) for c in read_shard(shard)], self.chunks)
+
+    def test_merged_partial_tables_match_a_single_pass(self):
+        expected = clean_json(self.json_path)
+        self.assertEqual(clean_json(self.jsonl_path), expected)
+        self.assertEqual(load_entity_index(self.jsonl_path, workers=2, shard_bytes=5000).to_dict(), expected)
+
+    def test_near_duplicates_are_decided_in_order(self):
+        # The second shard's first description is a near duplicate of one only the first shard holds
+        text = "A consulting detective who lives at Baker Street in London with his friend the doctor and solves cases"
+        first = [chunk([("Holmes", "PERSON", text)])]
+        second = [chunk([("Holmes", "PERSON", text + " for Scotland Yard"),
+                         ("Holmes", "PERSON", "Plays the violin when thinking about cases")])]
+        sequential = EntityIndex()
+        sequential.add_chunks(first + second)
+
+        merged = EntityIndex()
+        for batch in (first, second):
+            path = os.path.join(self.tmp.name, f"{len(batch)}.jsonl")
+            write_jsonl(path, batch)
+            merged.merge_tables(partial_tables((path, 0, os.path.getsize(path))))
+        self.assertEqual(merged.to_dict(), sequential.to_dict())
+        self.assertEqual(merged.near_duplicates, sequential.near_duplicates)
+        self.assertEqual(merged.near_duplicates, 1)
+
+    def test_graph_from_shards_matches_json(self):
+        expected = build_graph(self.json_path)
+        graph = build_graph(self.jsonl_path, workers=2)
+        self.assertEqual(graph.vs['name'], expected.vs['name'])
+        self.assertEqual(graph.get_edgelist(), expected.get_edgelist())
+        self.assertEqual(graph.es['weight'], expected.es['weight'])
+
+    def test_graph_build_reports_the_loading_stage(self):
+        telemetry.reset()
+        build_graph(self.jsonl_path)
+        stages = telemetry.report()["stages"]
+        self.assertEqual(stages["load_entity_index"]["runs"], 1)
+        self.assertEqual(stages["build_graph"]["runs"], 1)
+
+    def test_index_builds_from_a_legacy_json_extraction(self):
+        settings = Settings(data_dir=self.tmp.name)
+        os.rename(self.json_path, os.path.join(self.tmp.name, "extracted_entities.json"))
+        self.assertEqual(os.path.basename(settings.extraction_input_path), "extracted_entities.json")
+        built = build_snapshot(settings.extraction_input_path, settings.index_dir)
+        self.assertEqual(built["vertices"], build_graph(self.jsonl_path).vcount())
+
+        # Once an ingest has written the JSONL results, they take over
+        write_jsonl(settings.extraction_path, self.chunks)
+        self.assertEqual(settings.extraction_input_path, settings.extraction_path)
+
+    def test_store_merges_partial_tables_like_chunks(self):
+        path = os.path.join(self.tmp.name, "batch.jsonl")
+        write_jsonl(path, BATCH_2)
+        store = GraphStore()
+        store.add_chunks(BATCH_1)
+        changed = store.add_tables(partial_tables((path, 0, os.path.getsize(path))))
+
+        whole = GraphStore()
+        whole.add_chunks(BATCH_1)
+        self.assertEqual(changed, whole.add_chunks(BATCH_2))
+        self.assertEqual(store.index.to_dict(), whole.index.to_dict())
+        self.assertEqual(store.graph.get_edgelist(), whole.graph.get_edgelist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import sys
+import os
+import tempfile
+import unittest
+import igraph as ig
+import numpy as np
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.snapshot import save_snapshot, load_snapshot, SnapshotStore
+from app.core.graph import GraphStore, edge_relationships, get_layout
+
+def sample_graph():
+    g = ig.Graph()
+    g.add_vertices(4)
+    g.vs['name'] = ['Holmes', 'Watson', 'Lestrade', 'Zażółć']
+    g.vs['type'] = ['PERSON', 'PERSON', 'PERSON', 'LOCATION']
+    g.vs['description'] = [['Detective.', 'Violinist.'], ['Doctor.'], [], ['Unicode place.']]
+    g.add_edges([(0, 1), (0, 2), (2, 3)])
+    g.es['weight'] = [8.0, 5.0, 1.5]
+    g.es['type'] = ['LIVES_WITH', 'ASSISTS', 'VISITS']
+    g.es['description'] = [['Share rooms.'], ['Helps.'], ['Went there.']]
+    communities = {
+        'Holmes': {'level_1': 0, 'level_0': 0},
+        'Watson': {'level_1': 0, 'level_0': 0},
+        'Lestrade': {'level_1': 1, 'level_0': 0},
+        'Zażółć': {'level_1': 1, 'level_0': 0},
+    }
+    return g, communities
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        graph, communities = sample_graph()
+        path = os.path.join(self.tmp.name, "snap")
+        save_snapshot(path, graph, communities)
+        loaded, loaded_communities, manifest = load_snapshot(path)
+
+        self.assertEqual(manifest["levels"], ["level_0", "level_1"])
+        self.assertEqual(loaded.get_edgelist(), graph.get_edgelist())
+        for attr in ('name', 'type', 'description'):
+            self.assertEqual(loaded.vs[attr], graph.vs[attr])
+        for attr in ('weight', 'type', 'description'):
+            self.assertEqual(loaded.es[attr], graph.es[attr])
+        self.assertEqual(loaded_communities, communities)
+        self.assertNotIn('layout', loaded.attributes())
+
+    def test_relationship_table_round_trip(self):
+        from test_graph_store import BATCH_1, BATCH_2, chunk
+        store = GraphStore()
+        store.add_chunks([chunk([("Mycroft", "PERSON", "Brother.")],
+                                [("Mycroft", "Sherlock Holmes", "SIBLING_OF", "Brothers.", 6)])] + BATCH_1 + BATCH_2
+                         + [chunk([], [("John Watson", "Sherlock Holmes", "ASSISTS", "Takes notes.", 4)])])
+        graph = store.to_graph()
+        communities = {name: {'level_1': 0} for name in graph.vs['name']}
+        path = os.path.join(self.tmp.name, "snap")
+        save_snapshot(path, graph, communities)
+        loaded, _, _ = load_snapshot(path)
+
+        self.assertEqual(loaded.es['weight'], graph.es['weight'])
+        self.assertNotIn('type', loaded.es.attributes())
+        for edge, loaded_edge in zip(graph.es, loaded.es):
+            self.assertEqual(edge_relationships(loaded, loaded_edge), edge_relationships(graph, edge))
+        self.assertEqual(len(loaded['relationships']), graph.ecount())
+        self.assertEqual(int(loaded['relationships'].offsets[-1]), 4)
+
+    def test_layout_is_persisted(self):
+        graph, communities = sample_graph()
+        layout = get_layout(graph, communities)
+        path = os.path.join(self.tmp.name, "snap")
+        save_snapshot(path, graph, communities)
+        loaded, loaded_communities, _ = load_snapshot(path)
+        self.assertTrue(np.allclose(loaded['layout'], layout))
+        self.assertIs(get_layout(loaded, loaded_communities), loaded['layout'])
+
+    def test_descriptions_are_decoded_on_first_access(self):
+        graph, communities = sample_graph()
+        path = os.path.join(self.tmp.name, "snap")
+        save_snapshot(path, graph, communities)
+        loaded, _, _ = load_snapshot(path)
+
+        descriptions = loaded.vs['description']
+        self.assertEqual([len(d) for d in descriptions], [2, 1, 0, 1])
+        self.assertTrue(all(d._values is None for d in descriptions))
+        self.assertEqual(' '.join(descriptions[0]), 'Detective. Violinist.')
+        self.assertEqual(descriptions[0]._values, ['Detective.', 'Violinist.'])
+        self.assertIsNone(descriptions[1]._values)
+
+        # A loaded graph (e.g. after consolidation) saves back unchanged
+        again = os.path.join(self.tmp.name, "again")
+        save_snapshot(again, loaded, communities)
+        reloaded, _, _ = load_snapshot(again)
+        self.assertEqual(reloaded.vs['description'], graph.vs['description'])
+        self.assertEqual(reloaded.es['description'], graph.es['description'])
+
+    def test_store_hot_swaps_to_new_version(self):
+        store = SnapshotStore(os.path.join(self.tmp.name, "index"))
+        self.assertIsNone(store.current())
+
+        graph, communities = sample_graph()
+        self.assertEqual(store.publish(graph, communities), 1)
+        version, first, _, _ = store.current()
+        self.assertEqual(version, 1)
+        self.assertIs(store.current()[1], first)
+
+        graph.delete_vertices([3])
+        del communities['Zażółć']
+        self.assertEqual(store.publish(graph, communities), 2)
+        version, second, _, manifest = store.current()
+        self.assertEqual((version, second.vcount(), manifest["metadata"]["version"]), (2, 3, 2))
+        self.assertEqual(first.vcount(), 4)
+
+        store.prune(keep=1)
+        self.assertEqual(store.versions(), [2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+import igraph as ig
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.summarizer import Summarizer
+from app.core.cache import ResponseCache
+from app.core.llm import Endpoint, LLMClient
+from app.core.text_utils import count_tokens
+
+class ReportLLMClient(LLMClient):
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt: str, system_message: str = None) -> str:
+        self.prompts.append(prompt)
+        title = "Parent" if "Sub-community" in prompt else f"Report {len(self.prompts)}"
+        return json.dumps({"title": title, "summary": "Summary.", "rating": 5.0,
+                           "rating_explanation": "Because.", "findings": [{"summary": "F", "explanation": "E"}]})
+
+def sample():
+    g = ig.Graph()
+    g.add_vertices(6)
+    g.vs['name'] = ['Holmes', 'Watson', 'Hudson', 'Drebber', 'Stangerson', 'Hope']
+    g.vs['type'] = ['PERSON'] * 6
+    g.vs['description'] = [[f"{n} is a character in the story. " * 5] for n in g.vs['name']]
+    g.add_edges([(0, 1), (0, 2), (1, 2), (3, 4), (3, 5), (4, 5), (2, 3)])
+    g.es['weight'] = [1.0] * 7
+    g.es['type'] = ['KNOWS'] * 7
+    g.es['description'] = [["They know each other."]] * 7
+    communities = {name: {'level_1': 0 if i < 3 else 1, 'level_0': 0} for i, name in enumerate(g.vs['name'])}
+    return g, communities
+
+class TestSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bottom_up_reports(self):
+        graph, communities = sample()
+        llm = ReportLLMClient()
+        reports = asyncio.run(Summarizer(graph, communities, llm).summarize_all())
+
+        self.assertEqual(sorted(reports['level_1']), [0, 1])
+        self.assertEqual(reports['level_0'][0]['title'], "Parent")
+        self.assertEqual(reports['level_1'][1]['size'], 3)
+        # The level 0 report is built from child reports, not raw entities
+        parent_prompt = [p for p in llm.prompts if "Sub-community" in p][0]
+        self.assertNotIn("-----Entities-----", parent_prompt)
+        self.assertEqual(parent_prompt.count("-----Sub-community"), 2)
+
+    def test_context_respects_token_budget_and_degree_order(self):
+        graph, communities = sample()
+        summarizer = Summarizer(graph, communities, ReportLLMClient(), max_context_tokens=80)
+        context = summarizer.build_entity_context('level_1', 0)
+        self.assertLessEqual(count_tokens(context), 80)
+        entities = context.split("\n\n")[0].split("\n")[2:]
+        self.assertLess(len(entities), 3)
+        self.assertIn("Hudson", entities[0] + entities[-1])  # highest degree is kept
+
+    def test_context_lists_each_typed_relationship(self):
+        from app.core.graph import GraphStore
+        from test_graph_store import BATCH_1, BATCH_2, chunk
+        store = GraphStore()
+        store.add_chunks(BATCH_1 + BATCH_2 + [chunk([], [("John Watson", "Sherlock Holmes", "ASSISTS", "Takes notes.", 4)])])
+        graph = store.to_graph()
+        communities = {name: {'level_1': 0} for name in graph.vs['name']}
+        context = Summarizer(graph, communities, ReportLLMClient()).build_entity_context('level_1', 0)
+
+        relationships = context.split("-----Relationships-----\n")[1].split("\n")[1:]
+        self.assertEqual(graph.ecount(), 2)
+        self.assertEqual(sorted(row.split(",", 1)[1] for row in relationships), [
+            "John Watson,Baker Street,Watson lives there.",
+            "John Watson,Sherlock Holmes,Takes notes.",
+            "Sherlock Holmes,John Watson,Share rooms.",
+        ])
+
+    def test_unchanged_communities_hit_the_cache(self):
+        cache = ResponseCache(os.path.join(self.tmp.name, "reports.sqlite"))
+        graph, communities = sample()
+        asyncio.run(Summarizer(graph, communities, ReportLLMClient(), cache=cache).summarize_all())
+
+        # Re-index: same contents, an unrelated new entity and renumbered communities
+        graph, communities = sample()
+        graph.add_vertex('Lestrade', type='PERSON', description=["An inspector."])
+        communities = {name: {'level_1': 1 - c['level_1'], 'level_0': 0} for name, c in communities.items()}
+        llm = ReportLLMClient()
+        reports = asyncio.run(Summarizer(graph, communities, llm, cache=cache).summarize_all())
+        self.assertEqual(llm.prompts, [])
+        self.assertEqual(reports['level_1'][1]['community_id'], 1)
+
+    def test_cached_reports_belong_to_their_model(self):
+        cache = ResponseCache(os.path.join(self.tmp.name, "reports.sqlite"))
+        graph, communities = sample()
+        first = ReportLLMClient()
+        first.endpoints = [Endpoint(model="model-a")]
+        asyncio.run(Summarizer(graph, communities, first, cache=cache).summarize_all())
+
+        switched = ReportLLMClient()
+        switched.endpoints = [Endpoint(model="model-b")]
+        asyncio.run(Summarizer(graph, communities, switched, cache=cache).summarize_all())
+        self.assertEqual(len(switched.prompts), len(first.prompts))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+# Add the project root and app directory to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from app.core.telemetry import Histogram, Telemetry
+# The instrumented modules import the registry as `core.telemetry`
+from core.telemetry import telemetry
+from app.core.llm import LLMClient
+
+class FakeCompletions:
+    async def create(self, messages, model, stream=False, stream_options=None):
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=100))
+        message = SimpleNamespace(content="done")
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+        async def events():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=message, finish_reason="stop")], usage=None)
+            # Like OpenAI, a stream only reports usage when asked to
+            if (stream_options or {}).get("include_usage"):
+                yield SimpleNamespace(choices=[], usage=usage)
+        return events()
+
+class FakeOpenAI:
+    chat = SimpleNamespace(completions=FakeCompletions())
+
+class TestTelemetry(unittest.TestCase):
+    def test_histogram_quantiles(self):
+        histogram = Histogram(buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertTrue(1 <= histogram.quantile(0.5) <= 2)
+        self.assertEqual(histogram.summary()["count"], 5)
+
+    def test_prometheus_and_report(self):
+        registry = Telemetry()
+        registry.record_llm_call("m", 0.3, SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None))
+        registry.record_llm_call("m", 2.0, status="error")
+        registry.record_chunk("success")
+        registry.record_chunk("error")
+        with registry.stage("build_graph"):
+            sum(range(10000))
+        with registry.in_flight():
+            with registry.in_flight():
+                pass
+
+        text = registry.prometheus()
+        self.assertIn('# TYPE graphrag_llm_requests_total counter', text)
+        self.assertIn('graphrag_llm_requests_total{model="m",status="error"} 1', text)
+        self.assertIn('graphrag_llm_latency_seconds_bucket{model="m",le="+Inf"} 2', text)
+        self.assertIn('graphrag_llm_in_flight_max 2', text)
+
+        report = registry.report()
+        self.assertEqual(report["llm"]["m"]["requests"], 2)
+        self.assertEqual(report["llm"]["m"]["errors"], 1)
+        self.assertEqual(report["llm"]["m"]["prompt_tokens"], 10)
+        self.assertEqual(report["chunks"]["error_rate"], 0.5)
+        self.assertEqual(report["stages"]["build_graph"]["runs"], 1)
+        self.assertEqual(report["concurrency"]["llm_in_flight"], 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run_report.json")
+            registry.write_report(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["llm"]["m"]["completion_tokens"], 5)
+
+    def test_llm_client_records_usage(self):
+        telemetry.reset()
+        client = LLMClient.__new__(LLMClient)
+        client.client = FakeOpenAI()
+        client.cache = None
+        self.assertEqual(asyncio.run(client.generate("hello")), "done")
+        model = os.getenv("LLM_MODEL") or "unknown"
+        self.assertEqual(telemetry.counter("llm_prompt_tokens_total", model=model), 120)
+        self.assertEqual(telemetry.counter("llm_cached_tokens_total", model=model), 100)
+        self.assertEqual(telemetry.counter("llm_requests_total", model=model, status="success"), 1)
+
+    def test_streamed_calls_request_and_record_usage(self):
+        telemetry.reset()
+        client = LLMClient.__new__(LLMClient)
+        client.client = FakeOpenAI()
+        client.cache = None
+
+        async def collect():
+            return [piece async for piece in client.generate_stream("hello")]
+
+        self.assertEqual(asyncio.run(collect()), ["done"])
+        model = os.getenv("LLM_MODEL") or "unknown"
+        self.assertEqual(telemetry.counter("llm_prompt_tokens_total", model=model), 120)
+        self.assertEqual(telemetry.counter("llm_completion_tokens_total", model=model), 30)
+
+if __name__ == '__main__':
+    unittest.main()